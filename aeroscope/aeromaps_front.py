@@ -8,6 +8,9 @@ import pandas as pd
 from ipywidgets import Output, widgets
 from IPython.display import display, clear_output, HTML
 from functools import partial
+from perf_monitor import PERF_MONITOR
+from regional_groups import GROUP_NAMES, group_countries
+from update_scheduler import UpdateScheduler
 
 from base64 import b64encode
 
@@ -17,8 +20,7 @@ from base64 import b64encode
 
 class AeroMAPSTab:
     def __init__(self, aeroscopedataclass):
-        self.in_class_flights_df = aeroscopedataclass.flights_df.copy()
-
+        PERF_MONITOR.instrument(self)
         ############# Airline filter #############
 
         self.airline_autocomplete = v.Autocomplete(
@@ -94,16 +96,7 @@ class AeroMAPSTab:
             clearable=True,
             chips=True,
             label="International Organisation",
-            items=[
-                "European Union",
-                "European Union + Outermost Regions",
-                "OECD",
-                "G7",
-                "G20",
-                "Eurocontrol Members",
-                "BRICS",
-                "France + Overseas",
-            ],
+            items=GROUP_NAMES,
             multiple=True,
             variant="outlined",
         )
@@ -113,16 +106,7 @@ class AeroMAPSTab:
             clearable=True,
             chips=True,
             label="International Organisation",
-            items=[
-                "European Union",
-                "European Union + Outermost Regions",
-                "OECD",
-                "G7",
-                "G20",
-                "Eurocontrol Members",
-                "BRICS",
-                "France + Overseas",
-            ],
+            items=GROUP_NAMES,
             multiple=True,
             variant="outlined",
         )
@@ -155,8 +139,8 @@ class AeroMAPSTab:
             v_model=[],
             clearable=True,
             chips=True,
-            label="Flight type (Domestic: 1/International: 0)",
-            items=list(aeroscopedataclass.flights_df.domestic.unique()),
+            label="Flight type (Domestic: true/International: false)",
+            items=aeroscopedataclass.flights_df.domestic.unique().tolist(),
             multiple=True,
             variant="outlined",
         )
@@ -164,8 +148,8 @@ class AeroMAPSTab:
         ############# Distance filter #############
 
         self.range_slider = v.RangeSlider(
-            v_model=[0, aeroscopedataclass.flights_df.distance_km.max() + 10],
-            max=aeroscopedataclass.flights_df.distance_km.max() + 10,
+            v_model=[0, float(aeroscopedataclass.flights_df.distance_km.max()) + 10],
+            max=float(aeroscopedataclass.flights_df.distance_km.max()) + 10,
             min=0,
             step=10,
             label="Distance (km)",
@@ -188,6 +172,20 @@ class AeroMAPSTab:
 
         self.dl_button = ipywidgets.Button(description="Download table", button_style="info")
 
+        # filter widget of each flights_df column, their items are refreshed together
+        self.facet_autocompletes = {
+            "iata_departure": self.departure_airport_autocomplete,
+            "departure_country_name": self.departure_country_autocomplete,
+            "departure_continent_name": self.departure_continent_autocomplete,
+            "iata_arrival": self.arrival_airport_autocomplete,
+            "arrival_country_name": self.arrival_country_autocomplete,
+            "arrival_continent_name": self.arrival_continent_autocomplete,
+            "airline_iata": self.airline_autocomplete,
+            "acft_icao": self.aircraft_autocomplete,
+            "domestic": self.domestic_autocomplete,
+        }
+        self.selected_rows = None
+
         self._render_initial_table(aeroscopedataclass)
         self._make_connections(aeroscopedataclass)
         self._make_layout()
@@ -195,515 +193,97 @@ class AeroMAPSTab:
         display(self.download_output)
 
     def _make_connections(self, dataclass):
-        self.reset_all_button.on_event("click", partial(self._reset_all, dataclass=dataclass))
-
-        self.departure_organisation_autocomplete.observe(
-            self._select_regional_departure, names="v_model"
-        )
-
-        self.arrival_organisation_autocomplete.observe(
-            self._select_regional_arrival, names="v_model"
-        )
-
-        self.range_slider.observe(
-            partial(self._df_update_distance, dataclass=dataclass), names="v_model"
-        )
-        self.departure_airport_autocomplete.observe(
-            partial(self._df_update_dep_arpt, dataclass=dataclass), names="v_model"
-        )
-        self.departure_country_autocomplete.observe(
-            partial(self._df_update_dep_ctry, dataclass=dataclass), names="v_model"
-        )
-
-        self.departure_organisation_autocomplete.observe(
-            partial(self._df_update_orga, dataclass=dataclass), names="v_model"
-        )
-
-        self.departure_continent_autocomplete.observe(
-            partial(self._df_update_dep_conti, dataclass=dataclass), names="v_model"
-        )
-        self.arrival_airport_autocomplete.observe(
-            partial(self._df_update_arr_arpt, dataclass=dataclass), names="v_model"
-        )
-        self.arrival_country_autocomplete.observe(
-            partial(self._df_update_arr_ctry, dataclass=dataclass), names="v_model"
-        )
-
-        self.arrival_organisation_autocomplete.observe(
-            partial(self._df_update_orga, dataclass=dataclass), names="v_model"
-        )
-
-        self.arrival_continent_autocomplete.observe(
-            partial(self._df_update_arr_conti, dataclass=dataclass), names="v_model"
-        )
-        self.airline_autocomplete.observe(
-            partial(self._df_update_airline, dataclass=dataclass), names="v_model"
-        )
-        self.aircraft_autocomplete.observe(
-            partial(self._df_update_aircraft, dataclass=dataclass), names="v_model"
-        )
-        self.domestic_autocomplete.observe(
-            partial(self._df_update_type, dataclass=dataclass), names="v_model"
+        # one update cycle per interaction: a filter edit supersedes the pending ones (reset
+        # button and regional groups included)
+        self.scheduler = UpdateScheduler()
+        self.scheduler.on_event(
+            self.reset_all_button, "click", partial(self._reset_all, dataclass=dataclass)
+        )
+
+        self.scheduler.observe(
+            self.departure_organisation_autocomplete, self._select_regional_departure
+        )
+        self.scheduler.observe(
+            self.arrival_organisation_autocomplete, self._select_regional_arrival
+        )
+        self.scheduler.observe(
+            self.departure_country_autocomplete, self._reset_departure_organisation
+        )
+        self.scheduler.observe(self.arrival_country_autocomplete, self._reset_arrival_organisation)
+
+        self.scheduler.observe(
+            self.range_slider, partial(self._df_update_distance, dataclass=dataclass), key="data"
+        )
+        self.scheduler.observe(
+            self.departure_airport_autocomplete,
+            partial(self._df_update_dep_arpt, dataclass=dataclass),
+            key="data",
+        )
+        self.scheduler.observe(
+            self.departure_country_autocomplete,
+            partial(self._df_update_dep_ctry, dataclass=dataclass),
+            key="data",
+        )
+        self.scheduler.observe(
+            self.departure_organisation_autocomplete,
+            partial(self._df_update_orga, dataclass=dataclass),
+            key="data",
+        )
+        self.scheduler.observe(
+            self.departure_continent_autocomplete,
+            partial(self._df_update_dep_conti, dataclass=dataclass),
+            key="data",
+        )
+        self.scheduler.observe(
+            self.arrival_airport_autocomplete,
+            partial(self._df_update_arr_arpt, dataclass=dataclass),
+            key="data",
+        )
+        self.scheduler.observe(
+            self.arrival_country_autocomplete,
+            partial(self._df_update_arr_ctry, dataclass=dataclass),
+            key="data",
+        )
+        self.scheduler.observe(
+            self.arrival_organisation_autocomplete,
+            partial(self._df_update_orga, dataclass=dataclass),
+            key="data",
+        )
+        self.scheduler.observe(
+            self.arrival_continent_autocomplete,
+            partial(self._df_update_arr_conti, dataclass=dataclass),
+            key="data",
+        )
+        self.scheduler.observe(
+            self.airline_autocomplete,
+            partial(self._df_update_airline, dataclass=dataclass),
+            key="data",
+        )
+        self.scheduler.observe(
+            self.aircraft_autocomplete,
+            partial(self._df_update_aircraft, dataclass=dataclass),
+            key="data",
+        )
+        self.scheduler.observe(
+            self.domestic_autocomplete,
+            partial(self._df_update_type, dataclass=dataclass),
+            key="data",
         )
         self.dl_button.on_click(self._download_dataframe)
 
     def _select_regional_departure(self, change):
         selected_organisations = self.departure_organisation_autocomplete.v_model
 
-        regional_list = []
-        if "European Union" in selected_organisations:
-            regional_list.extend(
-                [
-                    "Austria, Republic of",
-                    "Belgium, Kingdom of",
-                    "Bulgaria, Republic of",
-                    "Croatia, Republic of",
-                    "Cyprus, Republic of",
-                    "Czech Republic",
-                    "Denmark, Kingdom of",
-                    "Estonia, Republic of",
-                    "Finland, Republic of",
-                    "France, French Republic",
-                    "Germany, Federal Republic of",
-                    "Greece, Hellenic Republic",
-                    "Hungary, Republic of",
-                    "Ireland",
-                    "Italy, Italian Republic",
-                    "Latvia, Republic of",
-                    "Lithuania, Republic of",
-                    "Luxembourg, Grand Duchy of",
-                    "Malta, Republic of",
-                    "Netherlands, Kingdom of the",
-                    "Poland, Republic of",
-                    "Portugal, Portuguese Republic",
-                    "Romania",
-                    "Slovakia (Slovak Republic)",
-                    "Slovenia, Republic of",
-                    "Spain, Kingdom of",
-                    "Sweden, Kingdom of",
-                ]
-            )
-        if "European Union + Outermost Regions" in selected_organisations:
-            regional_list.extend(
-                [
-                    "Austria, Republic of",
-                    "Belgium, Kingdom of",
-                    "Bulgaria, Republic of",
-                    "Mayotte",
-                    "Croatia, Republic of",
-                    "Czech Republic",
-                    "Denmark, Kingdom of",
-                    "Estonia, Republic of",
-                    "Finland, Republic of",
-                    "France, French Republic",
-                    "French Guiana",
-                    "Germany, Federal Republic of",
-                    "Greece, Hellenic Republic",
-                    "Guadeloupe",
-                    "Hungary, Republic of",
-                    "Ireland",
-                    "Italy, Italian Republic",
-                    "Latvia, Republic of",
-                    "Lithuania, Republic of",
-                    "Luxembourg, Grand Duchy of",
-                    "Malta, Republic of",
-                    "Martinique",
-                    "Netherlands, Kingdom of the",
-                    "Poland, Republic of",
-                    "Portugal, Portuguese Republic",
-                    "Reunion",
-                    "Romania",
-                    "Slovakia (Slovak Republic)",
-                    "Slovenia, Republic of",
-                    "Spain, Kingdom of",
-                    "Sweden, Kingdom of",
-                    "Saint Martin",
-                ]
-            )
-        if "France + Overseas" in selected_organisations:
-            regional_list.extend(
-                [
-                    "Mayotte",
-                    "French Polynesia",
-                    "Guadeloupe",
-                    "French Guiana",
-                    "Martinique",
-                    "New Caledonia",
-                    "Reunion",
-                    "Saint Barthelemy",
-                    "Saint Pierre and Miquelon",
-                    "Wallis and Futuna",
-                    "Saint Martin",
-                    "France, French Republic",
-                ]
-            )
-        if "G7" in selected_organisations:
-            regional_list.extend(
-                [
-                    "Canada",
-                    "France, French Republic",
-                    "Germany, Federal Republic of",
-                    "Italy, Italian Republic",
-                    "Japan",
-                    "United Kingdom of Great Britain & Northern Ireland",
-                    "United States of America",
-                ]
-            )
-        if "G20" in selected_organisations:
-            regional_list.extend(
-                [
-                    "Argentina, Argentine Republic",
-                    "Australia, Commonwealth of",
-                    "Brazil, Federative Republic of",
-                    "Canada",
-                    "China, People's Republic of",
-                    "France, French Republic",
-                    "Germany, Federal Republic of",
-                    "India, Republic of",
-                    "Indonesia, Republic of",
-                    "Italy, Italian Republic",
-                    "Japan",
-                    "Mexico, United Mexican States",
-                    "Russian Federation",
-                    "Saudi Arabia, Kingdom of",
-                    "South Africa, Republic of",
-                    "Republic of Korea",
-                    "Turkey, Republic of",
-                    "United Kingdom of Great Britain & Northern Ireland",
-                    "United States of America",
-                ]
-            )
-        if "OECD" in selected_organisations:
-            regional_list.extend(
-                [
-                    "Australia, Commonwealth of",
-                    "Austria, Republic of",
-                    "Belgium, Kingdom of",
-                    "Canada",
-                    "Chile, Republic of",
-                    "Colombia, Republic of",
-                    "Czech Republic",
-                    "Denmark, Kingdom of",
-                    "Estonia, Republic of",
-                    "Finland, Republic of",
-                    "France, French Republic",
-                    "Germany, Federal Republic of",
-                    "Greece, Hellenic Republic",
-                    "Hungary, Republic of",
-                    "Iceland, Republic of",
-                    "Ireland",
-                    "Israel, State of",
-                    "Italy, Italian Republic",
-                    "Japan",
-                    "Korea, Republic of",
-                    "Latvia, Republic of",
-                    "Lithuania, Republic of",
-                    "Luxembourg, Grand Duchy of",
-                    "Mexico, United Mexican States",
-                    "Netherlands, Kingdom of the",
-                    "New Zealand",
-                    "Norway, Kingdom of",
-                    "Poland, Republic of",
-                    "Portugal, Portuguese Republic",
-                    "Slovakia (Slovak Republic)",
-                    "Slovenia, Republic of",
-                    "Spain, Kingdom of",
-                    "Sweden, Kingdom of",
-                    "Switzerland, Swiss Confederation",
-                    "Turkey, Republic of",
-                    "United Kingdom of Great Britain & Northern Ireland",
-                    "United States of America",
-                ]
-            )
-        if "Eurocontrol Members" in selected_organisations:
-            regional_list.extend(
-                [
-                    "Albania, Republic of",
-                    "Armenia, Republic of",
-                    "Austria, Republic of",
-                    "Azerbaijan, Republic of",
-                    "Belgium, Kingdom of",
-                    "Bosnia and Herzegovina",
-                    "Bulgaria, Republic of",
-                    "Croatia, Republic of",
-                    "Cyprus, Republic of",
-                    "Czech Republic",
-                    "Denmark, Kingdom of",
-                    "Estonia, Republic of",
-                    "Finland, Republic of",
-                    "France, French Republic",
-                    "Georgia",
-                    "Germany, Federal Republic of",
-                    "Greece, Hellenic Republic",
-                    "Hungary, Republic of",
-                    "Ireland",
-                    "Italy, Italian Republic",
-                    "Latvia, Republic of",
-                    "Lithuania, Republic of",
-                    "Luxembourg, Grand Duchy of",
-                    "Malta, Republic of",
-                    "Moldova, Republic of",
-                    "Monaco, Principality of",
-                    "Montenegro, Republic of",
-                    "Netherlands, Kingdom of the",
-                    "North Macedonia, Republic of",
-                    "Norway, Kingdom of",
-                    "Poland, Republic of",
-                    "Portugal, Portuguese Republic",
-                    "Romania",
-                    "Serbia, Republic of",
-                    "Slovakia (Slovak Republic)",
-                    "Slovenia, Republic of",
-                    "Spain, Kingdom of",
-                    "Sweden, Kingdom of",
-                    "Switzerland, Swiss Confederation",
-                    "Turkey, Republic of",
-                    "Ukraine",
-                    "United Kingdom of Great Britain & Northern Ireland",
-                ]
-            )
-        if "BRICS" in selected_organisations:
-            regional_list.extend(
-                [
-                    "Brazil, Federative Republic of",
-                    "Russian Federation",
-                    "India, Republic of",
-                    "China, People's Republic of",
-                    "South Africa, Republic of",
-                ]
-            )
-
-        self.departure_country_autocomplete.v_model = list(set(regional_list))
-        self.departure_country_autocomplete.items = list(set(regional_list))
+        regional_list = group_countries(selected_organisations)
+        self.departure_country_autocomplete.v_model = regional_list
+        self.departure_country_autocomplete.items = regional_list
 
     def _select_regional_arrival(self, change):
         selected_organisations = self.arrival_organisation_autocomplete.v_model
 
-        regional_list = []
-        if "European Union" in selected_organisations:
-            regional_list.extend(
-                [
-                    "Austria, Republic of",
-                    "Belgium, Kingdom of",
-                    "Bulgaria, Republic of",
-                    "Croatia, Republic of",
-                    "Cyprus, Republic of",
-                    "Czech Republic",
-                    "Denmark, Kingdom of",
-                    "Estonia, Republic of",
-                    "Finland, Republic of",
-                    "France, French Republic",
-                    "Germany, Federal Republic of",
-                    "Greece, Hellenic Republic",
-                    "Hungary, Republic of",
-                    "Ireland",
-                    "Italy, Italian Republic",
-                    "Latvia, Republic of",
-                    "Lithuania, Republic of",
-                    "Luxembourg, Grand Duchy of",
-                    "Malta, Republic of",
-                    "Netherlands, Kingdom of the",
-                    "Poland, Republic of",
-                    "Portugal, Portuguese Republic",
-                    "Romania",
-                    "Slovakia (Slovak Republic)",
-                    "Slovenia, Republic of",
-                    "Spain, Kingdom of",
-                    "Sweden, Kingdom of",
-                ]
-            )
-        if "European Union + Outermost Regions" in selected_organisations:
-            regional_list.extend(
-                [
-                    "Austria, Republic of",
-                    "Belgium, Kingdom of",
-                    "Bulgaria, Republic of",
-                    "Mayotte",
-                    "Croatia, Republic of",
-                    "Czech Republic",
-                    "Denmark, Kingdom of",
-                    "Estonia, Republic of",
-                    "Finland, Republic of",
-                    "France, French Republic",
-                    "French Guiana",
-                    "Germany, Federal Republic of",
-                    "Greece, Hellenic Republic",
-                    "Guadeloupe",
-                    "Hungary, Republic of",
-                    "Ireland",
-                    "Italy, Italian Republic",
-                    "Latvia, Republic of",
-                    "Lithuania, Republic of",
-                    "Luxembourg, Grand Duchy of",
-                    "Malta, Republic of",
-                    "Martinique",
-                    "Netherlands, Kingdom of the",
-                    "Poland, Republic of",
-                    "Portugal, Portuguese Republic",
-                    "Reunion",
-                    "Romania",
-                    "Slovakia (Slovak Republic)",
-                    "Slovenia, Republic of",
-                    "Spain, Kingdom of",
-                    "Sweden, Kingdom of",
-                    "Saint Martin",
-                ]
-            )
-        if "France + Overseas" in selected_organisations:
-            regional_list.extend(
-                [
-                    "Mayotte",
-                    "French Polynesia",
-                    "Guadeloupe",
-                    "French Guiana",
-                    "Martinique",
-                    "New Caledonia",
-                    "Reunion",
-                    "Saint Barthelemy",
-                    "Saint Pierre and Miquelon",
-                    "Wallis and Futuna",
-                    "Saint Martin",
-                    "France, French Republic",
-                ]
-            )
-        if "G7" in selected_organisations:
-            regional_list.extend(
-                [
-                    "Canada",
-                    "France, French Republic",
-                    "Germany, Federal Republic of",
-                    "Italy, Italian Republic",
-                    "Japan",
-                    "United Kingdom of Great Britain & Northern Ireland",
-                    "United States of America",
-                ]
-            )
-        if "G20" in selected_organisations:
-            regional_list.extend(
-                [
-                    "Argentina, Argentine Republic",
-                    "Australia, Commonwealth of",
-                    "Brazil, Federative Republic of",
-                    "Canada",
-                    "China, People's Republic of",
-                    "France, French Republic",
-                    "Germany, Federal Republic of",
-                    "India, Republic of",
-                    "Indonesia, Republic of",
-                    "Italy, Italian Republic",
-                    "Japan",
-                    "Mexico, United Mexican States",
-                    "Russian Federation",
-                    "Saudi Arabia, Kingdom of",
-                    "South Africa, Republic of",
-                    "Republic of Korea",
-                    "Turkey, Republic of",
-                    "United Kingdom of Great Britain & Northern Ireland",
-                    "United States of America",
-                ]
-            )
-        if "OECD" in selected_organisations:
-            regional_list.extend(
-                [
-                    "Australia, Commonwealth of",
-                    "Austria, Republic of",
-                    "Belgium, Kingdom of",
-                    "Canada",
-                    "Chile, Republic of",
-                    "Colombia, Republic of",
-                    "Czech Republic",
-                    "Denmark, Kingdom of",
-                    "Estonia, Republic of",
-                    "Finland, Republic of",
-                    "France, French Republic",
-                    "Germany, Federal Republic of",
-                    "Greece, Hellenic Republic",
-                    "Hungary, Republic of",
-                    "Iceland, Republic of",
-                    "Ireland",
-                    "Israel, State of",
-                    "Italy, Italian Republic",
-                    "Japan",
-                    "Korea, Republic of",
-                    "Latvia, Republic of",
-                    "Lithuania, Republic of",
-                    "Luxembourg, Grand Duchy of",
-                    "Mexico, United Mexican States",
-                    "Netherlands, Kingdom of the",
-                    "New Zealand",
-                    "Norway, Kingdom of",
-                    "Poland, Republic of",
-                    "Portugal, Portuguese Republic",
-                    "Slovakia (Slovak Republic)",
-                    "Slovenia, Republic of",
-                    "Spain, Kingdom of",
-                    "Sweden, Kingdom of",
-                    "Switzerland, Swiss Confederation",
-                    "Turkey, Republic of",
-                    "United Kingdom of Great Britain & Northern Ireland",
-                    "United States of America",
-                ]
-            )
-        if "Eurocontrol Members" in selected_organisations:
-            regional_list.extend(
-                [
-                    "Albania, Republic of",
-                    "Armenia, Republic of",
-                    "Austria, Republic of",
-                    "Azerbaijan, Republic of",
-                    "Belgium, Kingdom of",
-                    "Bosnia and Herzegovina",
-                    "Bulgaria, Republic of",
-                    "Croatia, Republic of",
-                    "Cyprus, Republic of",
-                    "Czech Republic",
-                    "Denmark, Kingdom of",
-                    "Estonia, Republic of",
-                    "Finland, Republic of",
-                    "France, French Republic",
-                    "Georgia",
-                    "Germany, Federal Republic of",
-                    "Greece, Hellenic Republic",
-                    "Hungary, Republic of",
-                    "Ireland",
-                    "Italy, Italian Republic",
-                    "Latvia, Republic of",
-                    "Lithuania, Republic of",
-                    "Luxembourg, Grand Duchy of",
-                    "Malta, Republic of",
-                    "Moldova, Republic of",
-                    "Monaco, Principality of",
-                    "Montenegro, Republic of",
-                    "Netherlands, Kingdom of the",
-                    "North Macedonia, Republic of",
-                    "Norway, Kingdom of",
-                    "Poland, Republic of",
-                    "Portugal, Portuguese Republic",
-                    "Romania",
-                    "Serbia, Republic of",
-                    "Slovakia (Slovak Republic)",
-                    "Slovenia, Republic of",
-                    "Spain, Kingdom of",
-                    "Sweden, Kingdom of",
-                    "Switzerland, Swiss Confederation",
-                    "Turkey, Republic of",
-                    "Ukraine",
-                    "United Kingdom of Great Britain & Northern Ireland",
-                ]
-            )
-        if "BRICS" in selected_organisations:
-            regional_list.extend(
-                [
-                    "Brazil, Federative Republic of",
-                    "Russian Federation",
-                    "India, Republic of",
-                    "China, People's Republic of",
-                    "South Africa, Republic of",
-                ]
-            )
-
-        self.arrival_country_autocomplete.v_model = list(set(regional_list))
-        self.arrival_country_autocomplete.items = list(set(regional_list))
+        regional_list = group_countries(selected_organisations)
+        self.arrival_country_autocomplete.v_model = regional_list
+        self.arrival_country_autocomplete.items = regional_list
 
     def _reset_all(self, widget, event, data, dataclass):
         self.departure_airport_autocomplete.v_model = list()
@@ -717,55 +297,16 @@ class AeroMAPSTab:
         self.domestic_autocomplete.v_model = list()
         self.airline_autocomplete.v_model = list()
         self.aircraft_autocomplete.v_model = list()
-        self.departure_airport_autocomplete.items = (
-            dataclass.flights_df.iata_departure.unique().tolist()
-        )
-        self.departure_country_autocomplete.items = (
-            dataclass.flights_df.departure_country_name.unique().tolist()
-        )
+        self._update_items(dataclass)
 
-        self.departure_organisation_autocomplete.items = [
-            "European Union",
-            "European Union + Outermost Regions",
-            "OECD",
-            "G7",
-            "G20",
-            "Eurocontrol Members",
-            "BRICS",
-            "France + Overseas",
-        ]
-
-        self.departure_continent_autocomplete.items = (
-            dataclass.flights_df.departure_continent_name.unique().tolist()
-        )
-        self.arrival_airport_autocomplete.items = (
-            dataclass.flights_df.iata_arrival.unique().tolist()
-        )
-        self.arrival_country_autocomplete.items = (
-            dataclass.flights_df.arrival_country_name.unique().tolist()
-        )
+        self.departure_organisation_autocomplete.items = GROUP_NAMES
 
-        self.arrival_organisation_autocomplete.items = [
-            "European Union",
-            "European Union + Outermost Regions",
-            "OECD",
-            "G7",
-            "G20",
-            "Eurocontrol Members",
-            "BRICS",
-            "France + Overseas",
-        ]
+        self.arrival_organisation_autocomplete.items = GROUP_NAMES
 
-        self.arrival_continent_autocomplete.items = (
-            dataclass.flights_df.arrival_continent_name.unique().tolist()
-        )
-        self.domestic_autocomplete.items = dataclass.flights_df.domestic.unique().tolist()
-        self.airline_autocomplete.items = dataclass.flights_df.airline_iata.unique().tolist()
-        self.aircraft_autocomplete.items = dataclass.flights_df.acft_icao.unique().tolist()
-        self.range_slider.v_model = [0, dataclass.flights_df.distance_km.max() + 50]
+        self.range_slider.v_model = [0, float(dataclass.flights_df.distance_km.max()) + 50]
 
     def _render_initial_table(self, dataclass):
-        headers = [
+        self.table_headers = [
             {"text": "Metric", "value": "name"},
             {"text": "Value (Total)", "value": "val"},
             {"text": "Value (SR)", "value": "sr"},
@@ -773,560 +314,111 @@ class AeroMAPSTab:
             {"text": "Value (LR)", "value": "lr"},
         ]
 
-        total_sums = self.in_class_flights_df[["CO2 (kg)", "ASK", "Seats"]].sum()
-        sr_sums = self.in_class_flights_df[self.in_class_flights_df.distance_km <= 1500][
-            ["CO2 (kg)", "ASK", "Seats"]
-        ].sum()
-        mr_sums = self.in_class_flights_df[
-            (self.in_class_flights_df.distance_km > 1500)
-            & (self.in_class_flights_df.distance_km <= 4000)
-        ][["CO2 (kg)", "ASK", "Seats"]].sum()
-        lr_sums = self.in_class_flights_df[self.in_class_flights_df.distance_km > 4000][
-            ["CO2 (kg)", "ASK", "Seats"]
-        ].sum()
-
-        items = [
-            {
-                "name": "ASK",
-                "val": total_sums["ASK"],
-                "sr": sr_sums["ASK"],
-                "mr": mr_sums["ASK"],
-                "lr": lr_sums["ASK"],
-            },
-            {
-                "name": "CO2 (kg)",
-                "val": total_sums["CO2 (kg)"],
-                "sr": sr_sums["CO2 (kg)"],
-                "mr": mr_sums["CO2 (kg)"],
-                "lr": lr_sums["CO2 (kg)"],
-            },
-            {
-                "name": "Seats",
-                "val": total_sums["Seats"],
-                "sr": sr_sums["Seats"],
-                "mr": mr_sums["Seats"],
-                "lr": lr_sums["Seats"],
-            },
-            {
-                "name": "CO2 (kg) per ASK",
-                "val": total_sums["CO2 (kg)"] / total_sums["ASK"],
-                "sr": sr_sums["CO2 (kg)"] / sr_sums["ASK"],
-                "mr": mr_sums["CO2 (kg)"] / mr_sums["ASK"],
-                "lr": lr_sums["CO2 (kg)"] / lr_sums["ASK"],
-            },
-            {
-                "name": "Energy (MJ) per ASK",
-                "val": total_sums["CO2 (kg)"] / total_sums["ASK"] / 3.16 * 44,
-                "sr": sr_sums["CO2 (kg)"] / sr_sums["ASK"] / 3.16 * 44,
-                "mr": mr_sums["CO2 (kg)"] / mr_sums["ASK"] / 3.16 * 44,
-                "lr": lr_sums["CO2 (kg)"] / lr_sums["ASK"] / 3.16 * 44,
-            },
-            {
-                "name": "Share of world ASK (%)",
-                "val": total_sums["ASK"] / dataclass.flights_df.ASK.sum() * 100,
-                "sr": sr_sums["ASK"] / dataclass.flights_df.ASK.sum() * 100,
-                "mr": mr_sums["ASK"] / dataclass.flights_df.ASK.sum() * 100,
-                "lr": lr_sums["ASK"] / dataclass.flights_df.ASK.sum() * 100,
-            },
-            {
-                "name": "Share of world Seats (%)",
-                "val": total_sums["Seats"] / dataclass.flights_df.Seats.sum() * 100,
-                "sr": sr_sums["Seats"] / dataclass.flights_df.Seats.sum() * 100,
-                "mr": mr_sums["Seats"] / dataclass.flights_df.Seats.sum() * 100,
-                "lr": lr_sums["Seats"] / dataclass.flights_df.Seats.sum() * 100,
-            },
-            {
-                "name": "Share of world CO2 (%)",
-                "val": total_sums["CO2 (kg)"] / dataclass.flights_df["CO2 (kg)"].sum() * 100,
-                "sr": sr_sums["CO2 (kg)"] / dataclass.flights_df["CO2 (kg)"].sum() * 100,
-                "mr": mr_sums["CO2 (kg)"] / dataclass.flights_df["CO2 (kg)"].sum() * 100,
-                "lr": lr_sums["CO2 (kg)"] / dataclass.flights_df["CO2 (kg)"].sum() * 100,
-            },
-        ]
+        items = dataclass.range_summary.items()
 
         self.df_metrics = pd.DataFrame(items)
-        self.df_metrics.columns = [header["value"] for header in headers]
+        self.df_metrics.columns = [header["value"] for header in self.table_headers]
 
         self.output_1 = v.DataTable(
             v_model=[],
             show_select=False,
-            headers=headers,
+            headers=self.table_headers,
             items=items,
         )
 
-    def _table_update(self, dataclass):
-        headers = [
-            {"text": "Metric", "value": "name"},
-            {"text": "Value (Total)", "value": "val"},
-            {"text": "Value (SR)", "value": "sr"},
-            {"text": "Value (MR)", "value": "mr"},
-            {"text": "Value (LR)", "value": "lr"},
-        ]
-
-        total_sums = self.in_class_flights_df[["CO2 (kg)", "ASK", "Seats"]].sum()
-        sr_sums = self.in_class_flights_df[self.in_class_flights_df.distance_km <= 1500][
-            ["CO2 (kg)", "ASK", "Seats"]
-        ].sum()
-        mr_sums = self.in_class_flights_df[
-            (self.in_class_flights_df.distance_km > 1500)
-            & (self.in_class_flights_df.distance_km <= 4000)
-        ][["CO2 (kg)", "ASK", "Seats"]].sum()
-        lr_sums = self.in_class_flights_df[self.in_class_flights_df.distance_km > 4000][
-            ["CO2 (kg)", "ASK", "Seats"]
-        ].sum()
-
-        items = [
-            {
-                "name": "ASK",
-                "val": total_sums["ASK"],
-                "sr": sr_sums["ASK"],
-                "mr": mr_sums["ASK"],
-                "lr": lr_sums["ASK"],
-            },
-            {
-                "name": "CO2 (kg)",
-                "val": total_sums["CO2 (kg)"],
-                "sr": sr_sums["CO2 (kg)"],
-                "mr": mr_sums["CO2 (kg)"],
-                "lr": lr_sums["CO2 (kg)"],
-            },
-            {
-                "name": "Seats",
-                "val": total_sums["Seats"],
-                "sr": sr_sums["Seats"],
-                "mr": mr_sums["Seats"],
-                "lr": lr_sums["Seats"],
-            },
-            {
-                "name": "CO2 (kg) per ASK",
-                "val": total_sums["CO2 (kg)"] / total_sums["ASK"],
-                "sr": sr_sums["CO2 (kg)"] / sr_sums["ASK"],
-                "mr": mr_sums["CO2 (kg)"] / mr_sums["ASK"],
-                "lr": lr_sums["CO2 (kg)"] / lr_sums["ASK"],
-            },
-            {
-                "name": "Energy (MJ) per ASK",
-                "val": total_sums["CO2 (kg)"] / total_sums["ASK"] / 3.16 * 44,
-                "sr": sr_sums["CO2 (kg)"] / sr_sums["ASK"] / 3.16 * 44,
-                "mr": mr_sums["CO2 (kg)"] / mr_sums["ASK"] / 3.16 * 44,
-                "lr": lr_sums["CO2 (kg)"] / lr_sums["ASK"] / 3.16 * 44,
-            },
-            {
-                "name": "Share of world ASK (%)",
-                "val": total_sums["ASK"] / dataclass.flights_df.ASK.sum() * 100,
-                "sr": sr_sums["ASK"] / dataclass.flights_df.ASK.sum() * 100,
-                "mr": mr_sums["ASK"] / dataclass.flights_df.ASK.sum() * 100,
-                "lr": lr_sums["ASK"] / dataclass.flights_df.ASK.sum() * 100,
-            },
-            {
-                "name": "Share of world Seats (%)",
-                "val": total_sums["Seats"] / dataclass.flights_df.Seats.sum() * 100,
-                "sr": sr_sums["Seats"] / dataclass.flights_df.Seats.sum() * 100,
-                "mr": mr_sums["Seats"] / dataclass.flights_df.Seats.sum() * 100,
-                "lr": lr_sums["Seats"] / dataclass.flights_df.Seats.sum() * 100,
-            },
-            {
-                "name": "Share of world CO2 (%)",
-                "val": total_sums["CO2 (kg)"] / dataclass.flights_df["CO2 (kg)"].sum() * 100,
-                "sr": sr_sums["CO2 (kg)"] / dataclass.flights_df["CO2 (kg)"].sum() * 100,
-                "mr": mr_sums["CO2 (kg)"] / dataclass.flights_df["CO2 (kg)"].sum() * 100,
-                "lr": lr_sums["CO2 (kg)"] / dataclass.flights_df["CO2 (kg)"].sum() * 100,
-            },
-        ]
+    def _table_update(self, dataclass, rows=None, distance_range=None):
+        # class totals of the selection in one reduction, no filtered frame is built
+        items = dataclass.range_summary.items(rows, distance_range)
 
         self.df_metrics = pd.DataFrame(items)
-        self.df_metrics.columns = [header["value"] for header in headers]
+        self.df_metrics.columns = [header["value"] for header in self.table_headers]
 
         self.output_1.items = items
 
     def _filter_common_code(self, dataclass):
-        filtered_departure_airport = self.departure_airport_autocomplete.v_model
-        filtered_departure_country = self.departure_country_autocomplete.v_model
-        filtered_departure_conti = self.departure_continent_autocomplete.v_model
-
-        filtered_arrival_airport = self.arrival_airport_autocomplete.v_model
-        filtered_arrival_country = self.arrival_country_autocomplete.v_model
-        filtered_arrival_conti = self.arrival_continent_autocomplete.v_model
-
-        filtered_airline = self.airline_autocomplete.v_model
-        filtered_aircraft = self.aircraft_autocomplete.v_model
-        filtered_type = self.domestic_autocomplete.v_model
-
-        min_dist = self.range_slider.v_model[0]
-        max_dist = self.range_slider.v_model[1]
-
-        self.in_class_flights_df = dataclass.flights_df
-
-        # distance filter
-        # drop index before reset_index()
-        if "level_0" in self.in_class_flights_df.columns:
-            self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-        self.in_class_flights_df = self.in_class_flights_df[
-            (self.in_class_flights_df["distance_km"] >= min_dist)
-            & (self.in_class_flights_df["distance_km"] <= max_dist)
-        ].reset_index()
-
-        # active departure filter
-        if filtered_departure_airport:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["iata_departure"].isin(filtered_departure_airport)
-            ].reset_index()
-
-        if filtered_departure_country:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["departure_country_name"].isin(filtered_departure_country)
-            ].reset_index()
-
-        if filtered_departure_conti:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["departure_continent_name"].isin(filtered_departure_conti)
-            ].reset_index()
-
-        # active arrival filter
-        if filtered_arrival_airport:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["iata_arrival"].isin(filtered_arrival_airport)
-            ].reset_index()
-
-        if filtered_arrival_country:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["arrival_country_name"].isin(filtered_arrival_country)
-            ].reset_index()
-
-        if filtered_arrival_conti:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["arrival_continent_name"].isin(filtered_arrival_conti)
-            ].reset_index()
-
-        # active airline filter
-        if filtered_airline:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["airline_iata"].isin(filtered_airline)
-            ].reset_index()
-
-        # active acft filter
-        if filtered_aircraft:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["acft_icao"].isin(filtered_aircraft)
-            ].reset_index()
-
-        # active type filter
-        if filtered_type:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["domestic"].isin(filtered_type)
-            ].reset_index()
-
-        self._table_update(dataclass)
+        filters = {
+            "iata_departure": self.departure_airport_autocomplete.v_model,
+            "departure_country_name": self.departure_country_autocomplete.v_model,
+            "departure_continent_name": self.departure_continent_autocomplete.v_model,
+            "iata_arrival": self.arrival_airport_autocomplete.v_model,
+            "arrival_country_name": self.arrival_country_autocomplete.v_model,
+            "arrival_continent_name": self.arrival_continent_autocomplete.v_model,
+            "airline_iata": self.airline_autocomplete.v_model,
+            "acft_icao": self.aircraft_autocomplete.v_model,
+            "domestic": self.domestic_autocomplete.v_model,
+        }
+        distance_range = self.range_slider.v_model
+        # one pass over the inverted indexes, the distance range is a slice of the distance index
+        self.selected_rows = dataclass.flights_filter.select(filters, distance_range=distance_range)
+
+        if any(len(values) for values in filters.values()):
+            self._table_update(dataclass, rows=self.selected_rows)
+        else:
+            # only the distance range is set: totals from the prefix sums of the distance index
+            self._table_update(dataclass, distance_range=distance_range)
+
+    def _update_items(self, dataclass, rows=None, keep=None):
+        # remaining values of each filter in one pass, the edited filter keeps its items while used
+        columns = [
+            column
+            for column, autocomplete in self.facet_autocompletes.items()
+            if column != keep or len(autocomplete.v_model) == 0
+        ]
+        facets = dataclass.flights_filter.facets(columns, rows=rows)
+        for column in columns:
+            self.facet_autocompletes[column].items = facets[column].index.tolist()
 
     def _df_update_dep_arpt(self, change, dataclass):
         self._filter_common_code(dataclass=dataclass)
-
-        if len(self.departure_airport_autocomplete.v_model) == 0:
-            self.departure_airport_autocomplete.items = (
-                self.in_class_flights_df.iata_departure.unique().tolist()
-            )
-        self.departure_country_autocomplete.items = (
-            self.in_class_flights_df.departure_country_name.unique().tolist()
-        )
-        self.departure_continent_autocomplete.items = (
-            self.in_class_flights_df.departure_continent_name.unique().tolist()
-        )
-        self.arrival_airport_autocomplete.items = (
-            self.in_class_flights_df.iata_arrival.unique().tolist()
-        )
-        self.arrival_country_autocomplete.items = (
-            self.in_class_flights_df.arrival_country_name.unique().tolist()
-        )
-        self.arrival_continent_autocomplete.items = (
-            self.in_class_flights_df.arrival_continent_name.unique().tolist()
-        )
-        self.domestic_autocomplete.items = self.in_class_flights_df.domestic.unique().tolist()
-        self.airline_autocomplete.items = self.in_class_flights_df.airline_iata.unique().tolist()
-        self.aircraft_autocomplete.items = self.in_class_flights_df.acft_icao.unique().tolist()
+        self._update_items(dataclass, rows=self.selected_rows, keep="iata_departure")
 
     def _df_update_dep_ctry(self, change, dataclass):
         self._filter_common_code(dataclass=dataclass)
+        self._update_items(dataclass, rows=self.selected_rows, keep="departure_country_name")
 
-        self.departure_airport_autocomplete.items = (
-            self.in_class_flights_df.iata_departure.unique().tolist()
-        )
+    def _reset_departure_organisation(self, change):
         if len(self.departure_country_autocomplete.v_model) == 0:
-            self.departure_country_autocomplete.items = (
-                self.in_class_flights_df.departure_country_name.unique().tolist()
-            )
             self.departure_organisation_autocomplete.v_model = list()
 
-        self.departure_continent_autocomplete.items = (
-            self.in_class_flights_df.departure_continent_name.unique().tolist()
-        )
-        self.arrival_airport_autocomplete.items = (
-            self.in_class_flights_df.iata_arrival.unique().tolist()
-        )
-        self.arrival_country_autocomplete.items = (
-            self.in_class_flights_df.arrival_country_name.unique().tolist()
-        )
-        self.arrival_continent_autocomplete.items = (
-            self.in_class_flights_df.arrival_continent_name.unique().tolist()
-        )
-        self.domestic_autocomplete.items = self.in_class_flights_df.domestic.unique().tolist()
-        self.airline_autocomplete.items = self.in_class_flights_df.airline_iata.unique().tolist()
-        self.aircraft_autocomplete.items = self.in_class_flights_df.acft_icao.unique().tolist()
-
     def _df_update_orga(self, change, dataclass):
         self._filter_common_code(dataclass=dataclass)
-
-        self.departure_airport_autocomplete.items = (
-            self.in_class_flights_df.iata_departure.unique().tolist()
-        )
-
-        self.departure_country_autocomplete.items = (
-            self.in_class_flights_df.departure_country_name.unique().tolist()
-        )
-
-        self.departure_continent_autocomplete.items = (
-            self.in_class_flights_df.departure_continent_name.unique().tolist()
-        )
-        self.arrival_airport_autocomplete.items = (
-            self.in_class_flights_df.iata_arrival.unique().tolist()
-        )
-        self.arrival_country_autocomplete.items = (
-            self.in_class_flights_df.arrival_country_name.unique().tolist()
-        )
-        self.arrival_continent_autocomplete.items = (
-            self.in_class_flights_df.arrival_continent_name.unique().tolist()
-        )
-        self.domestic_autocomplete.items = self.in_class_flights_df.domestic.unique().tolist()
-        self.airline_autocomplete.items = self.in_class_flights_df.airline_iata.unique().tolist()
-        self.aircraft_autocomplete.items = self.in_class_flights_df.acft_icao.unique().tolist()
+        self._update_items(dataclass, rows=self.selected_rows)
 
     def _df_update_dep_conti(self, change, dataclass):
         self._filter_common_code(dataclass=dataclass)
-
-        self.departure_airport_autocomplete.items = (
-            self.in_class_flights_df.iata_departure.unique().tolist()
-        )
-        self.departure_country_autocomplete.items = (
-            self.in_class_flights_df.departure_country_name.unique().tolist()
-        )
-        if len(self.departure_continent_autocomplete.v_model) == 0:
-            self.departure_continent_autocomplete.items = (
-                self.in_class_flights_df.departure_continent_name.unique().tolist()
-            )
-        self.arrival_airport_autocomplete.items = (
-            self.in_class_flights_df.iata_arrival.unique().tolist()
-        )
-        self.arrival_country_autocomplete.items = (
-            self.in_class_flights_df.arrival_country_name.unique().tolist()
-        )
-        self.arrival_continent_autocomplete.items = (
-            self.in_class_flights_df.arrival_continent_name.unique().tolist()
-        )
-        self.domestic_autocomplete.items = self.in_class_flights_df.domestic.unique().tolist()
-        self.airline_autocomplete.items = self.in_class_flights_df.airline_iata.unique().tolist()
-        self.aircraft_autocomplete.items = self.in_class_flights_df.acft_icao.unique().tolist()
+        self._update_items(dataclass, rows=self.selected_rows, keep="departure_continent_name")
 
     def _df_update_arr_arpt(self, change, dataclass):
         self._filter_common_code(dataclass=dataclass)
-
-        self.departure_airport_autocomplete.items = (
-            self.in_class_flights_df.iata_departure.unique().tolist()
-        )
-        self.departure_country_autocomplete.items = (
-            self.in_class_flights_df.departure_country_name.unique().tolist()
-        )
-        self.departure_continent_autocomplete.items = (
-            self.in_class_flights_df.departure_continent_name.unique().tolist()
-        )
-        if len(self.arrival_airport_autocomplete.v_model) == 0:
-            self.arrival_airport_autocomplete.items = (
-                self.in_class_flights_df.iata_arrival.unique().tolist()
-            )
-        self.arrival_country_autocomplete.items = (
-            self.in_class_flights_df.arrival_country_name.unique().tolist()
-        )
-        self.arrival_continent_autocomplete.items = (
-            self.in_class_flights_df.arrival_continent_name.unique().tolist()
-        )
-        self.domestic_autocomplete.items = self.in_class_flights_df.domestic.unique().tolist()
-        self.airline_autocomplete.items = self.in_class_flights_df.airline_iata.unique().tolist()
-        self.aircraft_autocomplete.items = self.in_class_flights_df.acft_icao.unique().tolist()
+        self._update_items(dataclass, rows=self.selected_rows, keep="iata_arrival")
 
     def _df_update_arr_ctry(self, change, dataclass):
         self._filter_common_code(dataclass=dataclass)
+        self._update_items(dataclass, rows=self.selected_rows, keep="arrival_country_name")
 
-        self.departure_airport_autocomplete.items = (
-            self.in_class_flights_df.iata_departure.unique().tolist()
-        )
-        self.departure_country_autocomplete.items = (
-            self.in_class_flights_df.departure_country_name.unique().tolist()
-        )
-        self.departure_continent_autocomplete.items = (
-            self.in_class_flights_df.departure_continent_name.unique().tolist()
-        )
-        self.arrival_airport_autocomplete.items = (
-            self.in_class_flights_df.iata_arrival.unique().tolist()
-        )
+    def _reset_arrival_organisation(self, change):
         if len(self.arrival_country_autocomplete.v_model) == 0:
-            self.arrival_country_autocomplete.items = (
-                self.in_class_flights_df.arrival_country_name.unique().tolist()
-            )
             self.arrival_organisation_autocomplete.v_model = list()
 
-        self.arrival_continent_autocomplete.items = (
-            self.in_class_flights_df.arrival_continent_name.unique().tolist()
-        )
-        self.domestic_autocomplete.items = self.in_class_flights_df.domestic.unique().tolist()
-        self.airline_autocomplete.items = self.in_class_flights_df.airline_iata.unique().tolist()
-        self.aircraft_autocomplete.items = self.in_class_flights_df.acft_icao.unique().tolist()
-
     def _df_update_arr_conti(self, change, dataclass):
         self._filter_common_code(dataclass=dataclass)
-
-        self.departure_airport_autocomplete.items = (
-            self.in_class_flights_df.iata_departure.unique().tolist()
-        )
-        self.departure_country_autocomplete.items = (
-            self.in_class_flights_df.departure_country_name.unique().tolist()
-        )
-        self.departure_continent_autocomplete.items = (
-            self.in_class_flights_df.departure_continent_name.unique().tolist()
-        )
-        self.arrival_airport_autocomplete.items = (
-            self.in_class_flights_df.iata_arrival.unique().tolist()
-        )
-        self.arrival_country_autocomplete.items = (
-            self.in_class_flights_df.arrival_country_name.unique().tolist()
-        )
-        if len(self.arrival_continent_autocomplete.v_model) == 0:
-            self.arrival_continent_autocomplete.items = (
-                self.in_class_flights_df.arrival_continent_name.unique().tolist()
-            )
-        self.domestic_autocomplete.items = self.in_class_flights_df.domestic.unique().tolist()
-        self.airline_autocomplete.items = self.in_class_flights_df.airline_iata.unique().tolist()
-        self.aircraft_autocomplete.items = self.in_class_flights_df.acft_icao.unique().tolist()
+        self._update_items(dataclass, rows=self.selected_rows, keep="arrival_continent_name")
 
     def _df_update_airline(self, change, dataclass):
         self._filter_common_code(dataclass=dataclass)
-
-        self.departure_airport_autocomplete.items = (
-            self.in_class_flights_df.iata_departure.unique().tolist()
-        )
-        self.departure_country_autocomplete.items = (
-            self.in_class_flights_df.departure_country_name.unique().tolist()
-        )
-        self.departure_continent_autocomplete.items = (
-            self.in_class_flights_df.departure_continent_name.unique().tolist()
-        )
-        self.arrival_airport_autocomplete.items = (
-            self.in_class_flights_df.iata_arrival.unique().tolist()
-        )
-        self.arrival_country_autocomplete.items = (
-            self.in_class_flights_df.arrival_country_name.unique().tolist()
-        )
-        self.arrival_continent_autocomplete.items = (
-            self.in_class_flights_df.arrival_continent_name.unique().tolist()
-        )
-        self.domestic_autocomplete.items = self.in_class_flights_df.domestic.unique().tolist()
-        if len(self.airline_autocomplete.v_model) == 0:
-            self.airline_autocomplete.items = (
-                self.in_class_flights_df.airline_iata.unique().tolist()
-            )
-        self.aircraft_autocomplete.items = self.in_class_flights_df.acft_icao.unique().tolist()
+        self._update_items(dataclass, rows=self.selected_rows, keep="airline_iata")
 
     def _df_update_aircraft(self, change, dataclass):
         self._filter_common_code(dataclass=dataclass)
-
-        self.departure_airport_autocomplete.items = (
-            self.in_class_flights_df.iata_departure.unique().tolist()
-        )
-        self.departure_country_autocomplete.items = (
-            self.in_class_flights_df.departure_country_name.unique().tolist()
-        )
-        self.departure_continent_autocomplete.items = (
-            self.in_class_flights_df.departure_continent_name.unique().tolist()
-        )
-        self.arrival_airport_autocomplete.items = (
-            self.in_class_flights_df.iata_arrival.unique().tolist()
-        )
-        self.arrival_country_autocomplete.items = (
-            self.in_class_flights_df.arrival_country_name.unique().tolist()
-        )
-        self.arrival_continent_autocomplete.items = (
-            self.in_class_flights_df.arrival_continent_name.unique().tolist()
-        )
-        self.domestic_autocomplete.items = self.in_class_flights_df.domestic.unique().tolist()
-        self.airline_autocomplete.items = self.in_class_flights_df.airline_iata.unique().tolist()
-        if len(self.aircraft_autocomplete.v_model) == 0:
-            self.aircraft_autocomplete.items = self.in_class_flights_df.acft_icao.unique().tolist()
+        self._update_items(dataclass, rows=self.selected_rows, keep="acft_icao")
 
     def _df_update_type(self, change, dataclass):
         self._filter_common_code(dataclass=dataclass)
-
-        self.departure_airport_autocomplete.items = (
-            self.in_class_flights_df.iata_departure.unique().tolist()
-        )
-        self.departure_country_autocomplete.items = (
-            self.in_class_flights_df.departure_country_name.unique().tolist()
-        )
-        self.departure_continent_autocomplete.items = (
-            self.in_class_flights_df.departure_continent_name.unique().tolist()
-        )
-        self.arrival_airport_autocomplete.items = (
-            self.in_class_flights_df.iata_arrival.unique().tolist()
-        )
-        self.arrival_country_autocomplete.items = (
-            self.in_class_flights_df.arrival_country_name.unique().tolist()
-        )
-        self.arrival_continent_autocomplete.items = (
-            self.in_class_flights_df.arrival_continent_name.unique().tolist()
-        )
-        if len(self.domestic_autocomplete.v_model) == 0:
-            self.domestic_autocomplete.items = self.in_class_flights_df.domestic.unique().tolist()
-        self.airline_autocomplete.items = self.in_class_flights_df.airline_iata.unique().tolist()
-        self.aircraft_autocomplete.items = self.in_class_flights_df.acft_icao.unique().tolist()
+        self._update_items(dataclass, rows=self.selected_rows, keep="domestic")
 
     def _df_update_distance(self, change, dataclass):
         self._filter_common_code(dataclass=dataclass)
-
-        self.departure_airport_autocomplete.items = (
-            self.in_class_flights_df.iata_departure.unique().tolist()
-        )
-        self.departure_country_autocomplete.items = (
-            self.in_class_flights_df.departure_country_name.unique().tolist()
-        )
-        self.departure_continent_autocomplete.items = (
-            self.in_class_flights_df.departure_continent_name.unique().tolist()
-        )
-        self.arrival_airport_autocomplete.items = (
-            self.in_class_flights_df.iata_arrival.unique().tolist()
-        )
-        self.arrival_country_autocomplete.items = (
-            self.in_class_flights_df.arrival_country_name.unique().tolist()
-        )
-        self.arrival_continent_autocomplete.items = (
-            self.in_class_flights_df.arrival_continent_name.unique().tolist()
-        )
-        self.domestic_autocomplete.items = self.in_class_flights_df.domestic.unique().tolist()
-        self.airline_autocomplete.items = self.in_class_flights_df.airline_iata.unique().tolist()
-        self.aircraft_autocomplete.items = self.in_class_flights_df.acft_icao.unique().tolist()
+        self._update_items(dataclass, rows=self.selected_rows)
 
     def _trigger_download_dataframe(self, dataframe, filename, kind="text/csv"):
         csv_content = dataframe.to_csv(index=False)
@@ -0,0 +1,306 @@
+"""
+Headless JSON API over the AeroSCOPE datasets (`aeroscope serve-api`).
+
+The datasets are loaded once, with the engines the tabs use, and shared by every request: the
+handlers only read them. Queries run in a pool of worker threads (the numpy reductions release
+the GIL), the event loop keeps accepting requests meanwhile.
+
+Endpoints, all GET and returning a JSON list of records:
+
+- /api/datasets: loaded datasets and their number of flights;
+- /api/<dataset>/summary: AeroMAPS table of the selection (totals per range class);
+- /api/<dataset>/facets?column=...[&metric=...]: remaining values of filter columns, with their
+  number of flights or metric total;
+- /api/<dataset>/routes[?metric=...&limit=...]: totals per airport pair, largest first when a
+  limit is given;
+- /api/<dataset>/treemap?metric=...[&top_k=...]: nodes of the flight treemap;
+- /api/<dataset>/distance?metric=...: metric total per 500 km distance bin.
+
+Flights are selected with the filters of the AeroMAPS tab: one parameter per filter column,
+repeated for several values (?airline_iata=AF&airline_iata=KL), departure_group/arrival_group for
+the regional groups and distance_min/distance_max (km, included).
+"""
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import tornado.web
+from tornado.ioloop import IOLoop
+
+from datasets import load_dataset
+from distance_cube import DistanceCube
+from od_table import OD_COLUMNS
+from regional_groups import REGIONAL_GROUPS, group_countries
+from treemap_hierarchy import TREEMAP_TOP_K, treemap_hierarchy
+
+_LOGGER = logging.getLogger(__name__)
+
+API_PORT = 8081
+API_WORKERS = 4
+
+# Filters of the AeroMAPS tab, columns missing from a dataset are not accepted
+FILTER_COLUMNS = [
+    "iata_departure",
+    "iata_arrival",
+    "origin",
+    "dest",
+    "departure_country_name",
+    "departure_continent_name",
+    "arrival_country_name",
+    "arrival_continent_name",
+    "airline_iata",
+    "acft_icao",
+    "domestic",
+]
+GROUP_FILTERS = {
+    "departure_group": "departure_country_name",
+    "arrival_group": "arrival_country_name",
+}
+DISTANCE_FILTERS = ["distance_min", "distance_max"]
+METRICS = ["CO2 (kg)", "ASK", "Seats", "n_flights"]
+
+
+class QueryError(ValueError):
+    """Invalid query parameters, answered with a 400 error."""
+
+
+def select_rows(data, arguments):
+    """Sorted positions of the flights selected by the filter parameters, None without filter."""
+    flights_df = data.flights_df
+    filters = {}
+    for column in FILTER_COLUMNS:
+        if column in flights_df.columns:
+            values = arguments.get(column, [])
+            if flights_df[column].dtype == bool:
+                values = [_parse_bool(column, value) for value in values]
+            filters[column] = list(values)
+    for name, column in GROUP_FILTERS.items():
+        groups = arguments.get(name, [])
+        unknown = [group for group in groups if group not in REGIONAL_GROUPS]
+        if unknown:
+            raise QueryError("Unknown regional groups: {}".format(", ".join(unknown)))
+        if groups:
+            filters[column] = filters[column] + group_countries(groups)
+
+    distance_range = _distance_range(arguments)
+    if not any(len(values) for values in filters.values()) and distance_range is None:
+        return None
+    return data.flights_filter.select(filters, distance_range=distance_range)
+
+
+def summary_query(data, arguments):
+    if _has_filters(arguments):
+        items = data.range_summary.items(select_rows(data, arguments))
+    else:
+        # at most a distance range: totals from the prefix sums of the distance index
+        items = data.range_summary.items(distance_range=_distance_range(arguments))
+    return pd.DataFrame(items)
+
+
+def facets_query(data, arguments):
+    columns = arguments.get("column", [])
+    if not columns:
+        raise QueryError("At least one column is required")
+    unknown = [column for column in columns if column not in data.flights_df.columns]
+    if unknown:
+        raise QueryError("Unknown columns: {}".format(", ".join(unknown)))
+    metric = _parse_metric(data, arguments, default=None)
+    rows = select_rows(data, arguments)
+    facets = data.flights_filter.facets(columns, rows=rows, metric=metric)
+    return pd.concat(
+        [
+            pd.DataFrame(
+                {
+                    "column": column,
+                    "value": facet.index.astype(str),
+                    metric or "count": facet.to_numpy(),
+                }
+            )
+            for column, facet in facets.items()
+        ],
+        ignore_index=True,
+    )
+
+
+def routes_query(data, arguments):
+    metric = _parse_metric(data, arguments, default="ASK")
+    limit = _parse_positive_int("limit", arguments, None)
+    routes = data.od_table.aggregate(select_rows(data, arguments))
+    if limit is not None:
+        routes = routes.nlargest(limit, metric)
+    return routes
+
+
+def treemap_query(data, arguments):
+    metric = _parse_metric(data, arguments, default="ASK")
+    top_k = _parse_positive_int("top_k", arguments, TREEMAP_TOP_K)
+    path_columns = [*OD_COLUMNS[data.type], "airline_iata", "acft_icao"]
+    return treemap_hierarchy(
+        data.flights_filter, select_rows(data, arguments), path_columns, metric, top_k=top_k
+    )
+
+
+def distance_query(data, arguments):
+    metric = _parse_metric(data, arguments, default="ASK")
+    rows = select_rows(data, arguments)
+    if rows is None:
+        distance_cube = data.distance_cube
+    else:
+        distance_cube = DistanceCube.from_flights(data.flights_filter.take(rows))
+    if distance_cube.empty:
+        return pd.DataFrame({"distance_min": [], "distance_max": [], metric: []})
+    edges = distance_cube.bin_edges
+    return pd.DataFrame(
+        {
+            "distance_min": edges[:-1],
+            "distance_max": edges[1:],
+            metric: distance_cube.histogram(metric).to_numpy(),
+        }
+    )
+
+
+# endpoint name: (query function, parameters it reads besides the filters)
+QUERIES = {
+    "summary": (summary_query, []),
+    "facets": (facets_query, ["column", "metric"]),
+    "routes": (routes_query, ["metric", "limit"]),
+    "treemap": (treemap_query, ["metric", "top_k"]),
+    "distance": (distance_query, ["metric"]),
+}
+
+
+class _JSONHandler(tornado.web.RequestHandler):
+    def set_default_headers(self):
+        self.set_header("Content-Type", "application/json")
+
+    def write_error(self, status_code, **kwargs):
+        self.finish({"error": self._reason})
+
+
+class DatasetsHandler(_JSONHandler):
+    def initialize(self, datasets):
+        self.datasets = datasets
+
+    def get(self):
+        self.finish(
+            pd.DataFrame(
+                {
+                    "name": list(self.datasets),
+                    "n_flights": [len(data.flights_df) for data in self.datasets.values()],
+                }
+            ).to_json(orient="records")
+        )
+
+
+class QueryHandler(_JSONHandler):
+    def initialize(self, datasets, executor):
+        self.datasets = datasets
+        self.executor = executor
+
+    async def get(self, dataset, endpoint):
+        if dataset not in self.datasets:
+            raise tornado.web.HTTPError(404, reason="Unknown dataset: {}".format(dataset))
+        query, parameters = QUERIES[endpoint]
+        arguments = {
+            name: [value.decode() for value in values]
+            for name, values in self.request.query_arguments.items()
+        }
+        accepted = FILTER_COLUMNS + list(GROUP_FILTERS) + DISTANCE_FILTERS + parameters
+        unknown = [name for name in arguments if name not in accepted]
+        if unknown:
+            raise tornado.web.HTTPError(
+                400, reason="Unknown parameters: {}".format(", ".join(unknown))
+            )
+
+        try:
+            frame = await IOLoop.current().run_in_executor(
+                self.executor, query, self.datasets[dataset], arguments
+            )
+        except QueryError as error:
+            raise tornado.web.HTTPError(400, reason=str(error))
+        # NaN are written as null
+        self.finish(frame.to_json(orient="records", double_precision=15))
+
+
+def make_app(datasets, workers=API_WORKERS):
+    """Tornado application serving the given {name: AeroscopeDataClass}."""
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="aeroscope-api")
+    endpoints = "|".join(QUERIES)
+    return tornado.web.Application(
+        [
+            (r"/api/datasets", DatasetsHandler, dict(datasets=datasets)),
+            (
+                r"/api/([^/]+)/({})".format(endpoints),
+                QueryHandler,
+                dict(datasets=datasets, executor=executor),
+            ),
+        ]
+    )
+
+
+def serve(port=API_PORT, address="", use_opensky_data=False, workers=API_WORKERS):
+    """Load the datasets and serve the API until interrupted."""
+    datasets = {"compilation": load_dataset()}
+    if use_opensky_data:
+        datasets["opensky"] = load_dataset(use_opensky_data=True)
+
+    async def main():
+        make_app(datasets, workers).listen(port, address)
+        _LOGGER.info("AeroSCOPE API listening on port %d", port)
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+
+def _distance_range(arguments):
+    if not any(name in arguments for name in DISTANCE_FILTERS):
+        return None
+    return (
+        _parse_float("distance_min", arguments, 0.0),
+        _parse_float("distance_max", arguments, np.inf),
+    )
+
+
+def _has_filters(arguments):
+    return any(arguments.get(name) for name in FILTER_COLUMNS + list(GROUP_FILTERS))
+
+
+def _parse_bool(name, value):
+    if value.lower() in ("true", "1"):
+        return True
+    if value.lower() in ("false", "0"):
+        return False
+    raise QueryError("{} must be true or false".format(name))
+
+
+def _parse_float(name, arguments, default):
+    if name not in arguments:
+        return default
+    try:
+        return float(arguments[name][-1])
+    except ValueError:
+        raise QueryError("{} must be a number".format(name))
+
+
+def _parse_positive_int(name, arguments, default):
+    if name not in arguments:
+        return default
+    try:
+        value = int(arguments[name][-1])
+    except ValueError:
+        value = 0
+    if value < 1:
+        raise QueryError("{} must be a positive integer".format(name))
+    return value
+
+
+def _parse_metric(data, arguments, default):
+    metric = arguments.get("metric", [default])[-1]
+    # n_flights is only a column of the OpenSky flights
+    metrics = [name for name in METRICS if name in data.flights_df.columns]
+    if metric is not None and metric not in metrics:
+        raise QueryError("metric must be one of {}".format(", ".join(metrics)))
+    return metric
@@ -1,14 +1,18 @@
 import logging
 import os
 import os.path as pth
+import sys
 from argparse import (
     ArgumentDefaultsHelpFormatter,
     ArgumentParser,
     RawDescriptionHelpFormatter,
 )
 
+from aeroscope.core import SHARED_DATA_ENV_VAR
 
 MAIN_NOTEBOOK_NAME = pth.join(pth.dirname(__file__), "AeroSCOPE.ipynb")
+# Pre-warmed kernels of the server mode
+DEFAULT_POOL_SIZE = 2
 
 
 class Main:
@@ -30,6 +34,8 @@ class Main:
         machine = "server" if args.server else "local"
         print(MAIN_NOTEBOOK_NAME)
         if machine == "server":
+            # Kernels inherit the environment: they memory-map the plot files and share one copy
+            os.environ.setdefault(SHARED_DATA_ENV_VAR, "1")
             command = (
                 "voila "
                 "--port=8080 "
@@ -37,6 +43,11 @@ class Main:
                 "--MappingKernelManager.cull_idle_timeout=7200 "
                 """--VoilaConfiguration.file_whitelist="['.*\.(png|jpg|gif|xlsx|ico|pdf|json|zip)']" """
             )
+            if args.pool_size > 0:
+                # Voila keeps pool_size kernels with the notebook already executed (plot files
+                # loaded, interface built): a visitor gets one of them, the pool is refilled in
+                # the background
+                command += "--preheat_kernel=True --pool_size={} ".format(args.pool_size)
         else:
             command = (
                 "voila "
@@ -45,6 +56,59 @@ class Main:
 
         os.system(command + str(MAIN_NOTEBOOK_NAME))
 
+    @staticmethod
+    def _serve_api(args):
+        """Serve the datasets as a JSON API, without notebook kernels."""
+        # Several API processes behind a load balancer share one copy of the memory-mapped data
+        os.environ.setdefault(SHARED_DATA_ENV_VAR, "1")
+        # Same environment as the notebook: flat imports and plot files relative to its folder
+        os.chdir(pth.dirname(MAIN_NOTEBOOK_NAME))
+        sys.path.insert(0, pth.dirname(MAIN_NOTEBOOK_NAME))
+        from api import serve
+
+        # Defaults of serve (API_PORT, API_WORKERS) unless given
+        options = {
+            name: getattr(args, name)
+            for name in ("port", "workers")
+            if getattr(args, name) is not None
+        }
+        serve(use_opensky_data=args.opensky, **options)
+
+    @staticmethod
+    def _bench(args):
+        """Time loading, filtering and plotting on synthetic data, write json results."""
+        # Flat imports of the notebook modules
+        sys.path.insert(0, pth.dirname(MAIN_NOTEBOOK_NAME))
+        from bench import run_bench, write_results
+
+        results = run_bench(
+            scales=args.scales,
+            repeat=args.repeat,
+            data_dir=args.data_dir,
+            opensky=not args.no_opensky,
+        )
+        write_results(results, args.output)
+
+    @staticmethod
+    def _preprocess(args):
+        """Rebuild the plot files of a dataset from its raw flights csv."""
+        # Flat imports of the notebook modules
+        sys.path.insert(0, pth.dirname(MAIN_NOTEBOOK_NAME))
+        from preprocess import preprocess
+
+        directory = args.output_dir or pth.join(
+            pth.dirname(MAIN_NOTEBOOK_NAME), "plot_files_os" if args.opensky else "plot_files"
+        )
+        preprocess(
+            args.source,
+            directory=directory,
+            opensky=args.opensky,
+            countries=args.countries,
+            chunksize=args.chunksize,
+            workers=args.workers,
+            build_cache=not args.no_cache,
+        )
+
     # ENTRY POINT ==================================================================================
     def run(self):
         """Main function."""
@@ -62,14 +126,133 @@ class Main:
             action="store_true",
             help="to be used if ran on server",
         )
+        parser_run.add_argument(
+            "--pool-size",
+            type=int,
+            default=DEFAULT_POOL_SIZE,
+            help="number of pre-warmed kernels kept ready for new visitors in server mode "
+            "(0 to start a kernel per visitor)",
+        )
         parser_run.set_defaults(func=self._run)
 
+        # sub-command for serving the JSON API ---------------------------------
+        parser_api = subparsers.add_parser(
+            "serve-api",
+            help="serve the AeroSCOPE datasets as a JSON API",
+            description="serve the AeroSCOPE datasets as a JSON API",
+        )
+
+        parser_api.add_argument(
+            "--port",
+            type=int,
+            default=None,
+            help="port the API listens on (API_PORT of api.py by default)",
+        )
+        parser_api.add_argument(
+            "--opensky",
+            action="store_true",
+            help="also load and serve the OpenSky dataset",
+        )
+        parser_api.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="number of threads running the queries (API_WORKERS of api.py by default)",
+        )
+        parser_api.set_defaults(func=self._serve_api)
+
+        # sub-command for benchmarking -----------------------------------------
+        parser_bench = subparsers.add_parser(
+            "bench",
+            help="benchmark AeroSCOPE on synthetic data",
+            description="benchmark AeroSCOPE on synthetic data, results are written as json",
+        )
+
+        parser_bench.add_argument(
+            "--scales",
+            type=int,
+            nargs="+",
+            default=[1, 10, 100],
+            help="sizes of the synthetic datasets, as multiples of the base size",
+        )
+        parser_bench.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="number of runs of each measure",
+        )
+        parser_bench.add_argument(
+            "--output",
+            default=None,
+            help="json file of the results (standard output by default)",
+        )
+        parser_bench.add_argument(
+            "--data-dir",
+            default=None,
+            help="folder of the synthetic files, kept and reused by the next runs "
+            "(temporary folder by default)",
+        )
+        parser_bench.add_argument(
+            "--no-opensky",
+            action="store_true",
+            help="only benchmark the compilation dataset",
+        )
+        parser_bench.set_defaults(func=self._bench)
+
+        # sub-command for preprocessing ----------------------------------------
+        parser_preprocess = subparsers.add_parser(
+            "preprocess",
+            help="rebuild the plot files from a raw flights csv",
+            description="rebuild the plot files (aggregates, flights_df.zip and their cache) "
+            "from a raw flights csv, read in chunks by a pool of processes",
+        )
+
+        parser_preprocess.add_argument(
+            "source",
+            help="raw csv, one row per flight with the columns of flights_df",
+        )
+        parser_preprocess.add_argument(
+            "--opensky",
+            action="store_true",
+            help="the source is OpenSky data (with n_flights)",
+        )
+        parser_preprocess.add_argument(
+            "--output-dir",
+            default=None,
+            help="folder of the plot files (plot_files or plot_files_os of the app by default)",
+        )
+        parser_preprocess.add_argument(
+            "--countries",
+            default=None,
+            help="csv of the country reference: country, country_name, ISO3, lat, lon, color "
+            "(taken from the country files of the output folder by default)",
+        )
+        parser_preprocess.add_argument(
+            "--chunksize",
+            type=int,
+            default=500000,
+            help="number of rows read at a time",
+        )
+        parser_preprocess.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="number of worker processes (all the cores by default)",
+        )
+        parser_preprocess.add_argument(
+            "--no-cache",
+            action="store_true",
+            help="do not build the columnar cache of the written files",
+        )
+        parser_preprocess.set_defaults(func=self._preprocess)
+
         # Parse ------------------------------------------------------------------------------------
         args = self.parser.parse_args()
-        try:
-            args.func(args)
-        except AttributeError:
+        # Without sub-command: errors raised by the sub-commands are not caught
+        if not hasattr(args, "func"):
             self.parser.print_help()
+            return
+        args.func(args)
 
 
 def main():
@@ -0,0 +1,560 @@
+"""
+Benchmarks of AeroSCOPE (`aeroscope bench`).
+
+Synthetic plot files shaped like the real ones (same files, columns and dtypes, aggregates
+computed from the synthetic flights) are written at several scales: scale 10 has ten times the
+flights of scale 1, and more airports and countries. For each scale and dataset type, the bench
+times:
+
+- load: csv parsing (cache built), cached reading and the build of each engine;
+- filter: every filter of the detailed and AeroMAPS tabs, set then cleared on the tab itself
+  (selection, filter items, table and plots, as on a click);
+- plot: every function of the *_level_plots modules on the inputs the tabs give them, then the
+  json serialisation of the figure and its size.
+
+Each measure is repeated, the results are json records (median and min seconds) that can be
+diffed between versions.
+"""
+
+import contextlib
+import importlib
+import inspect
+import io
+import json
+import logging
+import math
+import os
+import os.path as pth
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+import figure_output
+from columnar_cache import cache_dir_for
+from datasets import load_compiled_data, load_opensky_data
+from distance_cube import DistanceCube
+from filter_engine import FilterEngine
+from figure_cache import FIGURE_CACHE
+from od_table import OD_COLUMNS, ODTable
+from range_summary import RangeSummary
+from regional_groups import RegionalGroups
+from treemap_hierarchy import treemap_hierarchy
+
+_LOGGER = logging.getLogger(__name__)
+
+BENCH_SCALES = [1, 10, 100]
+BENCH_REPEAT = 3
+
+# Size of the scale 1 dataset, airports and countries grow as the square root of the scale
+BASE_FLIGHTS = 50000
+BASE_AIRPORTS = 1000
+BASE_COUNTRIES = 230
+N_AIRLINES = 500
+N_AIRCRAFT = 120
+
+CONTINENTS = {
+    "AF": ("Africa", 17.7578122, 11.5024338),
+    "AS": ("Asia", 89.2343748, 51.2086975),
+    "EU": ("Europe", 15.2551187, 54.5259614),
+    "NA": ("North America", -105.2551187, 54.5259614),
+    "OC": ("Oceania", 140.0188, -22.7359),
+    "SA": ("South America", -55.4915, -8.7832),
+}
+PLOT_FILES = [
+    "continental_flows.csv",
+    "continental_flows_non_dir.csv",
+    "conti_scatter.csv",
+    "country_flows.csv",
+    "country_fixed.csv",
+    "flights_df.zip",
+]
+PLOT_MODULES = [
+    "continental_level_plots",
+    "country_level_plots",
+    "flight_level_plots",
+    "pax_level_plots",
+]
+
+
+def run_bench(scales=BENCH_SCALES, repeat=BENCH_REPEAT, data_dir=None, opensky=True):
+    """
+    Results of the bench: {"environment": ..., "results": [records]}.
+
+    Synthetic files are written in data_dir (kept, and reused by the next runs), in a temporary
+    folder when None.
+    """
+    results = []
+    with contextlib.ExitStack() as stack:
+        if data_dir is None:
+            data_dir = stack.enter_context(tempfile.TemporaryDirectory(prefix="aeroscope-bench"))
+        for scale in scales:
+            for dataset_type in ["compilation", "opensky"] if opensky else ["compilation"]:
+                directory = pth.join(data_dir, "{}_x{}".format(dataset_type, scale))
+                if not pth.exists(pth.join(directory, "flights_df.zip")):
+                    _LOGGER.info("Writing synthetic %s files, scale %d", dataset_type, scale)
+                    write_synthetic_plot_files(directory, scale, opensky=dataset_type == "opensky")
+                bench = _Bench(scale, dataset_type, repeat)
+                data = bench.load(directory)
+                bench.filters(data)
+                bench.plots(data)
+                results.extend(bench.results)
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "repeat": repeat,
+            "base_flights": BASE_FLIGHTS,
+        },
+        "results": results,
+    }
+
+
+def write_synthetic_plot_files(directory, scale=1, opensky=False, seed=0):
+    """Write the six plot files of a synthetic dataset of BASE_FLIGHTS * scale flights."""
+    rng = np.random.default_rng(seed)
+    growth = math.ceil(math.sqrt(scale))
+    flights_df = _synthetic_flights(rng, BASE_FLIGHTS * scale, growth, opensky)
+    metrics = ["Seats", "ASK", "fuel_burn", "CO2 (kg)"] + (["n_flights"] if opensky else [])
+
+    os.makedirs(directory, exist_ok=True)
+    frames = _aggregates(flights_df, metrics)
+    for name, frame in frames.items():
+        frame.to_csv(pth.join(directory, name + ".csv"))
+    flights_df.to_csv(pth.join(directory, "flights_df.zip"), compression="zip")
+
+
+def _synthetic_flights(rng, n_flights, growth, opensky):
+    n_countries = BASE_COUNTRIES * growth
+    n_airports = BASE_AIRPORTS * growth
+    continent_codes = np.array(list(CONTINENTS))
+
+    country_codes = np.array(["C{:04d}".format(i) for i in range(n_countries)])
+    country_continents = rng.choice(continent_codes, n_countries)
+    # A few large countries and airports, as in the real data
+    airport_countries = rng.choice(n_countries, n_airports, p=_long_tail(n_countries))
+    airport_lon = rng.uniform(-180, 180, n_airports)
+    airport_lat = rng.uniform(-60, 70, n_airports)
+    airport_codes = np.array(["A{:04d}".format(i) for i in range(n_airports)])
+
+    departure = rng.choice(n_airports, n_flights, p=_long_tail(n_airports))
+    arrival = rng.choice(n_airports, n_flights, p=_long_tail(n_airports))
+    departure_country = airport_countries[departure]
+    arrival_country = airport_countries[arrival]
+    distance = _great_circle(
+        airport_lon[departure], airport_lat[departure], airport_lon[arrival], airport_lat[arrival]
+    )
+    distance = np.maximum(distance, 50)
+
+    seats = rng.uniform(50, 400, n_flights) * rng.integers(1, 800, n_flights)
+    ask = seats * distance
+    fuel_burn = ask * rng.uniform(0.02, 0.04, n_flights)
+    flights_df = pd.DataFrame(
+        {
+            "iata_departure": airport_codes[departure],
+            "iata_arrival": airport_codes[arrival],
+            "airline_iata": rng.choice(
+                ["L{:03d}".format(i) for i in range(N_AIRLINES)],
+                n_flights,
+                p=_long_tail(N_AIRLINES),
+            ),
+            "acft_icao": rng.choice(
+                ["T{:03d}".format(i) for i in range(N_AIRCRAFT)],
+                n_flights,
+                p=_long_tail(N_AIRCRAFT),
+            ),
+            "acft_class": rng.choice(["Regional", "Narrow Body", "Wide Body", "Other"], n_flights),
+            "departure_country": country_codes[departure_country],
+            "departure_country_name": np.char.add("Country ", country_codes[departure_country]),
+            "arrival_country": country_codes[arrival_country],
+            "arrival_country_name": np.char.add("Country ", country_codes[arrival_country]),
+            "departure_continent": country_continents[departure_country],
+            "arrival_continent": country_continents[arrival_country],
+            "departure_lon": airport_lon[departure],
+            "departure_lat": airport_lat[departure],
+            "arrival_lon": airport_lon[arrival],
+            "arrival_lat": airport_lat[arrival],
+            "distance_km": distance,
+            "Seats": seats,
+            "ASK": ask,
+            "fuel_burn": fuel_burn,
+            "CO2 (kg)": fuel_burn * 3.16,
+        }
+    )
+    continent_names = {code: values[0] for code, values in CONTINENTS.items()}
+    flights_df["departure_continent_name"] = flights_df["departure_continent"].map(continent_names)
+    flights_df["arrival_continent_name"] = flights_df["arrival_continent"].map(continent_names)
+    flights_df["domestic"] = departure_country == arrival_country
+    if opensky:
+        flights_df["origin"] = np.char.add("K", flights_df["iata_departure"].to_numpy().astype(str))
+        flights_df["dest"] = np.char.add("K", flights_df["iata_arrival"].to_numpy().astype(str))
+        flights_df["n_flights"] = rng.integers(1, 400, n_flights)
+    _add_scaled_metrics(flights_df)
+    return flights_df
+
+
+def _aggregates(flights_df, metrics):
+    # Aggregated plot files of the flights, with the columns of the real ones
+    sides = [
+        flights_df[
+            [side + "_country", side + "_country_name", side + "_lat", side + "_lon"]
+        ].set_axis(["country", "departure_country_name", "departure_lat", "departure_lon"], axis=1)
+        for side in ["departure", "arrival"]
+    ]
+    countries = (
+        pd.concat(sides)
+        .groupby("country")
+        .agg(
+            departure_country_name=("departure_country_name", "first"),
+            departure_lat=("departure_lat", "mean"),
+            departure_lon=("departure_lon", "mean"),
+        )
+    )
+    countries["departure_ISO3"] = countries.index.str.replace("C", "X")
+    countries["color"] = [
+        "#{:06X}".format(value)
+        for value in np.random.default_rng(1).integers(0, 2**24, len(countries))
+    ]
+
+    country_flows = (
+        flights_df.groupby(["departure_country", "arrival_country"])[metrics].sum().reset_index()
+    )
+    for side in ["departure", "arrival"]:
+        country = countries.loc[country_flows[side + "_country"]]
+        country_flows[side + "_country_name"] = country["departure_country_name"].to_numpy()
+        country_flows[side + "_ISO3"] = country["departure_ISO3"].to_numpy()
+        country_flows[side + "_lat"] = country["departure_lat"].to_numpy()
+        country_flows[side + "_lon"] = country["departure_lon"].to_numpy()
+    country_flows["color"] = countries.loc[country_flows["departure_country"], "color"].to_numpy()
+    _add_scaled_metrics(country_flows)
+
+    country_fixed = flights_df.groupby("departure_country").agg(
+        **{metric: (metric, "sum") for metric in metrics}, domestic=("domestic", "mean")
+    )
+    country_fixed = country_fixed.join(
+        countries[["departure_country_name", "departure_ISO3", "departure_lat", "departure_lon"]]
+    ).reset_index()
+    _add_scaled_metrics(country_fixed)
+
+    continent_coordinates = pd.DataFrame.from_dict(
+        CONTINENTS, orient="index", columns=["name", "lon", "lat"]
+    )
+    flights_df = flights_df.assign(
+        inside=flights_df["departure_continent"] == flights_df["arrival_continent"]
+    )
+    conti_scatter = (
+        flights_df.groupby(["departure_continent", "departure_continent_name", "inside"])[metrics]
+        .sum()
+        .reset_index()
+    )
+    conti_scatter["dep_lon"] = continent_coordinates.loc[
+        conti_scatter["departure_continent"], "lon"
+    ].to_numpy()
+    conti_scatter["dep_lat"] = continent_coordinates.loc[
+        conti_scatter["departure_continent"], "lat"
+    ].to_numpy()
+    _add_scaled_metrics(conti_scatter)
+
+    continental_flows = (
+        flights_df.groupby(
+            [
+                "departure_continent",
+                "departure_continent_name",
+                "arrival_continent",
+                "arrival_continent_name",
+            ]
+        )[metrics]
+        .sum()
+        .reset_index()
+    )
+    _add_continent_coordinates(continental_flows, continent_coordinates)
+    _add_scaled_metrics(continental_flows)
+
+    # Undirected continent pairs
+    pairs = np.sort(flights_df[["departure_continent", "arrival_continent"]].to_numpy(), axis=1)
+    continental_flows_non_dir = (
+        flights_df[metrics]
+        .groupby([pairs[:, 0], pairs[:, 1]])
+        .sum()
+        .rename_axis(["AV1", "AV2"])
+        .reset_index()
+    )
+    continental_flows_non_dir.insert(
+        0,
+        "group_col",
+        [
+            str(pair)
+            for pair in zip(continental_flows_non_dir["AV1"], continental_flows_non_dir["AV2"])
+        ],
+    )
+    _add_continent_coordinates(
+        continental_flows_non_dir, continent_coordinates, columns=("AV1", "AV2")
+    )
+    _add_scaled_metrics(continental_flows_non_dir)
+
+    return {
+        "continental_flows": continental_flows,
+        "continental_flows_non_dir": continental_flows_non_dir,
+        "conti_scatter": conti_scatter,
+        "country_flows": country_flows,
+        "country_fixed": country_fixed,
+    }
+
+
+class _Bench:
+    def __init__(self, scale, dataset_type, repeat):
+        self.scale = scale
+        self.dataset_type = dataset_type
+        self.repeat = repeat
+        self.results = []
+
+    def measure(self, stage, name, function, setup=None, **extra):
+        """Time function() repeat times (setup() untimed before each run), return its result."""
+        times = []
+        for _ in range(self.repeat):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            result = function()
+            times.append(time.perf_counter() - start)
+        self.record(stage, name, times, **extra)
+        return result
+
+    def record(self, stage, name, times, **extra):
+        self.results.append(
+            {
+                "scale": self.scale,
+                "dataset": self.dataset_type,
+                "stage": stage,
+                "name": name,
+                "median_s": statistics.median(times),
+                "min_s": min(times),
+                **extra,
+            }
+        )
+        _LOGGER.info(
+            "x%-4d %-12s %-7s %-70s %9.4f s", self.scale, self.dataset_type, stage, name, min(times)
+        )
+
+    def load(self, directory):
+        load = load_opensky_data if self.dataset_type == "opensky" else load_compiled_data
+
+        def clear_caches():
+            for file_name in PLOT_FILES:
+                shutil.rmtree(cache_dir_for(pth.join(directory, file_name)), ignore_errors=True)
+
+        self.measure("load", "plot files (csv)", lambda: load(directory), setup=clear_caches)
+        data = self.measure("load", "plot files (cache)", lambda: load(directory))
+        n_flights = len(data.flights_df)
+
+        data.flights_filter = self.measure(
+            "load", "FilterEngine", lambda: FilterEngine(data.flights_df), rows=n_flights
+        )
+        data.distance_cube = self.measure(
+            "load",
+            "DistanceCube",
+            lambda: DistanceCube.from_flights(data.flights_df),
+            rows=n_flights,
+        )
+        data.regional_groups = self.measure(
+            "load", "RegionalGroups", lambda: RegionalGroups(data), rows=n_flights
+        )
+        data.od_table = self.measure(
+            "load",
+            "ODTable",
+            lambda: ODTable(data.flights_filter, *OD_COLUMNS[data.type]),
+            rows=n_flights,
+        )
+        data.range_summary = self.measure(
+            "load", "RangeSummary", lambda: RangeSummary(data.flights_filter), rows=n_flights
+        )
+        return data
+
+    def filters(self, data):
+        # Outside of a kernel, displaying a figure pretty-prints the whole FigureWidget repr,
+        # which would take most of the measured time: the figures are built, not displayed
+        no_display = mock.patch.object(figure_output, "display", lambda *args, **kwargs: None)
+        with contextlib.redirect_stdout(io.StringIO()), no_display:
+            from aeromaps_front import AeroMAPSTab
+            from detailled_front import DetailledTab, DetailledTab_OS
+
+            if self.dataset_type == "opensky":
+                tabs = {"DetailledTab_OS": DetailledTab_OS(data)}
+            else:
+                tabs = {"DetailledTab": DetailledTab(data), "AeroMAPSTab": AeroMAPSTab(data)}
+
+            for tab_name, tab in tabs.items():
+                for column, autocomplete in tab.facet_autocompletes.items():
+                    value = _most_frequent(data, column)
+                    self._time_filter(tab_name, column, autocomplete, [value], [])
+                if hasattr(tab, "range_slider"):
+                    full_range = list(tab.range_slider.v_model)
+                    self._time_filter(
+                        tab_name, "distance_km", tab.range_slider, [500, 4000], full_range
+                    )
+
+    def _time_filter(self, tab_name, column, widget, value, cleared):
+        # Setting the widget runs the whole update of the tab, figures are built again each time
+        set_times, clear_times = [], []
+        for _ in range(self.repeat):
+            FIGURE_CACHE.clear()
+            start = time.perf_counter()
+            widget.v_model = value
+            set_times.append(time.perf_counter() - start)
+            FIGURE_CACHE.clear()
+            start = time.perf_counter()
+            widget.v_model = cleared
+            clear_times.append(time.perf_counter() - start)
+        self.record("filter", "{} {} set".format(tab_name, column), set_times)
+        self.record("filter", "{} {} clear".format(tab_name, column), clear_times)
+
+    def plots(self, data):
+        inputs = _plot_inputs(data)
+        for module_name in PLOT_MODULES:
+            module = importlib.import_module(module_name)
+            for name, function in inspect.getmembers(module, inspect.isfunction):
+                if function.__module__ != module_name or name == "formatter":
+                    continue
+                arguments = PLOT_ARGUMENTS[data.type].get(name, PLOT_ARGUMENTS["any"].get(name))
+                if arguments is None:
+                    if not any(name in table for table in PLOT_ARGUMENTS.values()):
+                        _LOGGER.warning("No bench inputs for %s.%s, skipped", module_name, name)
+                    continue
+                qualified_name = "{}.{}".format(module_name, name)
+                # Arguments are copied: some plots sort their input in place
+                fig = self.measure(
+                    "plot",
+                    qualified_name,
+                    lambda: function(*[_copy(inputs[argument]) for argument in arguments]),
+                )
+                fig_json = self.measure("plot", qualified_name + " to_json", fig.to_json)
+                self.results[-1]["json_bytes"] = len(fig_json.encode())
+
+
+# Inputs of each plot function, by dataset type ("any" for both), as given by the tabs
+PLOT_ARGUMENTS = {
+    "any": {
+        "continental_treemap_plot": ["continental_flows", "metric_mt"],
+        "distance_histogram_plot_continent": ["distance_cube", "metric_mt"],
+        "continental_map_plot": ["conti_scatter", "continental_flows_non_dir", "metric_mt"],
+        "countries_map_plot": ["country_flows_selection", "metric"],
+        "distance_share_country": ["selection_cube", "metric"],
+        "distance_share_dom_int_country": ["selection_cube", "metric"],
+        "countries_global_plot": ["country_fixed", "metric"],
+        "countries_treemap_plot": ["country_flows_selection", "metric"],
+        "distance_histogram_plot_country": ["selection_cube", "metric"],
+        "aircraft_pie": ["flights_selection", "metric"],
+        "aircraft_class_pie": ["flights_selection", "metric"],
+        "aircraft_user_pie": ["flights_selection", "metric"],
+        "dom_share_pie": ["flights_selection", "metric"],
+        "distance_histogram_plot_flights": ["selection_cube", "metric"],
+        "distance_share_flights": ["selection_cube", "metric"],
+        "distance_share_dom_int_flights": ["selection_cube", "metric"],
+        "aircraft_pie_flights": ["flights_selection", "metric"],
+        "aircraft_user_pie_flights": ["flights_selection", "metric"],
+        "aircraft_class_pie_flights": ["flights_selection", "metric"],
+        "dom_share_pie_flights": ["flights_selection", "metric"],
+    },
+    "compilation": {
+        "distance_cumul_plot_country": ["selection_cube"],
+        "distance_cumul_plot_flights": ["selection_cube"],
+        "flights_map_plot": ["routes_selection", "metric"],
+        "flights_treemap_plot": ["treemap_selection", "metric"],
+        "pax_map_plot": ["pax_routes"],
+    },
+    "opensky": {
+        "distance_cumul_plot_country_OS": ["selection_cube"],
+        "distance_cumul_plot_flights_OS": ["selection_cube"],
+        "flights_map_plot_OS": ["routes_selection", "metric"],
+        "flights_treemap_plot_OS": ["treemap_selection", "metric"],
+    },
+}
+
+
+def _plot_inputs(data):
+    # Selection of the most frequent departure country (country tab) and airport (other tabs)
+    flights_filter = data.flights_filter
+    departure_column = OD_COLUMNS[data.type][0]
+    country = _most_frequent(data, "departure_country_name")
+    country_rows = flights_filter.rows("departure_country_name", [country])
+    airport_rows = flights_filter.rows(departure_column, [_most_frequent(data, departure_column)])
+    flights_selection = flights_filter.take(country_rows)
+
+    pax_routes = data.od_table.aggregate(airport_rows)
+    pax_routes["Pax CO2"] = pax_routes["CO2 (kg)"] / pax_routes["Seats"]
+    return {
+        "metric": "CO2 (kg)",
+        "metric_mt": "CO2 (Mt)",
+        "continental_flows": data.continental_flows,
+        "continental_flows_non_dir": data.continental_flows_non_dir,
+        "conti_scatter": data.conti_scatter,
+        "country_fixed": data.country_fixed,
+        "country_flows_selection": data.regional_groups.country_flows_df([country]),
+        "distance_cube": data.distance_cube,
+        "selection_cube": DistanceCube.from_flights(flights_selection),
+        "flights_selection": flights_selection,
+        "routes_selection": data.od_table.aggregate(country_rows),
+        "treemap_selection": treemap_hierarchy(
+            flights_filter,
+            country_rows,
+            [*OD_COLUMNS[data.type], "airline_iata", "acft_icao"],
+            "CO2 (kg)",
+        ),
+        "pax_routes": pax_routes,
+    }
+
+
+def _most_frequent(data, column):
+    counts = data.flights_filter.facets([column])[column]
+    return counts.index[np.argmax(counts.to_numpy())]
+
+
+def _copy(value):
+    return value.copy() if isinstance(value, pd.DataFrame) else value
+
+
+def _long_tail(n):
+    weights = 1 / np.arange(1, n + 1)
+    return weights / weights.sum()
+
+
+def _great_circle(lon1, lat1, lon2, lat2):
+    lon1, lat1, lon2, lat2 = map(np.radians, (lon1, lat1, lon2, lat2))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * 6371 * np.arcsin(np.sqrt(a))
+
+
+def _add_scaled_metrics(frame):
+    frame["CO2 (Mt)"] = frame["CO2 (kg)"] / 1e9
+    frame["ASK (Bn)"] = frame["ASK"] / 1e9
+    frame["Seats (Mn)"] = frame["Seats"] / 1e6
+
+
+def _add_continent_coordinates(frame, continent_coordinates, columns=None):
+    departure, arrival = columns or ("departure_continent", "arrival_continent")
+    frame["dep_lon"] = continent_coordinates.loc[frame[departure], "lon"].to_numpy()
+    frame["dep_lat"] = continent_coordinates.loc[frame[departure], "lat"].to_numpy()
+    frame["arr_lon"] = continent_coordinates.loc[frame[arrival], "lon"].to_numpy()
+    frame["arr_lat"] = continent_coordinates.loc[frame[arrival], "lat"].to_numpy()
+
+
+def write_results(results, output=None):
+    """Write the results as json to output (a path), or to the standard output when None."""
+    content = json.dumps(results, indent=1)
+    if output is None:
+        print(content)
+    else:
+        with open(output, "w", encoding="utf-8") as file:
+            file.write(content + "\n")
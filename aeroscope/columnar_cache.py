@@ -0,0 +1,291 @@
+"""
+Build-once binary cache for the large plot files.
+
+Parsing the zipped flight-level csv dominates the start-up time of every kernel. The first
+reader stores the parsed frame as one .npy file per column (text columns are stored as integer
+codes plus their categories), the following ones only load these binary columns. The cache
+sits next to the source file and is keyed on the source content hash, the source mtime being
+used to avoid hashing the file again at each start.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import os.path as pth
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+_LOGGER = logging.getLogger(__name__)
+
+CACHE_FORMAT_VERSION = 1
+
+# Major pandas versions whose BlockManager keeps a frame flagged as consolidated as is
+_UNCONSOLIDATED_PANDAS_VERSIONS = (1, 2)
+
+_SOURCE_FILE = "source.json"
+_META_FILE = "meta.json"
+
+
+def read_csv_cached(
+    source_path,
+    mmap_mode=None,
+    dtypes=None,
+    transform=None,
+    transform_version=None,
+    **read_csv_kwargs,
+):
+    """
+    Drop-in replacement of pd.read_csv(source_path, **read_csv_kwargs) backed by the cache.
+
+    The csv is only parsed when the cache is missing or stale (source modified, different
+    parsing options or cache format). Any problem with the cache (read-only folder, column
+    types that cannot be stored...) falls back to the plain csv reading.
+
+    dtypes ({column: dtype}) is applied after parsing and before caching, columns absent from
+    the file are ignored. The memory gained per column is logged when the cache is built.
+
+    transform (frame -> frame) is applied last, before caching, to store derived columns. Its
+    code is not part of the cache key: transform_version is, bump it whenever what the transform
+    computes changes so that the caches built before are rebuilt.
+
+    With mmap_mode="r", numeric and categorical columns are memory-mapped read-only from the
+    cache files instead of being loaded: all the processes reading the same cache then share
+    one physical copy of these columns through the OS page cache. Text columns stored as
+    "object" are still materialised in each process.
+    """
+    cache_dir = cache_dir_for(source_path)
+    try:
+        data_dir = pth.join(
+            cache_dir,
+            _cache_key(
+                source_path,
+                cache_dir,
+                dict(
+                    read_csv_kwargs,
+                    dtypes=dtypes,
+                    transform=_qualified_name(transform),
+                    transform_version=transform_version,
+                ),
+            ),
+        )
+        if pth.isfile(pth.join(data_dir, _META_FILE)):
+            return load_frame(data_dir, mmap_mode=mmap_mode)
+    except (OSError, ValueError, KeyError) as exc:
+        _LOGGER.warning("Ignoring unreadable cache for %s (%s)", source_path, exc)
+        data_dir = None
+
+    df = pd.read_csv(source_path, **read_csv_kwargs)
+    if dtypes:
+        parsed_df = df
+        df = df.astype({name: dtype for name, dtype in dtypes.items() if name in df.columns})
+        report = memory_report(parsed_df, df)
+        del parsed_df
+        _LOGGER.info(
+            "Memory usage of %s with compact dtypes: %.1f MB -> %.1f MB\n%s",
+            source_path,
+            report["bytes_before"].sum() / 1e6,
+            report["bytes_after"].sum() / 1e6,
+            report.to_string(),
+        )
+    if transform is not None:
+        df = transform(df)
+
+    if data_dir is not None:
+        try:
+            _store_atomic(df, cache_dir, data_dir)
+            if mmap_mode is not None:
+                # Drop the parsed copy so that the first process shares the data as well
+                return load_frame(data_dir, mmap_mode=mmap_mode)
+        except (OSError, TypeError, ValueError) as exc:
+            _LOGGER.warning("Could not build cache for %s (%s)", source_path, exc)
+    return df
+
+
+def cache_dir_for(source_path):
+    """Cache folder of a source file: plot_files/flights_df.zip -> plot_files/flights_df.cache"""
+    return pth.splitext(source_path)[0] + ".cache"
+
+
+def memory_report(before, after):
+    """Bytes used by each column of a frame before and after a dtype conversion."""
+    report = pd.DataFrame(
+        {
+            "dtype_before": before.dtypes.astype(str),
+            "bytes_before": before.memory_usage(index=False, deep=True),
+            "dtype_after": after.dtypes.astype(str),
+            "bytes_after": after.memory_usage(index=False, deep=True),
+        }
+    )
+    report["ratio"] = report["bytes_before"] / report["bytes_after"]
+    return report
+
+
+def load_frame(data_dir, mmap_mode=None):
+    """
+    Rebuild a DataFrame stored by store_frame.
+
+    The frame is built with copy=False so that memory-mapped columns are wrapped, not copied.
+    """
+    with open(pth.join(data_dir, _META_FILE)) as f:
+        meta = json.load(f)
+
+    columns = {entry["name"]: _decode(data_dir, entry, mmap_mode) for entry in meta["columns"]}
+    index = _decode(data_dir, meta["index"], mmap_mode)
+    df = pd.DataFrame(columns, index=pd.Index(index, name=meta["index"]["name"]), copy=False)
+    if mmap_mode is not None and not _keep_unconsolidated(df):
+        # Shared mode is on but each process will end up with its own copy of the columns
+        _LOGGER.warning(
+            "pandas %s: the memory-mapped columns of %s will be copied in each process",
+            pd.__version__,
+            data_dir,
+        )
+    return df
+
+
+def _keep_unconsolidated(df):
+    """
+    Keep the memory-mapped columns of df in their own blocks, return whether it could be done.
+
+    pandas merges same-dtype columns into 2D blocks on the first filtering, which would copy the
+    memory-mapped columns into private memory: the frame is flagged as already consolidated.
+    These flags are private to the BlockManager, they are only set on the pandas versions known
+    to honour them. Otherwise the frame is left as is: the data stays correct, each process
+    simply ends up with its own copy of the columns.
+    """
+    manager = df._mgr
+    if int(pd.__version__.split(".")[0]) not in _UNCONSOLIDATED_PANDAS_VERSIONS or not all(
+        hasattr(manager, name) for name in ("_known_consolidated", "_is_consolidated")
+    ):
+        return False
+    manager._known_consolidated = True
+    manager._is_consolidated = True
+    return True
+
+
+def store_frame(df, data_dir):
+    """Store a DataFrame as one .npy file per column and a json description."""
+    meta = {
+        "version": CACHE_FORMAT_VERSION,
+        "index": _encode(data_dir, "index", df.index.name, pd.Series(df.index)),
+        "columns": [
+            _encode(data_dir, "col_{:03d}".format(i), name, df.iloc[:, i])
+            for i, name in enumerate(df.columns)
+        ],
+    }
+    with open(pth.join(data_dir, _META_FILE), "w") as f:
+        json.dump(meta, f)
+
+
+def _cache_key(source_path, cache_dir, read_csv_kwargs):
+    options = json.dumps(read_csv_kwargs, sort_keys=True, default=str)
+    key = hashlib.sha256((_source_digest(source_path, cache_dir) + options).encode())
+    return "v{}-{}".format(CACHE_FORMAT_VERSION, key.hexdigest()[:16])
+
+
+def _qualified_name(function):
+    if function is None:
+        return None
+    return "{}.{}".format(function.__module__, function.__qualname__)
+
+
+def _source_digest(source_path, cache_dir):
+    """Content hash of the source, only recomputed when its mtime or size changed."""
+    stat = os.stat(source_path)
+    record_path = pth.join(cache_dir, _SOURCE_FILE)
+    try:
+        with open(record_path) as f:
+            record = json.load(f)
+        if record["mtime_ns"] == stat.st_mtime_ns and record["size"] == stat.st_size:
+            return record["sha256"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    sha = hashlib.sha256()
+    with open(source_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    record = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": sha.hexdigest()}
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        _write_json_atomic(record, record_path)
+    except OSError:
+        # Read-only install: the hash is recomputed at each start, the cache is simply not built
+        pass
+    return record["sha256"]
+
+
+def _store_atomic(df, cache_dir, data_dir):
+    """Build the cache in a temporary folder and move it in place in one step."""
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=cache_dir)
+    try:
+        store_frame(df, tmp_dir)
+        os.rename(tmp_dir, data_dir)
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if not pth.isfile(pth.join(data_dir, _META_FILE)):
+            raise
+        # Another kernel built the same cache in the meantime
+        return
+
+    # Remove caches of previous versions of the source file
+    for name in os.listdir(cache_dir):
+        path = pth.join(cache_dir, name)
+        if path != data_dir and pth.isdir(path) and not name.startswith("."):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _write_json_atomic(content, path):
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=pth.dirname(path))
+    with os.fdopen(fd, "w") as f:
+        json.dump(content, f)
+    os.replace(tmp_path, path)
+
+
+def _encode(data_dir, file_name, name, series):
+    entry = {"name": name, "file": file_name + ".npy"}
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        entry["kind"] = "category"
+        entry["categories"] = series.cat.categories.tolist()
+        entry["ordered"] = bool(series.cat.ordered)
+        values = series.cat.codes.to_numpy()
+    elif series.dtype == object:
+        entry["kind"] = "object"
+        codes, uniques = pd.factorize(series)
+        entry["categories"] = uniques.tolist()
+        values = codes.astype(_smallest_code_dtype(len(uniques)))
+    elif isinstance(series.dtype, np.dtype) and series.dtype.kind in "biuf":
+        entry["kind"] = "numeric"
+        values = series.to_numpy()
+    else:
+        raise TypeError("unsupported dtype {} for column {}".format(series.dtype, name))
+
+    # Fail before writing anything if the categories cannot be serialised
+    json.dumps(entry)
+    np.save(pth.join(data_dir, entry["file"]), values, allow_pickle=False)
+    return entry
+
+
+def _decode(data_dir, entry, mmap_mode):
+    values = np.load(pth.join(data_dir, entry["file"]), mmap_mode=mmap_mode, allow_pickle=False)
+    if entry["kind"] == "category":
+        return pd.Categorical.from_codes(
+            values, categories=entry["categories"], ordered=entry["ordered"]
+        )
+    if entry["kind"] == "object":
+        # Code -1 (missing value) picks the trailing NaN
+        lookup = np.array(entry["categories"] + [np.nan], dtype=object)
+        return lookup[values]
+    return values
+
+
+def _smallest_code_dtype(n_categories):
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
@@ -4,14 +4,16 @@
 # @Software: PyCharm
 
 import continental_level_plots
+from figure_cache import figure_key, render_cached, show_cached
+from figure_output import FigureOutput
+from perf_monitor import PERF_MONITOR
 import ipyvuetify as v
-from ipywidgets import Output
-from IPython.display import display
 from functools import partial
 
 
 class ContinentalTab:
     def __init__(self, aeroscopedataclass):
+        PERF_MONITOR.instrument(self)
         self.select = v.Select(
             v_model=["AF", "AS", "EU", "NA", "SA", "OC"],
             multiple=True,
@@ -39,9 +41,9 @@ class ContinentalTab:
             ],
             class_="mb-3",
         )
-        self.output_1 = Output()
-        self.output_2 = Output()
-        self.output_3 = Output()
+        self.output_1 = FigureOutput()
+        self.output_2 = FigureOutput()
+        self.output_3 = FigureOutput()
         self._render_initial_plots(aeroscopedataclass)
         self._make_connections(aeroscopedataclass)
         self._make_layout()
@@ -51,19 +53,19 @@ class ContinentalTab:
             fig_conti_1 = continental_level_plots.continental_map_plot(
                 dataclass.conti_scatter, dataclass.continental_flows_non_dir, "CO2 (Mt)"
             )
-            display(fig_conti_1)
+            self.output_1.show(fig_conti_1)
 
         with self.output_2:
             fig_conti_2 = continental_level_plots.continental_treemap_plot(
                 dataclass.continental_flows, "CO2 (Mt)"
             )
-            display(fig_conti_2)
+            self.output_2.show(fig_conti_2)
 
         with self.output_3:
             fig_conti_3 = continental_level_plots.distance_histogram_plot_continent(
-                dataclass.flights_df, "CO2 (Mt)"
+                dataclass.distance_cube, "CO2 (Mt)"
             )
-            display(fig_conti_3)
+            self.output_3.show(fig_conti_3)
 
     def _plots_update(self, change, dataclass):
         filtered_values = self.select.v_model
@@ -75,9 +77,8 @@ class ContinentalTab:
         filtered_df = dataclass.continental_flows[
             dataclass.continental_flows["departure_continent"].isin(filtered_values)
         ].reset_index()
-        filtered_fl_df = dataclass.flights_df[
-            dataclass.flights_df["departure_continent"].isin(filtered_values)
-        ].reset_index()
+        # slice of the precomputed distance cube, the flights are not scanned again
+        filtered_distance_cube = dataclass.distance_cube.select(departure_continent=filtered_values)
 
         # continental_flows_non_dir[['AV1', 'AV2']] = continental_flows_non_dir['group_col'].copy().apply(lambda x: pd.Series(x))
         filtered_non_dir = dataclass.continental_flows_non_dir[
@@ -85,26 +86,42 @@ class ContinentalTab:
             | (dataclass.continental_flows_non_dir.AV2.isin(filtered_values))
         ].reset_index()
 
-        with self.output_1:
-            self.output_1.clear_output(wait=True)
-            fig_conti_1 = continental_level_plots.continental_map_plot(
-                filtered_df_depart, filtered_non_dir, value_watched_conti
+        key_1 = figure_key(
+            dataclass.type, "continental", "plot1", value_watched_conti, filtered_values
+        )
+        if not show_cached(self.output_1, key_1):
+            render_cached(
+                self.output_1,
+                key_1,
+                continental_level_plots.continental_map_plot,
+                filtered_df_depart,
+                filtered_non_dir,
+                value_watched_conti,
             )
-            display(fig_conti_1)
 
-        with self.output_2:
-            self.output_2.clear_output(wait=True)
-            fig_conti_2 = continental_level_plots.continental_treemap_plot(
-                filtered_df, value_watched_conti
+        key_2 = figure_key(
+            dataclass.type, "continental", "plot2", value_watched_conti, filtered_values
+        )
+        if not show_cached(self.output_2, key_2):
+            render_cached(
+                self.output_2,
+                key_2,
+                continental_level_plots.continental_treemap_plot,
+                filtered_df,
+                value_watched_conti,
             )
-            display(fig_conti_2)
 
-        with self.output_3:
-            self.output_3.clear_output(wait=True)
-            fig_conti_3 = continental_level_plots.distance_histogram_plot_continent(
-                filtered_fl_df, value_watched_conti
+        key_3 = figure_key(
+            dataclass.type, "continental", "plot3", value_watched_conti, filtered_values
+        )
+        if not show_cached(self.output_3, key_3):
+            render_cached(
+                self.output_3,
+                key_3,
+                continental_level_plots.distance_histogram_plot_continent,
+                filtered_distance_cube,
+                value_watched_conti,
             )
-            display(fig_conti_3)
 
     def _make_connections(self, dataclass):
         # # Connect the event handler to the controls
@@ -228,31 +245,12 @@ class ContinentalTab:
             ],
         )
 
-        row_disclaimer_cty = v.Col(
-            children=[
-                v.Card(
-                    outlined=False,
-                    elevation=0,
-                    style_="width: 100%",
-                    children=[
-                        v.CardText(
-                            children=[
-                                "Please wait for the plots to be rendered before changing the indicator or the continents. \n Doing so could break the process. \n If it happens please reload the page."
-                            ],
-                            class_="text-center teal--text darken-4",
-                            style_="font-size: 16px;",
-                        ),
-                    ],
-                ),
-            ],
-        )
-
         col_plots = v.Col(
             justify="center",  # Center the components horizontally
             no_gutters=False,
             # cols='10',
             # class_='mb-4',  # Add margin at the bottom
-            children=[row_disclaimer_cty, row_mega_map, row_twoplots],
+            children=[row_mega_map, row_twoplots],
         )
 
         self.layout = v.Row(children=[col_selects, v_divider, col_plots])
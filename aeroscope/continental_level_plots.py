@@ -6,7 +6,9 @@
 
 import plotly.express as px
 import plotly.graph_objects as go
-import pandas as pd
+
+from distance_cube import HISTOGRAM_BIN_WIDTH
+from perf_monitor import FIGURE_BUILD_STAGE, timed_stage
 
 color_discrete_map = {
     "AS": "#EE9B00",
@@ -19,6 +21,7 @@ color_discrete_map = {
 }
 
 
+@timed_stage(FIGURE_BUILD_STAGE)
 def continental_treemap_plot(continental_flows, value_watched_conti):
     if len(continental_flows) > 0:
         fig = px.treemap(
@@ -70,23 +73,18 @@ def continental_treemap_plot(continental_flows, value_watched_conti):
         return "Please select at least one continent!"
 
 
-def distance_histogram_plot_continent(flights_df_conti, value_watched_conti):
-    if len(flights_df_conti) > 0:
+@timed_stage(FIGURE_BUILD_STAGE)
+def distance_histogram_plot_continent(distance_cube, value_watched_conti):
+    if not distance_cube.empty:
         fig = go.Figure()
 
         # Define bins (500 km intervals)
-        bin_width = 500
-        bins = list(range(0, int(flights_df_conti["distance_km"].max()) + bin_width, bin_width))
-        bin_centers = [b + bin_width / 2 for b in bins[:-1]]  # Midpoints of each bin
+        bin_width = HISTOGRAM_BIN_WIDTH
+        bins = distance_cube.bin_edges
+        bin_centers = distance_cube.bin_centers  # Midpoints of each bin
 
         # Group data by distance bins and arrival continent
-        grouped = (
-            flights_df_conti.groupby(
-                [pd.cut(flights_df_conti["distance_km"], bins), "arrival_continent"]
-            )[value_watched_conti]
-            .sum()
-            .unstack(fill_value=0)
-        )
+        grouped = distance_cube.histogram(value_watched_conti, by="arrival_continent")
 
         # Add traces for each arrival continent (stacked bars)
         for continent in grouped.columns:
@@ -126,6 +124,7 @@ def distance_histogram_plot_continent(flights_df_conti, value_watched_conti):
         return
 
 
+@timed_stage(FIGURE_BUILD_STAGE)
 def continental_map_plot(conti_scatter, continental_flows_non_dir, value_watched_conti):
     # Create the scattergeo figure
     if len(conti_scatter) > 0:
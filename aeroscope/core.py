@@ -1,6 +1,25 @@
+import os
+
 import pandas as pd
 from dataclasses import dataclass
 
+# Set to "1" to memory-map the plot files read-only, so that all the kernels of a server share
+# one physical copy of the data (enabled by `aeroscope run --server`)
+SHARED_DATA_ENV_VAR = "AEROSCOPE_SHARED_DATA"
+
+
+def shared_data_enabled():
+    return os.environ.get(SHARED_DATA_ENV_VAR, "0") == "1"
+
+
+def metric_totals(flights_df, metric, by=None):
+    """Total of a metric, per value of the by column if given, summed in float64."""
+    # flights_df metrics are float32: summing them as such loses precision on the whole dataset
+    values = flights_df[metric].astype("float64")
+    if by is None:
+        return values.sum()
+    return values.groupby(flights_df[by], observed=True).sum()
+
 
 @dataclass
 class AeroscopeDataClass:
@@ -11,3 +30,14 @@ class AeroscopeDataClass:
     country_fixed: pd.DataFrame
     flights_df: pd.DataFrame
     type: str
+    # Inverted-index filter engine over flights_df (filter_engine.FilterEngine), built once per
+    # dataset after loading and shared by the tabs
+    flights_filter: object = None
+    # Distance-binned aggregates of the whole flights_df (distance_cube.DistanceCube)
+    distance_cube: object = None
+    # Rows departing from each regional group (regional_groups.RegionalGroups)
+    regional_groups: object = None
+    # Airport pair of each flight, aggregated for the route maps (od_table.ODTable)
+    od_table: object = None
+    # Range class of each flight and world totals, for the AeroMAPS table (range_summary.RangeSummary)
+    range_summary: object = None
@@ -1,8 +1,12 @@
 ### COUNTRIES FRONTEND
 import country_level_plots
+from distance_cube import DistanceCube
+from figure_cache import figure_key, render_cached, show_cached
+from figure_output import FigureOutput
+from perf_monitor import PERF_MONITOR
+from regional_groups import GROUP_NAMES, flow_map_allowed, group_countries
+from update_scheduler import UpdateScheduler
 import ipyvuetify as v
-from ipywidgets import Output
-from IPython.display import display
 from functools import partial
 
 
@@ -12,6 +16,7 @@ class CountriesTab:
     """
 
     def __init__(self, aeroscopedataclass):
+        PERF_MONITOR.instrument(self)
         ## define widgets
         self.autocomplete = v.Autocomplete(
             v_model=[],
@@ -19,16 +24,7 @@ class CountriesTab:
             chips=True,
             label="Countries (or regional groups)",
             items=list(aeroscopedataclass.country_flows.departure_country_name.unique())
-            + [
-                "European Union",
-                "European Union + Outermost Regions",
-                "OECD",
-                "G7",
-                "G20",
-                "Eurocontrol Members",
-                "BRICS",
-                "France + Overseas",
-            ],
+            + GROUP_NAMES,
             multiple=True,
             variant="outlined",
         )
@@ -92,43 +88,40 @@ class CountriesTab:
             ],
         )
 
-        self.output_1 = Output()
-        self.output_2 = Output()
-        self.output_3 = Output()
+        self.output_1 = FigureOutput()
+        self.output_2 = FigureOutput()
+        self.output_3 = FigureOutput()
+
+        # filtered views of the current selection (see _filter_common_code)
+        self.selected_countries = None
 
         self._render_initial_plots(aeroscopedataclass)
         self._make_connections(aeroscopedataclass)
         self._make_layout()
 
     def _make_connections(self, dataclass):
+        # one update cycle per interaction, whatever the number of events it raises
+        self.scheduler = UpdateScheduler()
+        plot1_update = partial(self._plot1_update, dataclass=dataclass)
+        plot2_update = partial(self._plot2_update, dataclass=dataclass)
+        plot3_update = partial(self._plot3_update, dataclass=dataclass)
+
         self.select_world_button.on_event("click", self._select_world)
 
-        self.autocomplete.observe(self._select_regional, names="v_model")
+        self.scheduler.observe(self.autocomplete, self._select_regional)
 
         # TODO +++ change the filtering logic: decoupling from plot switch to avoid unnecessary operations!
-        self.autocomplete.observe(partial(self._plot1_update, dataclass=dataclass), names="v_model")
-        self.autocomplete.observe(partial(self._plot2_update, dataclass=dataclass), names="v_model")
-        self.autocomplete.observe(partial(self._plot3_update, dataclass=dataclass), names="v_model")
+        self.scheduler.observe(self.autocomplete, plot1_update)
+        self.scheduler.observe(self.autocomplete, plot2_update)
+        self.scheduler.observe(self.autocomplete, plot3_update)
 
-        self.value_watched_radio.observe(
-            partial(self._plot1_update, dataclass=dataclass), names="v_model"
-        )
-        self.value_watched_radio.observe(
-            partial(self._plot2_update, dataclass=dataclass), names="v_model"
-        )
-        self.value_watched_radio.observe(
-            partial(self._plot3_update, dataclass=dataclass), names="v_model"
-        )
+        self.scheduler.observe(self.value_watched_radio, plot1_update)
+        self.scheduler.observe(self.value_watched_radio, plot2_update)
+        self.scheduler.observe(self.value_watched_radio, plot3_update)
 
-        self.toggle_button_plot1.observe(
-            partial(self._plot1_update, dataclass=dataclass), names="v_model"
-        )
-        self.toggle_button_plot2.observe(
-            partial(self._plot2_update, dataclass=dataclass), names="v_model"
-        )
-        self.toggle_button_plot3.observe(
-            partial(self._plot3_update, dataclass=dataclass), names="v_model"
-        )
+        self.scheduler.observe(self.toggle_button_plot1, plot1_update)
+        self.scheduler.observe(self.toggle_button_plot2, plot2_update)
+        self.scheduler.observe(self.toggle_button_plot3, plot3_update)
 
     def _select_world(self, widget, event, data):
         self.autocomplete.v_model = list()
@@ -136,230 +129,10 @@ class CountriesTab:
     def _select_regional(self, change):
         selected_countries = self.autocomplete.v_model
 
-        regional_list = []
-        if "European Union" in selected_countries:
-            regional_list.extend(
-                [
-                    "Austria, Republic of",
-                    "Belgium, Kingdom of",
-                    "Bulgaria, Republic of",
-                    "Croatia, Republic of",
-                    "Cyprus, Republic of",
-                    "Czech Republic",
-                    "Denmark, Kingdom of",
-                    "Estonia, Republic of",
-                    "Finland, Republic of",
-                    "France, French Republic",
-                    "Germany, Federal Republic of",
-                    "Greece, Hellenic Republic",
-                    "Hungary, Republic of",
-                    "Ireland",
-                    "Italy, Italian Republic",
-                    "Latvia, Republic of",
-                    "Lithuania, Republic of",
-                    "Luxembourg, Grand Duchy of",
-                    "Malta, Republic of",
-                    "Netherlands, Kingdom of the",
-                    "Poland, Republic of",
-                    "Portugal, Portuguese Republic",
-                    "Romania",
-                    "Slovakia (Slovak Republic)",
-                    "Slovenia, Republic of",
-                    "Spain, Kingdom of",
-                    "Sweden, Kingdom of",
-                ]
-            )
-        if "European Union + Outermost Regions" in selected_countries:
-            regional_list.extend(
-                [
-                    "Austria, Republic of",
-                    "Belgium, Kingdom of",
-                    "Bulgaria, Republic of",
-                    "Mayotte",
-                    "Croatia, Republic of",
-                    "Czech Republic",
-                    "Denmark, Kingdom of",
-                    "Estonia, Republic of",
-                    "Finland, Republic of",
-                    "France, French Republic",
-                    "French Guiana",
-                    "Germany, Federal Republic of",
-                    "Greece, Hellenic Republic",
-                    "Guadeloupe",
-                    "Hungary, Republic of",
-                    "Ireland",
-                    "Italy, Italian Republic",
-                    "Latvia, Republic of",
-                    "Lithuania, Republic of",
-                    "Luxembourg, Grand Duchy of",
-                    "Malta, Republic of",
-                    "Martinique",
-                    "Netherlands, Kingdom of the",
-                    "Poland, Republic of",
-                    "Portugal, Portuguese Republic",
-                    "Reunion",
-                    "Romania",
-                    "Slovakia (Slovak Republic)",
-                    "Slovenia, Republic of",
-                    "Spain, Kingdom of",
-                    "Sweden, Kingdom of",
-                    "Saint Martin",
-                ]
-            )
-        if "France + Overseas" in selected_countries:
-            regional_list.extend(
-                [
-                    "Mayotte",
-                    "French Polynesia",
-                    "Guadeloupe",
-                    "French Guiana",
-                    "Martinique",
-                    "New Caledonia",
-                    "Reunion",
-                    "Saint Barthelemy",
-                    "Saint Pierre and Miquelon",
-                    "Wallis and Futuna",
-                    "Saint Martin",
-                    "France, French Republic",
-                ]
-            )
-        if "G7" in selected_countries:
-            regional_list.extend(
-                [
-                    "Canada",
-                    "France, French Republic",
-                    "Germany, Federal Republic of",
-                    "Italy, Italian Republic",
-                    "Japan",
-                    "United Kingdom of Great Britain & Northern Ireland",
-                    "United States of America",
-                ]
-            )
-        if "G20" in selected_countries:
-            regional_list.extend(
-                [
-                    "Argentina, Argentine Republic",
-                    "Australia, Commonwealth of",
-                    "Brazil, Federative Republic of",
-                    "Canada",
-                    "China, People's Republic of",
-                    "France, French Republic",
-                    "Germany, Federal Republic of",
-                    "India, Republic of",
-                    "Indonesia, Republic of",
-                    "Italy, Italian Republic",
-                    "Japan",
-                    "Mexico, United Mexican States",
-                    "Russian Federation",
-                    "Saudi Arabia, Kingdom of",
-                    "South Africa, Republic of",
-                    "Republic of Korea",
-                    "Turkey, Republic of",
-                    "United Kingdom of Great Britain & Northern Ireland",
-                    "United States of America",
-                ]
-            )
-        if "OECD" in selected_countries:
-            regional_list.extend(
-                [
-                    "Australia, Commonwealth of",
-                    "Austria, Republic of",
-                    "Belgium, Kingdom of",
-                    "Canada",
-                    "Chile, Republic of",
-                    "Colombia, Republic of",
-                    "Czech Republic",
-                    "Denmark, Kingdom of",
-                    "Estonia, Republic of",
-                    "Finland, Republic of",
-                    "France, French Republic",
-                    "Germany, Federal Republic of",
-                    "Greece, Hellenic Republic",
-                    "Hungary, Republic of",
-                    "Iceland, Republic of",
-                    "Ireland",
-                    "Israel, State of",
-                    "Italy, Italian Republic",
-                    "Japan",
-                    "Korea, Republic of",
-                    "Latvia, Republic of",
-                    "Lithuania, Republic of",
-                    "Luxembourg, Grand Duchy of",
-                    "Mexico, United Mexican States",
-                    "Netherlands, Kingdom of the",
-                    "New Zealand",
-                    "Norway, Kingdom of",
-                    "Poland, Republic of",
-                    "Portugal, Portuguese Republic",
-                    "Slovakia (Slovak Republic)",
-                    "Slovenia, Republic of",
-                    "Spain, Kingdom of",
-                    "Sweden, Kingdom of",
-                    "Switzerland, Swiss Confederation",
-                    "Turkey, Republic of",
-                    "United Kingdom of Great Britain & Northern Ireland",
-                    "United States of America",
-                ]
-            )
-        if "Eurocontrol Members" in selected_countries:
-            regional_list.extend(
-                [
-                    "Albania, Republic of",
-                    "Armenia, Republic of",
-                    "Austria, Republic of",
-                    "Azerbaijan, Republic of",
-                    "Belgium, Kingdom of",
-                    "Bosnia and Herzegovina",
-                    "Bulgaria, Republic of",
-                    "Croatia, Republic of",
-                    "Cyprus, Republic of",
-                    "Czech Republic",
-                    "Denmark, Kingdom of",
-                    "Estonia, Republic of",
-                    "Finland, Republic of",
-                    "France, French Republic",
-                    "Georgia",
-                    "Germany, Federal Republic of",
-                    "Greece, Hellenic Republic",
-                    "Hungary, Republic of",
-                    "Ireland",
-                    "Italy, Italian Republic",
-                    "Latvia, Republic of",
-                    "Lithuania, Republic of",
-                    "Luxembourg, Grand Duchy of",
-                    "Malta, Republic of",
-                    "Moldova, Republic of",
-                    "Monaco, Principality of",
-                    "Montenegro, Republic of",
-                    "Netherlands, Kingdom of the",
-                    "North Macedonia, Republic of",
-                    "Norway, Kingdom of",
-                    "Poland, Republic of",
-                    "Portugal, Portuguese Republic",
-                    "Romania",
-                    "Serbia, Republic of",
-                    "Slovakia (Slovak Republic)",
-                    "Slovenia, Republic of",
-                    "Spain, Kingdom of",
-                    "Sweden, Kingdom of",
-                    "Switzerland, Swiss Confederation",
-                    "Turkey, Republic of",
-                    "Ukraine",
-                    "United Kingdom of Great Britain & Northern Ireland",
-                ]
-            )
-        if "BRICS" in selected_countries:
-            regional_list.extend(
-                [
-                    "Brazil, Federative Republic of",
-                    "Russian Federation",
-                    "India, Republic of",
-                    "China, People's Republic of",
-                    "South Africa, Republic of",
-                ]
-            )
-
-        self.autocomplete.v_model = list(set(regional_list) | set(selected_countries))
+        # selected groups stay selected, next to their member countries
+        self.autocomplete.v_model = list(
+            dict.fromkeys(selected_countries + group_countries(selected_countries))
+        )
 
     def _render_initial_plots(self, dataclass):
         if dataclass.type == "compilation":
@@ -370,156 +143,225 @@ class CountriesTab:
             fig_ctry_1 = country_level_plots.countries_global_plot(
                 dataclass.country_fixed, init_value
             )
-            display(fig_ctry_1)
+            self.output_1.show(fig_ctry_1)
 
         with self.output_2:
             fig_ctry_2 = country_level_plots.distance_histogram_plot_country(
-                dataclass.flights_df, init_value
+                dataclass.distance_cube, init_value
             )
-            display(fig_ctry_2)
+            self.output_2.show(fig_ctry_2)
 
         with self.output_3:
             fig_ctry_3 = country_level_plots.aircraft_pie(dataclass.flights_df, init_value)
-            display(fig_ctry_3)
+            self.output_3.show(fig_ctry_3)
+
+    def _filter_common_code(self, dataclass):
+        # views of the selected countries, shared by the three plots until the selection changes
+        selection = sorted(self.autocomplete.v_model)
+        if selection == self.selected_countries:
+            return
+        self.selected_countries = selection
+
+        if len(selection) == 0:
+            self.in_class_flights_df = dataclass.flights_df
+            self.in_class_country_flows = dataclass.country_flows
+            self.in_class_country_fixed = dataclass.country_fixed
+            self.distance_cube = dataclass.distance_cube
+        else:
+            # selected groups come from their precomputed rows, only the other countries are
+            # looked up
+            self.in_class_flights_df = dataclass.regional_groups.flights_df(selection)
+            self.in_class_country_flows = dataclass.regional_groups.country_flows_df(selection)
+            self.in_class_country_fixed = dataclass.regional_groups.country_fixed_df(selection)
+            self.distance_cube = None
 
-    # TODO like flight plot split updates between data and plot
     def _plot1_update(self, change, dataclass):
         filtered_values = self.autocomplete.v_model
         value_watched_ctry = self.value_watched_radio.v_model
         active_main_graph_country = self.toggle_button_plot1.v_model
 
+        key = figure_key(
+            dataclass.type,
+            "countries",
+            "plot1",
+            active_main_graph_country,
+            value_watched_ctry,
+            filtered_values,
+        )
+        if show_cached(self.output_1, key):
+            return
+
+        self._filter_common_code(dataclass)
+
         if len(filtered_values) == 0:
             # Global plot, triggered by empty coutry filter
-            with self.output_1:
-                self.output_1.clear_output(wait=True)
-                if active_main_graph_country == "map":
-                    fig_ctry_1 = country_level_plots.countries_global_plot(
-                        dataclass.country_fixed, value_watched_ctry
-                    )
-                else:
-                    fig_ctry_1 = country_level_plots.countries_treemap_plot(
-                        dataclass.country_flows, value_watched_ctry
-                    )
-                display(fig_ctry_1)
+            if active_main_graph_country == "map":
+                render_cached(
+                    self.output_1,
+                    key,
+                    country_level_plots.countries_global_plot,
+                    self.in_class_country_fixed,
+                    value_watched_ctry,
+                )
+            else:
+                render_cached(
+                    self.output_1,
+                    key,
+                    country_level_plots.countries_treemap_plot,
+                    self.in_class_country_flows,
+                    value_watched_ctry,
+                )
 
         # Case of regional subgroup selected: not a flow plot to avoid plot over loading
-        elif any(
-            group in filtered_values
-            for group in [
-                "European Union",
-                "European Union + Outermost Regions",
-                "OECD",
-                "G7",
-                "G20",
-                "Eurocontrol Members",
-                "BRICS",
-            ]
-        ):
-            filtered_country_flows = dataclass.country_flows[
-                dataclass.country_flows["departure_country_name"].isin(filtered_values)
-            ].reset_index()
-
-            filtered_country_fixed = dataclass.country_fixed[
-                dataclass.country_fixed["departure_country_name"].isin(filtered_values)
-            ].reset_index()
-
-            with self.output_1:
-                self.output_1.clear_output(wait=True)
-                if active_main_graph_country == "map":
-                    fig_ctry_1 = country_level_plots.countries_global_plot(
-                        filtered_country_fixed, value_watched_ctry
-                    )
-                else:
-                    fig_ctry_1 = country_level_plots.countries_treemap_plot(
-                        filtered_country_flows, value_watched_ctry
-                    )
-                display(fig_ctry_1)
+        elif not flow_map_allowed(filtered_values):
+            if active_main_graph_country == "map":
+                render_cached(
+                    self.output_1,
+                    key,
+                    country_level_plots.countries_global_plot,
+                    self.in_class_country_fixed,
+                    value_watched_ctry,
+                )
+            else:
+                render_cached(
+                    self.output_1,
+                    key,
+                    country_level_plots.countries_treemap_plot,
+                    self.in_class_country_flows,
+                    value_watched_ctry,
+                )
 
         else:
-            filtered_country_flows = dataclass.country_flows[
-                dataclass.country_flows["departure_country_name"].isin(filtered_values)
-            ].reset_index()
-
-            with self.output_1:
-                self.output_1.clear_output(wait=True)
-                if active_main_graph_country == "map":
-                    fig_ctry_1 = country_level_plots.countries_map_plot(
-                        filtered_country_flows, value_watched_ctry
-                    )
-                else:
-                    fig_ctry_1 = country_level_plots.countries_treemap_plot(
-                        filtered_country_flows, value_watched_ctry
-                    )
-                display(fig_ctry_1)
+            if active_main_graph_country == "map":
+                render_cached(
+                    self.output_1,
+                    key,
+                    country_level_plots.countries_map_plot,
+                    self.in_class_country_flows,
+                    value_watched_ctry,
+                )
+            else:
+                render_cached(
+                    self.output_1,
+                    key,
+                    country_level_plots.countries_treemap_plot,
+                    self.in_class_country_flows,
+                    value_watched_ctry,
+                )
 
     def _plot2_update(self, change, dataclass):
         filtered_values = self.autocomplete.v_model
         value_watched_ctry = self.value_watched_radio.v_model
         active_analysis_graph_country = self.toggle_button_plot2.v_model
 
-        if len(filtered_values) == 0:
-            filtered_flights_df = dataclass.flights_df
-        else:
-            filtered_flights_df = dataclass.flights_df[
-                dataclass.flights_df["departure_country_name"].isin(filtered_values)
-            ].reset_index()
-
-        with self.output_2:
-            self.output_2.clear_output(wait=True)
-            if active_analysis_graph_country == "hist":
-                fig_ctry_2 = country_level_plots.distance_histogram_plot_country(
-                    filtered_flights_df, value_watched_ctry
+        key = figure_key(
+            dataclass.type,
+            "countries",
+            "plot2",
+            active_analysis_graph_country,
+            value_watched_ctry,
+            filtered_values,
+        )
+        if show_cached(self.output_2, key):
+            return
+
+        self._filter_common_code(dataclass)
+        if self.distance_cube is None:
+            # aggregated once per selection, on the first distance plot drawn
+            self.distance_cube = DistanceCube.from_flights(self.in_class_flights_df)
+        distance_cube = self.distance_cube
+
+        if active_analysis_graph_country == "hist":
+            render_cached(
+                self.output_2,
+                key,
+                country_level_plots.distance_histogram_plot_country,
+                distance_cube,
+                value_watched_ctry,
+            )
+        elif active_analysis_graph_country == "ecdf":
+            if dataclass.type == "compilation":
+                render_cached(
+                    self.output_2,
+                    key,
+                    country_level_plots.distance_cumul_plot_country,
+                    distance_cube,
                 )
-            elif active_analysis_graph_country == "ecdf":
-                if dataclass.type == "compilation":
-                    fig_ctry_2 = country_level_plots.distance_cumul_plot_country(
-                        filtered_flights_df
-                    )
-                else:  # OPENSKY
-                    fig_ctry_2 = country_level_plots.distance_cumul_plot_country_OS(
-                        filtered_flights_df
-                    )
-            elif active_analysis_graph_country == "kde_acft":
-                fig_ctry_2 = country_level_plots.distance_share_country(
-                    filtered_flights_df, value_watched_ctry
+            else:  # OPENSKY
+                render_cached(
+                    self.output_2,
+                    key,
+                    country_level_plots.distance_cumul_plot_country_OS,
+                    distance_cube,
                 )
-            else:
-                fig_ctry_2 = country_level_plots.distance_share_dom_int_country(
-                    filtered_flights_df, value_watched_ctry
-                )
-            display(fig_ctry_2)
+        elif active_analysis_graph_country == "kde_acft":
+            render_cached(
+                self.output_2,
+                key,
+                country_level_plots.distance_share_country,
+                distance_cube,
+                value_watched_ctry,
+            )
+        else:
+            render_cached(
+                self.output_2,
+                key,
+                country_level_plots.distance_share_dom_int_country,
+                distance_cube,
+                value_watched_ctry,
+            )
 
     def _plot3_update(self, change, dataclass):
         filtered_values = self.autocomplete.v_model
         value_watched_ctry = self.value_watched_radio.v_model
         active_pie_country = self.toggle_button_plot3.v_model
 
-        if len(filtered_values) == 0:
-            filtered_flights_df = dataclass.flights_df
+        key = figure_key(
+            dataclass.type,
+            "countries",
+            "plot3",
+            active_pie_country,
+            value_watched_ctry,
+            filtered_values,
+        )
+        if show_cached(self.output_3, key):
+            return
+
+        self._filter_common_code(dataclass)
+        filtered_flights_df = self.in_class_flights_df
+
+        if active_pie_country == "acft":
+            render_cached(
+                self.output_3,
+                key,
+                country_level_plots.aircraft_pie,
+                filtered_flights_df,
+                value_watched_ctry,
+            )
+        elif active_pie_country == "acft_class":
+            render_cached(
+                self.output_3,
+                key,
+                country_level_plots.aircraft_class_pie,
+                filtered_flights_df,
+                value_watched_ctry,
+            )
+        elif active_pie_country == "airline":
+            render_cached(
+                self.output_3,
+                key,
+                country_level_plots.aircraft_user_pie,
+                filtered_flights_df,
+                value_watched_ctry,
+            )
         else:
-            filtered_flights_df = dataclass.flights_df[
-                dataclass.flights_df["departure_country_name"].isin(filtered_values)
-            ].reset_index()
-
-        with self.output_3:
-            self.output_3.clear_output(wait=True)
-            if active_pie_country == "acft":
-                fig_ctry_3 = country_level_plots.aircraft_pie(
-                    filtered_flights_df, value_watched_ctry
-                )
-            elif active_pie_country == "acft_class":
-                fig_ctry_3 = country_level_plots.aircraft_class_pie(
-                    filtered_flights_df, value_watched_ctry
-                )
-            elif active_pie_country == "airline":
-                fig_ctry_3 = country_level_plots.aircraft_user_pie(
-                    filtered_flights_df, value_watched_ctry
-                )
-            else:
-                fig_ctry_3 = country_level_plots.dom_share_pie(
-                    filtered_flights_df, value_watched_ctry
-                )
-            display(fig_ctry_3)
+            render_cached(
+                self.output_3,
+                key,
+                country_level_plots.dom_share_pie,
+                filtered_flights_df,
+                value_watched_ctry,
+            )
 
     def _make_layout(self):
         h_divider = v.Divider(vertical=False)
@@ -5,9 +5,14 @@
 
 import plotly.express as px
 import plotly.graph_objects as go
-import pandas as pd
 
+from core import metric_totals
+from distance_cube import HISTOGRAM_BIN_WIDTH
+from geo_traces import route_lines
+from perf_monitor import FIGURE_BUILD_STAGE, timed_stage
 
+
+@timed_stage(FIGURE_BUILD_STAGE)
 def countries_map_plot(country_flows, value_watched_ctry):
     # Create the scattergeo figure
     fig = go.Figure()
@@ -16,59 +21,50 @@ def countries_map_plot(country_flows, value_watched_ctry):
         value_watched_ctry
     ].mean()
 
-    for i in range(len(country_flows)):
-        if country_flows["departure_country"][i] == country_flows["arrival_country"][i]:
-            color = "black"
-        else:
-            color = country_flows["color"][i]
-        fig.add_trace(
-            go.Scattergeo(
-                lon=[
-                    country_flows["departure_lon"][i],
-                    country_flows["arrival_lon"][i],
-                ],
-                lat=[
-                    country_flows["departure_lat"][i],
-                    country_flows["arrival_lat"][i],
-                ],
-                mode="lines",
-                line=dict(
-                    width=country_flows[value_watched_ctry][i] / (1.5 * meanval),
-                    color=color,
-                ),
-                opacity=0.8,
-                showlegend=False,
-            )
+    domestic = country_flows["departure_country"] == country_flows["arrival_country"]
+    colors = country_flows["color"].astype(object).where(~domestic, "black").to_numpy()
+    values = country_flows[value_watched_ctry].to_numpy()
+
+    # All the country pairs in a few traces, one per colour and line width bucket
+    fig.add_traces(
+        route_lines(
+            country_flows["departure_lon"],
+            country_flows["departure_lat"],
+            country_flows["arrival_lon"],
+            country_flows["arrival_lat"],
+            values / (1.5 * meanval),
+            colors,
+            opacity=0.8,
+            showlegend=False,
         )
+    )
 
-        fig.add_trace(
-            go.Scattergeo(
-                lon=[country_flows["arrival_lon"][i]],
-                lat=[country_flows["arrival_lat"][i]],
-                hoverinfo="text",
-                text=[country_flows[value_watched_ctry][i]],
-                mode="markers",
-                marker=dict(
-                    size=[country_flows[value_watched_ctry][i]] / (0.01 * meanval),
-                    sizemode="area",
-                    color=color,
-                    line=dict(width=0.5, color="black"),
-                ),
-                customdata=[
-                    [
-                        country_flows["departure_country_name"][i],
-                        country_flows["arrival_country_name"][i],
-                    ]
-                ],
-                hovertemplate="Flights from: %{customdata[0]}"
-                + " to: "
-                + "%{customdata[1]}<br>"
-                + value_watched_ctry
-                + ": %{text:.2e}<br>"
-                + "<extra></extra>",
-                showlegend=False,
-            )
+    # One marker per country pair at the arrival, all in a single trace
+    fig.add_trace(
+        go.Scattergeo(
+            lon=country_flows["arrival_lon"],
+            lat=country_flows["arrival_lat"],
+            hoverinfo="text",
+            text=values,
+            mode="markers",
+            marker=dict(
+                size=values / (0.01 * meanval),
+                sizemode="area",
+                color=colors,
+                line=dict(width=0.5, color="black"),
+            ),
+            customdata=country_flows[["departure_country_name", "arrival_country_name"]]
+            .astype(object)
+            .to_numpy(),
+            hovertemplate="Flights from: %{customdata[0]}"
+            + " to: "
+            + "%{customdata[1]}<br>"
+            + value_watched_ctry
+            + ": %{text:.2e}<br>"
+            + "<extra></extra>",
+            showlegend=False,
         )
+    )
 
     fig.add_trace(
         go.Scattergeo(
@@ -106,19 +102,16 @@ def formatter(x, pos):
     return str(round(x * 100))
 
 
-def distance_cumul_plot_country(flights_df):
+@timed_stage(FIGURE_BUILD_STAGE)
+def distance_cumul_plot_country(distance_cube):
     fig = go.Figure()
 
-    # Define bins for a quick cumulative distribution rendering. 10 km
-    bins = list(range(0, int(flights_df["distance_km"].max()) + 10, 10))
+    # 10 km bins of the cube for a quick cumulative distribution rendering
+    edges = distance_cube.profile_edges
 
     # Cumulative distributions for each metric
     # Seats
-    hist_seats, edges_seats = (
-        flights_df["Seats"].groupby(pd.cut(flights_df["distance_km"], bins)).sum(),
-        bins[1:],
-    )
-    hist_cumul_seats = hist_seats.cumsum() / hist_seats.sum() * 100
+    hist_cumul_seats, edges_seats = distance_cube.cumulative("Seats"), edges
     fig.add_trace(
         go.Scatter(
             x=edges_seats,
@@ -131,11 +124,7 @@ def distance_cumul_plot_country(flights_df):
     )
 
     # ASK
-    hist_ask, edges_ask = (
-        flights_df["ASK"].groupby(pd.cut(flights_df["distance_km"], bins)).sum(),
-        bins[1:],
-    )
-    hist_cumul_ask = hist_ask.cumsum() / hist_ask.sum() * 100
+    hist_cumul_ask, edges_ask = distance_cube.cumulative("ASK"), edges
     fig.add_trace(
         go.Scatter(
             x=edges_ask,
@@ -148,11 +137,7 @@ def distance_cumul_plot_country(flights_df):
     )
 
     #  CO2
-    hist_co2, edges_co2 = (
-        flights_df["CO2 (kg)"].groupby(pd.cut(flights_df["distance_km"], bins)).sum(),
-        bins[1:],
-    )
-    hist_cumul_co2 = hist_co2.cumsum() / hist_co2.sum() * 100
+    hist_cumul_co2, edges_co2 = distance_cube.cumulative("CO2 (kg)"), edges
     fig.add_trace(
         go.Scatter(
             x=edges_co2,
@@ -182,19 +167,16 @@ def distance_cumul_plot_country(flights_df):
     return fig
 
 
-def distance_cumul_plot_country_OS(flights_df):
+@timed_stage(FIGURE_BUILD_STAGE)
+def distance_cumul_plot_country_OS(distance_cube):
     fig = go.Figure()
 
-    # Define bins for a quick cumulative distribution rendering. 10 km
-    bins = list(range(0, int(flights_df["distance_km"].max()) + 10, 10))
+    # 10 km bins of the cube for a quick cumulative distribution rendering
+    edges = distance_cube.profile_edges
 
     # Cumulative distributions for each metric
     # N Flights
-    hist_flights, edges_flights = (
-        flights_df["n_flights"].groupby(pd.cut(flights_df["distance_km"], bins)).sum(),
-        bins[1:],
-    )
-    hist_cumul_flights = hist_flights.cumsum() / hist_flights.sum() * 100
+    hist_cumul_flights, edges_flights = distance_cube.cumulative("n_flights"), edges
     fig.add_trace(
         go.Scatter(
             x=edges_flights,
@@ -224,22 +206,16 @@ def distance_cumul_plot_country_OS(flights_df):
     return fig
 
 
-def distance_share_country(flights_df, value_watched_ctry):
+@timed_stage(FIGURE_BUILD_STAGE)
+def distance_share_country(distance_cube, value_watched_ctry):
     fig = go.Figure()
 
     # Define bins (500 km intervals)
-    bin_width = 500
-    bins = list(range(0, int(flights_df["distance_km"].max()) + bin_width, bin_width))
-    bin_centers = [b + bin_width / 2 for b in bins[:-1]]  # Midpoints of each bin
-
-    # Compute shares without modifying flights_df
-    grouped = (
-        flights_df.groupby([pd.cut(flights_df["distance_km"], bins, right=False), "acft_class"])[
-            value_watched_ctry
-        ]
-        .sum()
-        .unstack(fill_value=0)
-    )
+    bin_width = HISTOGRAM_BIN_WIDTH
+    bins = distance_cube.bin_edges
+    bin_centers = distance_cube.bin_centers  # Midpoints of each bin
+
+    grouped = distance_cube.histogram(value_watched_ctry, by="acft_class")
     share_df = grouped.div(grouped.sum(axis=1), axis=0) * 100  # Convert to percentage
 
     bin_ranges = [f"{b - bin_width / 2}-{b + bin_width /2}" for b in bin_centers]
@@ -287,20 +263,15 @@ def distance_share_country(flights_df, value_watched_ctry):
     return fig
 
 
-def distance_share_dom_int_country(flights_df, value_watched_ctry):
+@timed_stage(FIGURE_BUILD_STAGE)
+def distance_share_dom_int_country(distance_cube, value_watched_ctry):
     fig = go.Figure()
 
-    bin_width = 500
-    bins = list(range(0, int(flights_df["distance_km"].max()) + bin_width, bin_width))
-    bin_centers = [b + bin_width / 2 for b in bins[:-1]]
+    bin_width = HISTOGRAM_BIN_WIDTH
+    bins = distance_cube.bin_edges
+    bin_centers = distance_cube.bin_centers
 
-    grouped = (
-        flights_df.groupby([pd.cut(flights_df["distance_km"], bins), "domestic"])[
-            value_watched_ctry
-        ]
-        .sum()
-        .unstack(fill_value=0)
-    )
+    grouped = distance_cube.histogram(value_watched_ctry, by="domestic")
 
     share_df = grouped.div(grouped.sum(axis=1), axis=0) * 100
 
@@ -342,6 +313,7 @@ def distance_share_dom_int_country(flights_df, value_watched_ctry):
     return fig
 
 
+@timed_stage(FIGURE_BUILD_STAGE)
 def countries_global_plot(country_fixed, value_watched_ctry):
     fig = go.Figure()
     fig.add_trace(
@@ -376,6 +348,7 @@ def countries_global_plot(country_fixed, value_watched_ctry):
     return fig
 
 
+@timed_stage(FIGURE_BUILD_STAGE)
 def countries_treemap_plot(country_flows, value_watched_ctry):
     fig = px.treemap(
         country_flows,
@@ -407,18 +380,19 @@ def countries_treemap_plot(country_flows, value_watched_ctry):
     return fig
 
 
-def distance_histogram_plot_country(flights_df, value_watched_ctry):
+@timed_stage(FIGURE_BUILD_STAGE)
+def distance_histogram_plot_country(distance_cube, value_watched_ctry):
     fig = go.Figure()
 
     # Define bins for the histogram (500 km intervals)
-    bin_width = 500
-    bins = list(range(0, int(flights_df["distance_km"].max()) + bin_width, bin_width))
-    bin_centers = [b + bin_width / 2 for b in bins[:-1]]  # Midpoints of each bin
+    bin_width = HISTOGRAM_BIN_WIDTH
+    bins = distance_cube.bin_edges
+    bin_centers = distance_cube.bin_centers  # Midpoints of each bin
 
     bin_ranges = [f"{b - bin_width / 2}-{b + bin_width / 2}" for b in bin_centers]
 
     # Compute the sum of values in each bin
-    grouped = flights_df.groupby(pd.cut(flights_df["distance_km"], bins))[value_watched_ctry].sum()
+    grouped = distance_cube.histogram(value_watched_ctry)
 
     # Add bars for the histogram
     fig.add_trace(
@@ -454,9 +428,10 @@ def distance_histogram_plot_country(flights_df, value_watched_ctry):
     return fig
 
 
+@timed_stage(FIGURE_BUILD_STAGE)
 def aircraft_pie(flights_df, value_watched_ctry):
-    top_aircraft = flights_df.groupby("acft_icao")[value_watched_ctry].sum().nlargest(10)
-    other_total = flights_df[value_watched_ctry].sum() - top_aircraft.sum()
+    top_aircraft = metric_totals(flights_df, value_watched_ctry, by="acft_icao").nlargest(10)
+    other_total = metric_totals(flights_df, value_watched_ctry) - top_aircraft.sum()
     top_aircraft.loc["Other"] = other_total
     fig = px.pie(
         values=top_aircraft,
@@ -477,8 +452,9 @@ def aircraft_pie(flights_df, value_watched_ctry):
     return fig
 
 
+@timed_stage(FIGURE_BUILD_STAGE)
 def aircraft_class_pie(flights_df, value_watched_ctry):
-    aircraft_class = flights_df.groupby("acft_class")[value_watched_ctry].sum()
+    aircraft_class = metric_totals(flights_df, value_watched_ctry, by="acft_class")
     fig = px.pie(
         values=aircraft_class,
         names=aircraft_class.index,
@@ -498,9 +474,10 @@ def aircraft_class_pie(flights_df, value_watched_ctry):
     return fig
 
 
+@timed_stage(FIGURE_BUILD_STAGE)
 def aircraft_user_pie(flights_df, value_watched_ctry):
-    top_airlines = flights_df.groupby("airline_iata")[value_watched_ctry].sum().nlargest(10)
-    other_total = flights_df[value_watched_ctry].sum() - top_airlines.sum()
+    top_airlines = metric_totals(flights_df, value_watched_ctry, by="airline_iata").nlargest(10)
+    other_total = metric_totals(flights_df, value_watched_ctry) - top_airlines.sum()
     top_airlines.loc["Other"] = other_total
     fig = px.pie(
         values=top_airlines,
@@ -521,9 +498,10 @@ def aircraft_user_pie(flights_df, value_watched_ctry):
     return fig
 
 
+@timed_stage(FIGURE_BUILD_STAGE)
 def dom_share_pie(flights_df, value_watched_ctry):
-    df_group = flights_df.groupby("domestic")[value_watched_ctry].sum().reset_index()
-    df_group["domestic"] = df_group["domestic"].replace(0, "International").replace(1, "Domestic")
+    df_group = metric_totals(flights_df, value_watched_ctry, by="domestic").reset_index()
+    df_group["domestic"] = df_group["domestic"].map({False: "International", True: "Domestic"})
     fig = px.pie(
         values=df_group[value_watched_ctry],
         names=df_group.domestic,
@@ -0,0 +1,253 @@
+"""
+Loading of the AeroSCOPE datasets.
+
+The plot files of a dataset are read (through the columnar cache) into an AeroscopeDataClass, then
+the engines shared by the tabs are built over its flights. Used by the interface, and by the
+headless entry points that need the data without the widgets.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from columnar_cache import read_csv_cached
+from core import AeroscopeDataClass, shared_data_enabled
+from distance_cube import (
+    DISTANCE_BINS_VERSION,
+    HISTOGRAM_BIN_WIDTH,
+    PROFILE_BIN_WIDTH,
+    DistanceCube,
+    add_distance_bins,
+)
+from filter_engine import FilterEngine
+from od_table import OD_COLUMNS, ODTable
+from range_summary import RangeSummary
+from regional_groups import RegionalGroups
+
+# Folders of the plot files of each dataset, relative to the notebook
+COMPILED_DIRECTORY = "./plot_files"
+OPENSKY_DIRECTORY = "./plot_files_os"
+
+# Compact dtypes of the flight-level data: codes and names as categoricals (isin/groupby run on
+# integer codes), metrics and coordinates as float32. Columns missing from a dataset are ignored.
+FLIGHTS_DF_DTYPES = {
+    **{
+        name: "category"
+        for name in [
+            "iata_departure",
+            "iata_arrival",
+            "origin",
+            "dest",
+            "airline_iata",
+            "acft_icao",
+            "acft_class",
+            "departure_country",
+            "departure_country_name",
+            "arrival_country",
+            "arrival_country_name",
+            "departure_continent",
+            "departure_continent_name",
+            "arrival_continent",
+            "arrival_continent_name",
+        ]
+    },
+    **{
+        name: "float32"
+        for name in [
+            "departure_lon",
+            "departure_lat",
+            "arrival_lon",
+            "arrival_lat",
+            "distance_km",
+            "Seats",
+            "ASK",
+            "fuel_burn",
+            "CO2 (kg)",
+            "CO2 (Mt)",
+            "ASK (Bn)",
+            "Seats (Mn)",
+            "n_flights",
+        ]
+    },
+    # nullable: missing flags are filled from the countries (prepare_flights_df), not set to True
+    "domestic": "boolean",
+}
+
+
+# Version of the cached flights_df columns: bump it whenever FLIGHTS_DF_DTYPES or
+# prepare_flights_df change. The distance bins it adds have their own version.
+FLIGHTS_DF_VERSION = 1
+_FLIGHTS_DF_TRANSFORM_VERSION = [
+    FLIGHTS_DF_VERSION,
+    DISTANCE_BINS_VERSION,
+    HISTOGRAM_BIN_WIDTH,
+    PROFILE_BIN_WIDTH,
+]
+
+
+def domestic_flags(flights_df):
+    """Domestic flag of each flight, from its countries when missing (or without the column)."""
+    if "domestic" in flights_df.columns:
+        domestic = flights_df["domestic"]
+    else:
+        domestic = pd.Series(np.nan, index=flights_df.index, dtype=object)
+    if domestic.isna().any():
+        same_country = flights_df["departure_country"].to_numpy(dtype=object) == flights_df[
+            "arrival_country"
+        ].to_numpy(dtype=object)
+        domestic = domestic.astype(object).fillna(pd.Series(same_country, index=flights_df.index))
+    return domestic.astype(bool)
+
+
+def prepare_flights_df(flights_df):
+    """Fill the missing domestic flags from the countries of the flight, add the distance bins."""
+    flights_df["domestic"] = domestic_flags(flights_df)
+    return add_distance_bins(flights_df)
+
+
+def load_compiled_data(directory=COMPILED_DIRECTORY):
+    #### Import various plot file. In case the source file is modified, please rerun `aeroscope preprocess` ####
+    mmap_mode = "r" if shared_data_enabled() else None
+
+    return AeroscopeDataClass(
+        # read continental level data
+        continental_flows=read_csv_cached(
+            os.path.join(directory, "continental_flows.csv"),
+            mmap_mode=mmap_mode,
+            sep=",",
+            keep_default_na=False,
+            na_values=["", "NaN"],
+            index_col=0,
+        ),
+        continental_flows_non_dir=read_csv_cached(
+            os.path.join(directory, "continental_flows_non_dir.csv"),
+            mmap_mode=mmap_mode,
+            sep=",",
+            keep_default_na=False,
+            na_values=["", "NaN"],
+            index_col=0,
+        ),
+        conti_scatter=read_csv_cached(
+            os.path.join(directory, "conti_scatter.csv"),
+            mmap_mode=mmap_mode,
+            sep=",",
+            keep_default_na=False,
+            na_values=["", "NaN"],
+            index_col=0,
+        ),
+        # read country level data
+        country_flows=read_csv_cached(
+            os.path.join(directory, "country_flows.csv"),
+            mmap_mode=mmap_mode,
+            sep=",",
+            keep_default_na=False,
+            na_values=["", "NaN"],
+            index_col=0,
+        ),
+        country_fixed=read_csv_cached(
+            os.path.join(directory, "country_fixed.csv"),
+            mmap_mode=mmap_mode,
+            sep=",",
+            keep_default_na=False,
+            na_values=["", "NaN"],
+            index_col=0,
+        ),
+        # read flight_level_data
+        flights_df=read_csv_cached(
+            os.path.join(directory, "flights_df.zip"),
+            mmap_mode=mmap_mode,
+            dtypes=FLIGHTS_DF_DTYPES,
+            transform=prepare_flights_df,
+            transform_version=_FLIGHTS_DF_TRANSFORM_VERSION,
+            compression="zip",
+            sep=",",
+            keep_default_na=False,
+            na_values=["", "NaN"],
+            index_col=0,
+        ),
+        type="compilation",
+    )
+
+
+def load_opensky_data(directory=OPENSKY_DIRECTORY):
+    mmap_mode = "r" if shared_data_enabled() else None
+
+    return AeroscopeDataClass(
+        # read continental level data
+        continental_flows=read_csv_cached(
+            os.path.join(directory, "continental_flows.csv"),
+            mmap_mode=mmap_mode,
+            sep=",",
+            keep_default_na=False,
+            na_values=["", "NaN"],
+            index_col=0,
+        ),
+        continental_flows_non_dir=read_csv_cached(
+            os.path.join(directory, "continental_flows_non_dir.csv"),
+            mmap_mode=mmap_mode,
+            sep=",",
+            keep_default_na=False,
+            na_values=["", "NaN"],
+            index_col=0,
+        ),
+        conti_scatter=read_csv_cached(
+            os.path.join(directory, "conti_scatter.csv"),
+            mmap_mode=mmap_mode,
+            sep=",",
+            keep_default_na=False,
+            na_values=["", "NaN"],
+            index_col=0,
+        ),
+        # read country level data
+        country_flows=read_csv_cached(
+            os.path.join(directory, "country_flows.csv"),
+            mmap_mode=mmap_mode,
+            sep=",",
+            keep_default_na=False,
+            na_values=["", "NaN"],
+            index_col=0,
+        ),
+        country_fixed=read_csv_cached(
+            os.path.join(directory, "country_fixed.csv"),
+            mmap_mode=mmap_mode,
+            sep=",",
+            keep_default_na=False,
+            na_values=["", "NaN"],
+            index_col=0,
+        ),
+        # read flight_level_data
+        flights_df=read_csv_cached(
+            os.path.join(directory, "flights_df.zip"),
+            mmap_mode=mmap_mode,
+            dtypes=FLIGHTS_DF_DTYPES,
+            transform=prepare_flights_df,
+            transform_version=_FLIGHTS_DF_TRANSFORM_VERSION,
+            compression="zip",
+            sep=",",
+            keep_default_na=False,
+            na_values=["", "NaN"],
+            index_col=0,
+            low_memory=False,  # avoid mixed type warning. Fix the core Pb of unknown coordinates
+        ),
+        type="opensky",
+    )
+
+
+def load_dataset(use_opensky_data=False, directory=None):
+    """
+    Dataset of the compilation (or OpenSky data), with its filter and aggregation engines.
+
+    directory holds the plot files, the folder of the dataset next to the notebook by default.
+    """
+    if use_opensky_data:
+        data = load_opensky_data(directory or OPENSKY_DIRECTORY)
+    else:
+        data = load_compiled_data(directory or COMPILED_DIRECTORY)
+
+    data.flights_filter = FilterEngine(data.flights_df)
+    data.distance_cube = DistanceCube.from_flights(data.flights_df)
+    data.regional_groups = RegionalGroups(data)
+    data.od_table = ODTable(data.flights_filter, *OD_COLUMNS[data.type])
+    data.range_summary = RangeSummary(data.flights_filter)
+    return data
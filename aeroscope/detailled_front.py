@@ -3,15 +3,28 @@
 # @File : detailled_front.py
 # @Software: PyCharm
 import flight_level_plots
+from distance_cube import DistanceCube
+from figure_cache import FIGURE_CACHE, figure_key, show_cached
+from figure_output import FigureOutput
+from perf_monitor import PERF_MONITOR
+from treemap_hierarchy import treemap_hierarchy
+from update_scheduler import UpdateScheduler
 import ipyvuetify as v
-from ipywidgets import Output
-from IPython.display import display
 from functools import partial
 
+# Largest selections drawn in the route map. The treemap is aggregated with a bounded number of
+# boxes, it is drawn for any selection
+MAX_ROWS_MAP = 200000
+
 
 class DetailledTab:
     def __init__(self, aeroscopedataclass):
-        self.in_class_flights_df = aeroscopedataclass.flights_df.copy()
+        PERF_MONITOR.instrument(self)
+        # No copy: filters always build new frames, the base data is never modified in place
+        self.in_class_flights_df = aeroscopedataclass.flights_df
+        self.distance_cube = aeroscopedataclass.distance_cube
+        self.od_table = aeroscopedataclass.od_table
+        self.flights_filter = aeroscopedataclass.flights_filter
 
         ## define widgets
         # Airline filter
@@ -105,336 +118,171 @@ class DetailledTab:
             ],
         )
 
-        self.output_1 = Output()
-        self.output_2 = Output()
-        self.output_3 = Output()
+        self.output_1 = FigureOutput()
+        self.output_2 = FigureOutput()
+        self.output_3 = FigureOutput()
+
+        # filter widget of each flights_df column, their items are refreshed together
+        self.facet_autocompletes = {
+            "iata_departure": self.departure_airport_autocomplete,
+            "iata_arrival": self.arrival_airport_autocomplete,
+            "airline_iata": self.airline_autocomplete,
+            "acft_icao": self.aircraft_autocomplete,
+        }
+        self.selected_rows = None
 
         self._render_initial_plots(aeroscopedataclass)
         self._make_connections(aeroscopedataclass)
         self._make_layout()
 
     def _make_connections(self, dataclass):
-        self.reset_all_button.on_event("click", partial(self._reset_all, dataclass=dataclass))
+        # one update cycle per interaction: a filter edit supersedes the pending ones, the plots
+        # run once after it (reset button included)
+        self.scheduler = UpdateScheduler()
+        self.scheduler.on_event(
+            self.reset_all_button, "click", partial(self._reset_all, dataclass=dataclass)
+        )
 
-        self.departure_airport_autocomplete.observe(
-            partial(self._data_update_dep, dataclass=dataclass), names="v_model"
+        self.scheduler.observe(
+            self.departure_airport_autocomplete,
+            partial(self._data_update_dep, dataclass=dataclass),
+            key="data",
         )
-        self.arrival_airport_autocomplete.observe(
-            partial(self._data_update_arr, dataclass=dataclass), names="v_model"
+        self.scheduler.observe(
+            self.arrival_airport_autocomplete,
+            partial(self._data_update_arr, dataclass=dataclass),
+            key="data",
         )
-        self.airline_autocomplete.observe(
-            partial(self._data_update_airline, dataclass=dataclass), names="v_model"
+        self.scheduler.observe(
+            self.airline_autocomplete,
+            partial(self._data_update_airline, dataclass=dataclass),
+            key="data",
         )
-        self.aircraft_autocomplete.observe(
-            partial(self._data_update_aircraft, dataclass=dataclass), names="v_model"
+        self.scheduler.observe(
+            self.aircraft_autocomplete,
+            partial(self._data_update_aircraft, dataclass=dataclass),
+            key="data",
         )
+        for autocomplete in self.facet_autocompletes.values():
+            self.scheduler.observe(autocomplete, self._plot1_update)
+            self.scheduler.observe(autocomplete, self._plot2_update)
+            self.scheduler.observe(autocomplete, self._plot3_update)
 
-        self.value_watched_radio.observe(self._plot1_update, names="v_model")
-        self.value_watched_radio.observe(self._plot2_update, names="v_model")
-        self.value_watched_radio.observe(self._plot3_update, names="v_model")
+        self.scheduler.observe(self.value_watched_radio, self._plot1_update)
+        self.scheduler.observe(self.value_watched_radio, self._plot2_update)
+        self.scheduler.observe(self.value_watched_radio, self._plot3_update)
 
-        self.toggle_button_plot1.observe(self._plot1_update, names="v_model")
-        self.toggle_button_plot2.observe(self._plot2_update, names="v_model")
-        self.toggle_button_plot3.observe(self._plot3_update, names="v_model")
+        self.scheduler.observe(self.toggle_button_plot1, self._plot1_update)
+        self.scheduler.observe(self.toggle_button_plot2, self._plot2_update)
+        self.scheduler.observe(self.toggle_button_plot3, self._plot3_update)
 
     def _reset_all(self, widget, event, data, dataclass):
         self.departure_airport_autocomplete.v_model = list()
         self.arrival_airport_autocomplete.v_model = list()
         self.airline_autocomplete.v_model = list()
         self.aircraft_autocomplete.v_model = list()
-        self.departure_airport_autocomplete.items = (
-            dataclass.flights_df.iata_departure.unique().tolist()
-        )
-        self.arrival_airport_autocomplete.items = (
-            dataclass.flights_df.iata_arrival.unique().tolist()
-        )
-        self.airline_autocomplete.items = dataclass.flights_df.airline_iata.unique().tolist()
-        self.aircraft_autocomplete.items = dataclass.flights_df.acft_icao.unique().tolist()
+        self._update_items(dataclass)
 
     def _render_initial_plots(self, dataclass):
-        with self.output_1:
-            print("Too much data selected for flight map rendering")
+        # the map is drawn when the dataset is under MAX_ROWS_MAP flights, as after a reset
+        self._plot1_update(None)
 
         with self.output_2:
             fig_flights_2 = flight_level_plots.distance_histogram_plot_flights(
-                dataclass.flights_df, "CO2 (kg)"
+                dataclass.distance_cube, "CO2 (kg)"
             )
-            display(fig_flights_2)
+            self.output_2.show(fig_flights_2)
 
         with self.output_3:
             fig_flights_3 = flight_level_plots.aircraft_pie_flights(
                 dataclass.flights_df, "CO2 (kg)"
             )
-            display(fig_flights_3)
-
-    def _data_update_airline(self, change, dataclass):
-        filtered_departure_airport = self.departure_airport_autocomplete.v_model
-        filtered_arrival_airport = self.arrival_airport_autocomplete.v_model
-        filtered_airline = self.airline_autocomplete.v_model
-        filtered_aircraft = self.aircraft_autocomplete.v_model
-
-        # reset local flight data with base flights_df
-        self.in_class_flights_df = dataclass.flights_df.copy()
-
-        # active departure filter
-        if filtered_departure_airport:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["iata_departure"].isin(filtered_departure_airport)
-            ].reset_index()
-
-        # active arrival filter
-        if filtered_arrival_airport:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["iata_arrival"].isin(filtered_arrival_airport)
-            ].reset_index()
-
-        # active airline filter
-        if filtered_airline:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["airline_iata"].isin(filtered_airline)
-            ].reset_index()
-
-        # active acft filter
-        if filtered_aircraft:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["acft_icao"].isin(filtered_aircraft)
-            ].reset_index()
-
-        if len(self.airline_autocomplete.v_model) == 0:
-            self.airline_autocomplete.items = (
-                self.in_class_flights_df.airline_iata.unique().tolist()
-            )
-
-        self.departure_airport_autocomplete.items = (
-            self.in_class_flights_df.iata_departure.unique().tolist()
-        )
-        self.arrival_airport_autocomplete.items = (
-            self.in_class_flights_df.iata_arrival.unique().tolist()
+            self.output_3.show(fig_flights_3)
+
+    def _filter_common_code(self, dataclass):
+        # one pass over the inverted indexes, the filtered frame is materialised once
+        rows = dataclass.flights_filter.select(
+            {
+                "iata_departure": self.departure_airport_autocomplete.v_model,
+                "iata_arrival": self.arrival_airport_autocomplete.v_model,
+                "airline_iata": self.airline_autocomplete.v_model,
+                "acft_icao": self.aircraft_autocomplete.v_model,
+            }
         )
-        self.aircraft_autocomplete.items = self.in_class_flights_df.acft_icao.unique().tolist()
+        self.selected_rows = rows
+        self.in_class_flights_df = dataclass.flights_filter.take(rows)
+        if len(rows) == len(dataclass.flights_df):
+            self.distance_cube = dataclass.distance_cube
+        else:
+            # aggregated once per selection, shared by all the distance plots
+            self.distance_cube = DistanceCube.from_flights(self.in_class_flights_df)
+
+    def _update_items(self, dataclass, rows=None, keep=None):
+        # remaining values of each filter in one pass, the edited filter keeps its items while used
+        columns = [
+            column
+            for column, autocomplete in self.facet_autocompletes.items()
+            if column != keep or len(autocomplete.v_model) == 0
+        ]
+        facets = dataclass.flights_filter.facets(columns, rows=rows)
+        for column in columns:
+            self.facet_autocompletes[column].items = facets[column].index.tolist()
 
-        self._plot1_update(change)
-        self._plot2_update(change)
-        self._plot3_update(change)
+    def _data_update_airline(self, change, dataclass):
+        self._filter_common_code(dataclass)
+        self._update_items(dataclass, rows=self.selected_rows, keep="airline_iata")
 
     def _data_update_aircraft(self, change, dataclass):
-        filtered_departure_airport = self.departure_airport_autocomplete.v_model
-        filtered_arrival_airport = self.arrival_airport_autocomplete.v_model
-        filtered_airline = self.airline_autocomplete.v_model
-        filtered_aircraft = self.aircraft_autocomplete.v_model
-
-        # reset local flight data with base flights_df
-        self.in_class_flights_df = dataclass.flights_df.copy()
-
-        # active departure filter
-        if filtered_departure_airport:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["iata_departure"].isin(filtered_departure_airport)
-            ].reset_index()
-
-        # active arrival filter
-        if filtered_arrival_airport:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["iata_arrival"].isin(filtered_arrival_airport)
-            ].reset_index()
-
-        # active airline filter
-        if filtered_airline:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["airline_iata"].isin(filtered_airline)
-            ].reset_index()
-
-        # active acft filter
-        if filtered_aircraft:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["acft_icao"].isin(filtered_aircraft)
-            ].reset_index()
-
-        if len(self.aircraft_autocomplete.v_model) == 0:
-            self.aircraft_autocomplete.items = self.in_class_flights_df.acft_icao.unique().tolist()
-
-        self.departure_airport_autocomplete.items = (
-            self.in_class_flights_df.iata_departure.unique().tolist()
-        )
-        self.arrival_airport_autocomplete.items = (
-            self.in_class_flights_df.iata_arrival.unique().tolist()
-        )
-        self.airline_autocomplete.items = self.in_class_flights_df.airline_iata.unique().tolist()
-
-        self._plot1_update(change)
-        self._plot2_update(change)
-        self._plot3_update(change)
+        self._filter_common_code(dataclass)
+        self._update_items(dataclass, rows=self.selected_rows, keep="acft_icao")
 
     def _data_update_arr(self, change, dataclass):
-        filtered_departure_airport = self.departure_airport_autocomplete.v_model
-        filtered_arrival_airport = self.arrival_airport_autocomplete.v_model
-        filtered_airline = self.airline_autocomplete.v_model
-        filtered_aircraft = self.aircraft_autocomplete.v_model
-
-        # reset local flight data with base flights_df
-        self.in_class_flights_df = dataclass.flights_df.copy()
-
-        # active departure filter
-        if filtered_departure_airport:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["iata_departure"].isin(filtered_departure_airport)
-            ].reset_index()
-
-        # active arrival filter
-        if filtered_arrival_airport:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["iata_arrival"].isin(filtered_arrival_airport)
-            ].reset_index()
-
-        # active airline filter
-        if filtered_airline:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["airline_iata"].isin(filtered_airline)
-            ].reset_index()
-
-        # active acft filter
-        if filtered_aircraft:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["acft_icao"].isin(filtered_aircraft)
-            ].reset_index()
-
-        if len(self.arrival_airport_autocomplete.v_model) == 0:
-            self.arrival_airport_autocomplete.items = (
-                self.in_class_flights_df.iata_arrival.unique().tolist()
-            )
-
-        self.departure_airport_autocomplete.items = (
-            self.in_class_flights_df.iata_departure.unique().tolist()
-        )
-        self.airline_autocomplete.items = self.in_class_flights_df.airline_iata.unique().tolist()
-        self.aircraft_autocomplete.items = self.in_class_flights_df.acft_icao.unique().tolist()
-
-        self._plot1_update(change)
-        self._plot2_update(change)
-        self._plot3_update(change)
+        self._filter_common_code(dataclass)
+        self._update_items(dataclass, rows=self.selected_rows, keep="iata_arrival")
 
     def _data_update_dep(self, change, dataclass):
-        filtered_departure_airport = self.departure_airport_autocomplete.v_model
-        filtered_arrival_airport = self.arrival_airport_autocomplete.v_model
-        filtered_airline = self.airline_autocomplete.v_model
-        filtered_aircraft = self.aircraft_autocomplete.v_model
-
-        # reset local flight data with base flights_df
-        self.in_class_flights_df = dataclass.flights_df.copy()
-
-        # active departure filter
-        if filtered_departure_airport:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["iata_departure"].isin(filtered_departure_airport)
-            ].reset_index()
-
-        # active arrival filter
-        if filtered_arrival_airport:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["iata_arrival"].isin(filtered_arrival_airport)
-            ].reset_index()
-
-        # active airline filter
-        if filtered_airline:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["airline_iata"].isin(filtered_airline)
-            ].reset_index()
-
-        # active acft filter
-        if filtered_aircraft:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["acft_icao"].isin(filtered_aircraft)
-            ].reset_index()
-
-        if len(self.departure_airport_autocomplete.v_model) == 0:
-            self.departure_airport_autocomplete.items = (
-                self.in_class_flights_df.iata_departure.unique().tolist()
-            )
-
-        self.arrival_airport_autocomplete.items = (
-            self.in_class_flights_df.iata_arrival.unique().tolist()
+        self._filter_common_code(dataclass)
+        self._update_items(dataclass, rows=self.selected_rows, keep="iata_departure")
+
+    def _figure_key(self, *parts):
+        # figures depend on the plot, its kind, the metric and the four filters
+        return figure_key(
+            "detailled",
+            *parts,
+            self.departure_airport_autocomplete.v_model,
+            self.arrival_airport_autocomplete.v_model,
+            self.airline_autocomplete.v_model,
+            self.aircraft_autocomplete.v_model,
         )
-        self.airline_autocomplete.items = self.in_class_flights_df.airline_iata.unique().tolist()
-        self.aircraft_autocomplete.items = self.in_class_flights_df.acft_icao.unique().tolist()
-
-        self._plot1_update(change)
-        self._plot2_update(change)
-        self._plot3_update(change)
 
     def _plot1_update(self, change):
         value_watched_flights = self.value_watched_radio.v_model
         active_main_graph_flights = self.toggle_button_plot1.v_model
 
-        if len(self.in_class_flights_df) < 20000:
+        key = self._figure_key("plot1", active_main_graph_flights, value_watched_flights)
+        if show_cached(self.output_1, key):
+            return
+
+        if active_main_graph_flights != "map" or len(self.in_class_flights_df) < MAX_ROWS_MAP:
             with self.output_1:
-                self.output_1.clear_output(wait=True)
                 if active_main_graph_flights == "map":
-                    # # grouping flighst on and OD basis, and concatenating airline and aircraft information
-
-                    flights_df_od = (
-                        self.in_class_flights_df.groupby(["iata_departure", "iata_arrival"])
-                        .agg(
-                            {
-                                "acft_icao": ", ".join,
-                                "airline_iata": ", ".join,
-                                "departure_lon": "first",
-                                "departure_lat": "first",
-                                "arrival_lon": "first",
-                                "arrival_lat": "first",
-                                "CO2 (kg)": "sum",
-                                "ASK": "sum",
-                                "Seats": "sum",
-                            }
-                        )
-                        .reset_index()
-                    )
-
-                    # Apply the function to the DataFrame column
-                    flights_df_od["airline_iata"] = flights_df_od["airline_iata"].apply(
-                        remove_duplicates
-                    )
-                    flights_df_od["acft_icao"] = flights_df_od["acft_icao"].apply(remove_duplicates)
+                    # airport pair totals of the selected rows, from the precomputed pair ids
+                    flights_df_od = self.od_table.aggregate(self.selected_rows)
                     fig_flights_1 = flight_level_plots.flights_map_plot(
                         flights_df_od, value_watched_flights
                     )
                 else:
+                    treemap_df = treemap_hierarchy(
+                        self.flights_filter,
+                        self.selected_rows,
+                        ["iata_departure", "iata_arrival", "airline_iata", "acft_icao"],
+                        value_watched_flights,
+                    )
                     fig_flights_1 = flight_level_plots.flights_treemap_plot(
-                        self.in_class_flights_df, value_watched_flights
+                        treemap_df, value_watched_flights
                     )
 
-                display(fig_flights_1)
+                self.output_1.show(FIGURE_CACHE.put(key, fig_flights_1))
 
         else:
             with self.output_1:
@@ -445,32 +293,36 @@ class DetailledTab:
         value_watched_flights = self.value_watched_radio.v_model
         active_analysis_graph_flights = self.toggle_button_plot2.v_model
 
+        key = self._figure_key("plot2", active_analysis_graph_flights, value_watched_flights)
+        if show_cached(self.output_2, key):
+            return
+
         with self.output_2:
-            self.output_2.clear_output(wait=True)
             if active_analysis_graph_flights == "hist":
                 fig_flights_2 = flight_level_plots.distance_histogram_plot_flights(
-                    self.in_class_flights_df, value_watched_flights
+                    self.distance_cube, value_watched_flights
                 )
             elif active_analysis_graph_flights == "ecdf":
-                fig_flights_2 = flight_level_plots.distance_cumul_plot_flights(
-                    self.in_class_flights_df
-                )
+                fig_flights_2 = flight_level_plots.distance_cumul_plot_flights(self.distance_cube)
             elif active_analysis_graph_flights == "kde_acft":
                 fig_flights_2 = flight_level_plots.distance_share_flights(
-                    self.in_class_flights_df, value_watched_flights
+                    self.distance_cube, value_watched_flights
                 )
             else:
                 fig_flights_2 = flight_level_plots.distance_share_dom_int_flights(
-                    self.in_class_flights_df, value_watched_flights
+                    self.distance_cube, value_watched_flights
                 )
-            display(fig_flights_2)
+            self.output_2.show(FIGURE_CACHE.put(key, fig_flights_2))
 
     def _plot3_update(self, change):
         value_watched_flights = self.value_watched_radio.v_model
         active_pie_graph_flights = self.toggle_button_plot3.v_model
 
+        key = self._figure_key("plot3", active_pie_graph_flights, value_watched_flights)
+        if show_cached(self.output_3, key):
+            return
+
         with self.output_3:
-            self.output_3.clear_output(wait=True)
             if active_pie_graph_flights == "acft":
                 fig_flights_3 = flight_level_plots.aircraft_pie_flights(
                     self.in_class_flights_df, value_watched_flights
@@ -487,7 +339,7 @@ class DetailledTab:
                 fig_flights_3 = flight_level_plots.dom_share_pie_flights(
                     self.in_class_flights_df, value_watched_flights
                 )
-            display(fig_flights_3)
+            self.output_3.show(FIGURE_CACHE.put(key, fig_flights_3))
 
     def _make_layout(self):
         h_divider = v.Divider(vertical=False)
@@ -731,7 +583,12 @@ class DetailledTab_OS:
     """
 
     def __init__(self, aeroscopedataclass):
-        self.in_class_flights_df = aeroscopedataclass.flights_df.copy()
+        PERF_MONITOR.instrument(self)
+        # No copy: filters always build new frames, the base data is never modified in place
+        self.in_class_flights_df = aeroscopedataclass.flights_df
+        self.distance_cube = aeroscopedataclass.distance_cube
+        self.od_table = aeroscopedataclass.od_table
+        self.flights_filter = aeroscopedataclass.flights_filter
 
         ## define widgets
         # Airline filter
@@ -823,327 +680,171 @@ class DetailledTab_OS:
             ],
         )
 
-        self.output_1 = Output()
-        self.output_2 = Output()
-        self.output_3 = Output()
+        self.output_1 = FigureOutput()
+        self.output_2 = FigureOutput()
+        self.output_3 = FigureOutput()
+
+        # filter widget of each flights_df column, their items are refreshed together
+        self.facet_autocompletes = {
+            "origin": self.departure_airport_autocomplete,
+            "dest": self.arrival_airport_autocomplete,
+            "airline_iata": self.airline_autocomplete,
+            "acft_icao": self.aircraft_autocomplete,
+        }
+        self.selected_rows = None
 
         self._render_initial_plots(aeroscopedataclass)
         self._make_connections(aeroscopedataclass)
         self._make_layout()
 
     def _make_connections(self, dataclass):
-        self.reset_all_button.on_event("click", partial(self._reset_all, dataclass=dataclass))
+        # one update cycle per interaction: a filter edit supersedes the pending ones, the plots
+        # run once after it (reset button included)
+        self.scheduler = UpdateScheduler()
+        self.scheduler.on_event(
+            self.reset_all_button, "click", partial(self._reset_all, dataclass=dataclass)
+        )
 
-        self.departure_airport_autocomplete.observe(
-            partial(self._data_update_dep, dataclass=dataclass), names="v_model"
+        self.scheduler.observe(
+            self.departure_airport_autocomplete,
+            partial(self._data_update_dep, dataclass=dataclass),
+            key="data",
         )
-        self.arrival_airport_autocomplete.observe(
-            partial(self._data_update_arr, dataclass=dataclass), names="v_model"
+        self.scheduler.observe(
+            self.arrival_airport_autocomplete,
+            partial(self._data_update_arr, dataclass=dataclass),
+            key="data",
         )
-        self.airline_autocomplete.observe(
-            partial(self._data_update_airline, dataclass=dataclass), names="v_model"
+        self.scheduler.observe(
+            self.airline_autocomplete,
+            partial(self._data_update_airline, dataclass=dataclass),
+            key="data",
         )
-        self.aircraft_autocomplete.observe(
-            partial(self._data_update_aircraft, dataclass=dataclass), names="v_model"
+        self.scheduler.observe(
+            self.aircraft_autocomplete,
+            partial(self._data_update_aircraft, dataclass=dataclass),
+            key="data",
         )
+        for autocomplete in self.facet_autocompletes.values():
+            self.scheduler.observe(autocomplete, self._plot1_update)
+            self.scheduler.observe(autocomplete, self._plot2_update)
+            self.scheduler.observe(autocomplete, self._plot3_update)
 
-        self.value_watched_radio.observe(self._plot1_update, names="v_model")
-        self.value_watched_radio.observe(self._plot2_update, names="v_model")
-        self.value_watched_radio.observe(self._plot3_update, names="v_model")
+        self.scheduler.observe(self.value_watched_radio, self._plot1_update)
+        self.scheduler.observe(self.value_watched_radio, self._plot2_update)
+        self.scheduler.observe(self.value_watched_radio, self._plot3_update)
 
-        self.toggle_button_plot1.observe(self._plot1_update, names="v_model")
-        self.toggle_button_plot2.observe(self._plot2_update, names="v_model")
-        self.toggle_button_plot3.observe(self._plot3_update, names="v_model")
+        self.scheduler.observe(self.toggle_button_plot1, self._plot1_update)
+        self.scheduler.observe(self.toggle_button_plot2, self._plot2_update)
+        self.scheduler.observe(self.toggle_button_plot3, self._plot3_update)
 
     def _reset_all(self, widget, event, data, dataclass):
         self.departure_airport_autocomplete.v_model = list()
         self.arrival_airport_autocomplete.v_model = list()
         self.airline_autocomplete.v_model = list()
         self.aircraft_autocomplete.v_model = list()
-        self.departure_airport_autocomplete.items = dataclass.flights_df.origin.unique().tolist()
-        self.arrival_airport_autocomplete.items = dataclass.flights_df.dest.unique().tolist()
-        self.airline_autocomplete.items = dataclass.flights_df.airline_iata.unique().tolist()
-        self.aircraft_autocomplete.items = dataclass.flights_df.acft_icao.unique().tolist()
+        self._update_items(dataclass)
 
     def _render_initial_plots(self, dataclass):
-        with self.output_1:
-            print("Too much data selected for flight map rendering")
+        # the map is drawn when the dataset is under MAX_ROWS_MAP flights, as after a reset
+        self._plot1_update(None)
 
         with self.output_2:
             fig_flights_2 = flight_level_plots.distance_histogram_plot_flights(
-                dataclass.flights_df, "n_flights"
+                dataclass.distance_cube, "n_flights"
             )
-            display(fig_flights_2)
+            self.output_2.show(fig_flights_2)
 
         with self.output_3:
             fig_flights_3 = flight_level_plots.aircraft_pie_flights(
                 dataclass.flights_df, "n_flights"
             )
-            display(fig_flights_3)
-
-    def _data_update_airline(self, change, dataclass):
-        filtered_departure_airport = self.departure_airport_autocomplete.v_model
-        filtered_arrival_airport = self.arrival_airport_autocomplete.v_model
-        filtered_airline = self.airline_autocomplete.v_model
-        filtered_aircraft = self.aircraft_autocomplete.v_model
-
-        # reset local flight data with base flights_df
-        self.in_class_flights_df = dataclass.flights_df.copy()
-
-        # active departure filter
-        if filtered_departure_airport:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["origin"].isin(filtered_departure_airport)
-            ].reset_index()
-
-        # active arrival filter
-        if filtered_arrival_airport:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["dest"].isin(filtered_arrival_airport)
-            ].reset_index()
-
-        # active airline filter
-        if filtered_airline:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["airline_iata"].isin(filtered_airline)
-            ].reset_index()
-
-        # active acft filter
-        if filtered_aircraft:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["acft_icao"].isin(filtered_aircraft)
-            ].reset_index()
-
-        if len(self.airline_autocomplete.v_model) == 0:
-            self.airline_autocomplete.items = (
-                self.in_class_flights_df.airline_iata.unique().tolist()
-            )
-
-        self.departure_airport_autocomplete.items = (
-            self.in_class_flights_df.origin.unique().tolist()
+            self.output_3.show(fig_flights_3)
+
+    def _filter_common_code(self, dataclass):
+        # one pass over the inverted indexes, the filtered frame is materialised once
+        rows = dataclass.flights_filter.select(
+            {
+                "origin": self.departure_airport_autocomplete.v_model,
+                "dest": self.arrival_airport_autocomplete.v_model,
+                "airline_iata": self.airline_autocomplete.v_model,
+                "acft_icao": self.aircraft_autocomplete.v_model,
+            }
         )
-        self.arrival_airport_autocomplete.items = self.in_class_flights_df.dest.unique().tolist()
-        self.aircraft_autocomplete.items = self.in_class_flights_df.acft_icao.unique().tolist()
+        self.selected_rows = rows
+        self.in_class_flights_df = dataclass.flights_filter.take(rows)
+        if len(rows) == len(dataclass.flights_df):
+            self.distance_cube = dataclass.distance_cube
+        else:
+            # aggregated once per selection, shared by all the distance plots
+            self.distance_cube = DistanceCube.from_flights(self.in_class_flights_df)
+
+    def _update_items(self, dataclass, rows=None, keep=None):
+        # remaining values of each filter in one pass, the edited filter keeps its items while used
+        columns = [
+            column
+            for column, autocomplete in self.facet_autocompletes.items()
+            if column != keep or len(autocomplete.v_model) == 0
+        ]
+        facets = dataclass.flights_filter.facets(columns, rows=rows)
+        for column in columns:
+            self.facet_autocompletes[column].items = facets[column].index.tolist()
 
-        self._plot1_update(change)
-        self._plot2_update(change)
-        self._plot3_update(change)
+    def _data_update_airline(self, change, dataclass):
+        self._filter_common_code(dataclass)
+        self._update_items(dataclass, rows=self.selected_rows, keep="airline_iata")
 
     def _data_update_aircraft(self, change, dataclass):
-        filtered_departure_airport = self.departure_airport_autocomplete.v_model
-        filtered_arrival_airport = self.arrival_airport_autocomplete.v_model
-        filtered_airline = self.airline_autocomplete.v_model
-        filtered_aircraft = self.aircraft_autocomplete.v_model
-
-        # reset local flight data with base flights_df
-        self.in_class_flights_df = dataclass.flights_df.copy()
-
-        # active departure filter
-        if filtered_departure_airport:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["origin"].isin(filtered_departure_airport)
-            ].reset_index()
-
-        # active arrival filter
-        if filtered_arrival_airport:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["dest"].isin(filtered_arrival_airport)
-            ].reset_index()
-
-        # active airline filter
-        if filtered_airline:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["airline_iata"].isin(filtered_airline)
-            ].reset_index()
-
-        # active acft filter
-        if filtered_aircraft:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["acft_icao"].isin(filtered_aircraft)
-            ].reset_index()
-
-        if len(self.aircraft_autocomplete.v_model) == 0:
-            self.aircraft_autocomplete.items = self.in_class_flights_df.acft_icao.unique().tolist()
-
-        self.departure_airport_autocomplete.items = (
-            self.in_class_flights_df.origin.unique().tolist()
-        )
-        self.arrival_airport_autocomplete.items = self.in_class_flights_df.dest.unique().tolist()
-        self.airline_autocomplete.items = self.in_class_flights_df.airline_iata.unique().tolist()
-
-        self._plot1_update(change)
-        self._plot2_update(change)
-        self._plot3_update(change)
+        self._filter_common_code(dataclass)
+        self._update_items(dataclass, rows=self.selected_rows, keep="acft_icao")
 
     def _data_update_arr(self, change, dataclass):
-        filtered_departure_airport = self.departure_airport_autocomplete.v_model
-        filtered_arrival_airport = self.arrival_airport_autocomplete.v_model
-        filtered_airline = self.airline_autocomplete.v_model
-        filtered_aircraft = self.aircraft_autocomplete.v_model
-
-        # reset local flight data with base flights_df
-        self.in_class_flights_df = dataclass.flights_df.copy()
-
-        # active departure filter
-        if filtered_departure_airport:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["origin"].isin(filtered_departure_airport)
-            ].reset_index()
-
-        # active arrival filter
-        if filtered_arrival_airport:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["dest"].isin(filtered_arrival_airport)
-            ].reset_index()
-
-        # active airline filter
-        if filtered_airline:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["airline_iata"].isin(filtered_airline)
-            ].reset_index()
-
-        # active acft filter
-        if filtered_aircraft:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["acft_icao"].isin(filtered_aircraft)
-            ].reset_index()
-
-        if len(self.arrival_airport_autocomplete.v_model) == 0:
-            self.arrival_airport_autocomplete.items = (
-                self.in_class_flights_df.dest.unique().tolist()
-            )
-
-        self.departure_airport_autocomplete.items = (
-            self.in_class_flights_df.origin.unique().tolist()
-        )
-        self.airline_autocomplete.items = self.in_class_flights_df.airline_iata.unique().tolist()
-        self.aircraft_autocomplete.items = self.in_class_flights_df.acft_icao.unique().tolist()
-
-        self._plot1_update(change)
-        self._plot2_update(change)
-        self._plot3_update(change)
+        self._filter_common_code(dataclass)
+        self._update_items(dataclass, rows=self.selected_rows, keep="dest")
 
     def _data_update_dep(self, change, dataclass):
-        filtered_departure_airport = self.departure_airport_autocomplete.v_model
-        filtered_arrival_airport = self.arrival_airport_autocomplete.v_model
-        filtered_airline = self.airline_autocomplete.v_model
-        filtered_aircraft = self.aircraft_autocomplete.v_model
-
-        # reset local flight data with base flights_df
-        self.in_class_flights_df = dataclass.flights_df.copy()
-
-        # active departure filter
-        if filtered_departure_airport:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["origin"].isin(filtered_departure_airport)
-            ].reset_index()
-
-        # active arrival filter
-        if filtered_arrival_airport:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["dest"].isin(filtered_arrival_airport)
-            ].reset_index()
-
-        # active airline filter
-        if filtered_airline:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["airline_iata"].isin(filtered_airline)
-            ].reset_index()
-
-        # active acft filter
-        if filtered_aircraft:
-            if "level_0" in self.in_class_flights_df.columns:
-                self.in_class_flights_df.drop("level_0", axis=1, inplace=True)
-            self.in_class_flights_df = self.in_class_flights_df[
-                self.in_class_flights_df["acft_icao"].isin(filtered_aircraft)
-            ].reset_index()
-
-        if len(self.departure_airport_autocomplete.v_model) == 0:
-            self.departure_airport_autocomplete.items = (
-                self.in_class_flights_df.origin.unique().tolist()
-            )
-
-        self.arrival_airport_autocomplete.items = self.in_class_flights_df.dest.unique().tolist()
-        self.airline_autocomplete.items = self.in_class_flights_df.airline_iata.unique().tolist()
-        self.aircraft_autocomplete.items = self.in_class_flights_df.acft_icao.unique().tolist()
-
-        self._plot1_update(change)
-        self._plot2_update(change)
-        self._plot3_update(change)
+        self._filter_common_code(dataclass)
+        self._update_items(dataclass, rows=self.selected_rows, keep="origin")
+
+    def _figure_key(self, *parts):
+        # figures depend on the plot, its kind, the metric and the four filters
+        return figure_key(
+            "detailled_os",
+            *parts,
+            self.departure_airport_autocomplete.v_model,
+            self.arrival_airport_autocomplete.v_model,
+            self.airline_autocomplete.v_model,
+            self.aircraft_autocomplete.v_model,
+        )
 
     def _plot1_update(self, change):
         value_watched_flights = self.value_watched_radio.v_model
         active_main_graph_flights = self.toggle_button_plot1.v_model
 
-        if len(self.in_class_flights_df) < 20000:
+        key = self._figure_key("plot1", active_main_graph_flights, value_watched_flights)
+        if show_cached(self.output_1, key):
+            return
+
+        if active_main_graph_flights != "map" or len(self.in_class_flights_df) < MAX_ROWS_MAP:
             with self.output_1:
-                self.output_1.clear_output(wait=True)
                 if active_main_graph_flights == "map":
-                    # # grouping flighst on and OD basis, and concatenating airline and aircraft information
-
-                    flights_df_od = (
-                        self.in_class_flights_df.groupby(["origin", "dest"])
-                        .agg(
-                            {
-                                "acft_icao": ", ".join,
-                                "airline_iata": ", ".join,
-                                "departure_lon": "first",
-                                "departure_lat": "first",
-                                "arrival_lon": "first",
-                                "arrival_lat": "first",
-                                "CO2 (kg)": "sum",
-                                "ASK": "sum",
-                                "Seats": "sum",
-                                "n_flights": "sum",
-                            }
-                        )
-                        .reset_index()
-                    )
-
-                    # Apply the function to the DataFrame column
-                    flights_df_od["airline_iata"] = flights_df_od["airline_iata"].apply(
-                        remove_duplicates
-                    )
-                    flights_df_od["acft_icao"] = flights_df_od["acft_icao"].apply(remove_duplicates)
+                    # airport pair totals of the selected rows, from the precomputed pair ids
+                    flights_df_od = self.od_table.aggregate(self.selected_rows)
                     fig_flights_1 = flight_level_plots.flights_map_plot_OS(
                         flights_df_od, value_watched_flights
                     )
                 else:
+                    treemap_df = treemap_hierarchy(
+                        self.flights_filter,
+                        self.selected_rows,
+                        ["origin", "dest", "airline_iata", "acft_icao"],
+                        value_watched_flights,
+                    )
                     fig_flights_1 = flight_level_plots.flights_treemap_plot_OS(
-                        self.in_class_flights_df, value_watched_flights
+                        treemap_df, value_watched_flights
                     )
 
-                display(fig_flights_1)
+                self.output_1.show(FIGURE_CACHE.put(key, fig_flights_1))
 
         else:
             with self.output_1:
@@ -1154,32 +855,38 @@ class DetailledTab_OS:
         value_watched_flights = self.value_watched_radio.v_model
         active_analysis_graph_flights = self.toggle_button_plot2.v_model
 
+        key = self._figure_key("plot2", active_analysis_graph_flights, value_watched_flights)
+        if show_cached(self.output_2, key):
+            return
+
         with self.output_2:
-            self.output_2.clear_output(wait=True)
             if active_analysis_graph_flights == "hist":
                 fig_flights_2 = flight_level_plots.distance_histogram_plot_flights(
-                    self.in_class_flights_df, value_watched_flights
+                    self.distance_cube, value_watched_flights
                 )
             elif active_analysis_graph_flights == "ecdf":
                 fig_flights_2 = flight_level_plots.distance_cumul_plot_flights_OS(
-                    self.in_class_flights_df
+                    self.distance_cube
                 )
             elif active_analysis_graph_flights == "kde_acft":
                 fig_flights_2 = flight_level_plots.distance_share_flights(
-                    self.in_class_flights_df, value_watched_flights
+                    self.distance_cube, value_watched_flights
                 )
             else:
                 fig_flights_2 = flight_level_plots.distance_share_dom_int_flights(
-                    self.in_class_flights_df, value_watched_flights
+                    self.distance_cube, value_watched_flights
                 )
-            display(fig_flights_2)
+            self.output_2.show(FIGURE_CACHE.put(key, fig_flights_2))
 
     def _plot3_update(self, change):
         value_watched_flights = self.value_watched_radio.v_model
         active_pie_graph_flights = self.toggle_button_plot3.v_model
 
+        key = self._figure_key("plot3", active_pie_graph_flights, value_watched_flights)
+        if show_cached(self.output_3, key):
+            return
+
         with self.output_3:
-            self.output_3.clear_output(wait=True)
             if active_pie_graph_flights == "acft":
                 fig_flights_3 = flight_level_plots.aircraft_pie_flights(
                     self.in_class_flights_df, value_watched_flights
@@ -1196,7 +903,7 @@ class DetailledTab_OS:
                 fig_flights_3 = flight_level_plots.dom_share_pie_flights(
                     self.in_class_flights_df, value_watched_flights
                 )
-            display(fig_flights_3)
+            self.output_3.show(FIGURE_CACHE.put(key, fig_flights_3))
 
     def _make_layout(self):
         h_divider = v.Divider(vertical=False)
@@ -1439,14 +1146,3 @@ class DetailledTab_OS:
         )
 
         self.layout = v.Row(children=[col_selects_flights, v_divider, col_plots_flights])
-
-
-# Function to remove duplicates from a comma-separated string
-def remove_duplicates(input_str):
-    # Split the string into a list of substrings
-    substrings = input_str.split(", ")
-    # Remove duplicates and preserve the order
-    unique_substrings = list(dict.fromkeys(substrings))
-    # Join the unique substrings back into a single string
-    result_str = ", ".join(unique_substrings)
-    return result_str
@@ -0,0 +1,139 @@
+"""
+Distance-binned aggregates of the flight-level data.
+
+The distance bin of each flight (500 km for the histograms and shares, 10 km for the cumulative
+curves) is stored as a column when the plot files are loaded, -1 for flights without a distance.
+The columnar cache of flights_df is keyed on the bin widths and DISTANCE_BINS_VERSION, so cached
+bins are rebuilt when the binning changes. A DistanceCube holds the metric totals of a set of
+flights per bin and per aircraft class, flight type and continents: the distance plots slice
+these few hundred cells instead of cutting and grouping the flights again at each redraw.
+"""
+
+import numpy as np
+import pandas as pd
+
+from perf_monitor import AGGREGATION_STAGE, timed_stage
+
+HISTOGRAM_BIN_WIDTH = 500
+PROFILE_BIN_WIDTH = 10
+# Version of the bin columns of add_distance_bins, stored in the flights_df cache with the bin
+# widths: bump it whenever the binning changes
+DISTANCE_BINS_VERSION = 1
+
+CUBE_DIMENSIONS = ["acft_class", "domestic", "departure_continent", "arrival_continent"]
+CUBE_METRICS = [
+    "Seats",
+    "ASK",
+    "CO2 (kg)",
+    "CO2 (Mt)",
+    "ASK (Bn)",
+    "Seats (Mn)",
+    "n_flights",
+]
+
+
+def add_distance_bins(flights_df):
+    """Add the 500 km (distance_bin) and 10 km (distance_bin_10) bin ids of each flight."""
+    flights_df["distance_bin"] = _bin_ids(flights_df["distance_km"], HISTOGRAM_BIN_WIDTH)
+    flights_df["distance_bin_10"] = _bin_ids(flights_df["distance_km"], PROFILE_BIN_WIDTH)
+    return flights_df
+
+
+class DistanceCube:
+    """
+    Metric totals of a set of flights per distance bin.
+
+    Bins are closed on the left: a 500 km flight is in the 500-1000 km bin. The bins of a cube
+    go from 0 to the longest flight of the set, empty bins included. Flights without a distance
+    are left out, as in the range totals of the AeroMAPS table.
+    """
+
+    def __init__(self, cells, profile=None):
+        # cells: metric totals indexed by (distance_bin, *CUBE_DIMENSIONS)
+        # profile: metric totals per 10 km bin, not split by dimension
+        self.cells = cells
+        self.profile = profile
+
+        bins = cells.index.get_level_values("distance_bin")
+        self.n_bins = int(bins.max()) + 1 if len(cells) else 0
+        if profile is not None and len(profile):
+            self.n_profile_bins = int(profile.index.max()) + 1
+        else:
+            self.n_profile_bins = 0
+
+    @classmethod
+    @timed_stage(AGGREGATION_STAGE)
+    def from_flights(cls, flights_df):
+        """Aggregate a flights frame, in one groupby per bin width."""
+        metrics = [metric for metric in CUBE_METRICS if metric in flights_df.columns]
+        if "distance_bin" in flights_df.columns:
+            bins = flights_df["distance_bin"]
+            profile_bins = flights_df["distance_bin_10"]
+        else:
+            bins = _bin_ids(flights_df["distance_km"], HISTOGRAM_BIN_WIDTH)
+            profile_bins = _bin_ids(flights_df["distance_km"], PROFILE_BIN_WIDTH)
+        # Flights without a distance are in bin -1
+        has_distance = bins.to_numpy() >= 0
+        if not has_distance.all():
+            flights_df = flights_df[has_distance]
+            bins = bins[has_distance]
+            profile_bins = profile_bins[has_distance]
+
+        # float32 metrics, summed in float64
+        values = flights_df[metrics].astype("float64")
+        cells = values.groupby(
+            [bins.rename("distance_bin")] + [flights_df[column] for column in CUBE_DIMENSIONS],
+            observed=True,
+            dropna=False,
+        ).sum()
+        profile = values.groupby(profile_bins.rename("distance_bin_10")).sum()
+        return cls(cells, profile)
+
+    @property
+    def empty(self):
+        return len(self.cells) == 0
+
+    @property
+    def bin_edges(self):
+        return [b * HISTOGRAM_BIN_WIDTH for b in range(self.n_bins + 1)]
+
+    @property
+    def bin_centers(self):
+        return [(b + 0.5) * HISTOGRAM_BIN_WIDTH for b in range(self.n_bins)]
+
+    @property
+    def profile_edges(self):
+        return [(b + 1) * PROFILE_BIN_WIDTH for b in range(self.n_profile_bins)]
+
+    def select(self, **dimension_values):
+        """Cube of the flights whose dimensions are in the given values (without 10 km profile)."""
+        cells = self.cells
+        for dimension, values in dimension_values.items():
+            cells = cells[cells.index.get_level_values(dimension).isin(values)]
+        return DistanceCube(cells)
+
+    def histogram(self, metric, by=None):
+        """Metric total per bin, one column per value of the by dimension if given."""
+        if by is None:
+            totals = self.cells[metric].groupby(level="distance_bin").sum()
+        else:
+            totals = (
+                self.cells[metric]
+                .groupby(level=["distance_bin", by], observed=True)
+                .sum()
+                .unstack(fill_value=0)
+            )
+        return totals.reindex(range(self.n_bins), fill_value=0)
+
+    def cumulative(self, metric):
+        """Cumulative share (%) of the metric up to the end of each 10 km bin."""
+        profile = self.profile[metric].reindex(range(self.n_profile_bins), fill_value=0)
+        return profile.cumsum() / profile.sum() * 100
+
+
+def _bin_ids(distance, bin_width):
+    values = distance.to_numpy(dtype="float64")
+    bins = np.full(len(values), -1, dtype=np.int16)
+    finite = np.isfinite(values)
+    bins[finite] = values[finite] // bin_width
+    return pd.Series(bins, index=distance.index, name=distance.name)
@@ -0,0 +1,126 @@
+"""
+Cache of the figures drawn by the tabs.
+
+Flipping a radio button or a plot toggle back to a view seen seconds ago used to rebuild the
+figure from scratch. Figures are stored in a bounded LRU cache keyed on a canonical hash of what
+they depend on (dataset, tab, plot, plot kind, metric and filter selection). The cache is shared
+by all the tabs of a kernel and evicts the least recently used figures when it holds too many
+figures or too many bytes (estimated from the arrays and values of their traces and layout,
+without serializing them).
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from plotly.basedatatypes import BaseFigure
+
+_LOGGER = logging.getLogger(__name__)
+
+MAX_ENTRIES = 128
+MAX_BYTES = 64 * 1024 * 1024
+
+
+def figure_key(*parts):
+    """
+    Canonical hash of the parts a figure depends on.
+
+    Lists and tuples (filter selections) are sorted: selecting A then B or B then A gives the
+    same key.
+    """
+    canonical = [
+        sorted(map(str, part)) if isinstance(part, (list, tuple)) else part for part in parts
+    ]
+    return hashlib.sha1(json.dumps(canonical, default=str).encode()).hexdigest()
+
+
+def figure_bytes(fig):
+    """Estimated size of a figure: bytes of its data arrays, length of its strings."""
+    return _value_bytes(fig.to_plotly_json())
+
+
+def _value_bytes(value):
+    if isinstance(value, np.ndarray):
+        if value.dtype == object:
+            return sum(_value_bytes(item) for item in value.flat)
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(len(key) + _value_bytes(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(_value_bytes(item) for item in value)
+    if isinstance(value, str):
+        return len(value)
+    return 8
+
+
+class FigureCache:
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.n_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        # figures are stored from the render threads
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Cached figure, None if missing."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, fig):
+        """Store a figure and return it. Anything else than a figure (messages) is not cached."""
+        if not isinstance(fig, BaseFigure):
+            return fig
+        n_bytes = figure_bytes(fig)
+        if n_bytes > self.max_bytes:
+            return fig
+
+        with self._lock:
+            if key in self._entries:
+                self.n_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (fig, n_bytes)
+            self.n_bytes += n_bytes
+            while len(self._entries) > self.max_entries or self.n_bytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.n_bytes -= evicted_bytes
+        return fig
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.n_bytes = 0
+
+
+# One cache per kernel, shared by the tabs
+FIGURE_CACHE = FigureCache()
+
+
+def show_cached(output, key):
+    """Show the cached figure of key in a FigureOutput. Returns False on a cache miss."""
+    fig = FIGURE_CACHE.get(key)
+    if fig is None:
+        return False
+    output.show(fig)
+    _LOGGER.debug(
+        "Figure cache hit (%d figures, %.1f MB)", len(FIGURE_CACHE), FIGURE_CACHE.n_bytes / 1e6
+    )
+    return True
+
+
+def render_cached(output, key, plot_function, *args):
+    """Build plot_function(*args) in the render pool of a FigureOutput, cache it and show it."""
+    output.render(lambda: FIGURE_CACHE.put(key, plot_function(*args)))
@@ -0,0 +1,217 @@
+"""
+Output widget holding a persistent plotly FigureWidget.
+
+Redrawing with clear_output() + display(figure) sends the whole figure json (world geo layout
+included) to the browser, which lays the plot out again from scratch. A FigureOutput keeps the
+FigureWidget it displays: when the new figure has the same structure (trace types, set
+properties and layout keys), only the changed data and layout values are sent as one batched
+restyle/relayout. Traces are added or removed in place when only their number changes, as for the
+route maps. Other figures and messages replace the content of the output, clearing the output
+forgets the figure widget.
+
+Figures can also be built in a pool of worker threads (render()), so that the plots of a tab are
+built in parallel while the kernel keeps handling widget events. Each output counts its
+renders: showing anything newer (another render, a cached figure, a message) supersedes the
+pending one, which is cancelled if it has not started yet and discarded when it completes.
+
+With the performance monitor enabled, the build time and the size of the json sent (the changes
+only when updated in place) are recorded for the callback that rendered the figure.
+"""
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import plotly.graph_objects as go
+from IPython.display import display
+from ipywidgets import Output
+from plotly.basedatatypes import BaseFigure
+from plotly.io.json import to_json_plotly
+
+from perf_monitor import PAYLOAD_STAGE, PERF_MONITOR
+
+_LOGGER = logging.getLogger(__name__)
+
+# One worker per plot of a tab
+RENDER_WORKERS = 3
+
+_render_pool = None
+
+
+class FigureOutput(Output):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.widget = None
+        self.n_diffs = 0
+        self.n_redraws = 0
+        # plotly json of the layout and traces the widget shows
+        self._shown = None
+        # render token: only the render of the current generation is shown
+        self.generation = 0
+        self.n_cancelled = 0
+        self.n_discarded = 0
+        self._future = None
+
+    def show(self, content):
+        """Show a figure (updating the displayed one when possible) or any other content."""
+        self._supersede()
+        self._show(content, PERF_MONITOR.current())
+
+    def clear_output(self, *args, **kwargs):
+        self._supersede()
+        self._clear_output(*args, **kwargs)
+
+    def render(self, build):
+        """
+        Show the figure returned by build(), built in the render pool.
+
+        build runs in a worker thread: it must only use values captured when it was created.
+        Without a running event loop (scripts), it is built and shown right away.
+        """
+        self._supersede()
+        callback = PERF_MONITOR.current()
+        build = PERF_MONITOR.timed_build(build)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._show(build(), callback)
+            return
+
+        generation = self.generation
+        self._future = _get_render_pool().submit(build)
+        self._future.add_done_callback(
+            lambda future: loop.call_soon_threadsafe(self._deliver, future, generation, callback)
+        )
+
+    def _supersede(self):
+        self.generation += 1
+        if self._future is not None:
+            if self._future.cancel():
+                self.n_cancelled += 1
+            self._future = None
+
+    def _deliver(self, future, generation, callback):
+        # Back on the kernel thread
+        if future.cancelled():
+            return
+        if generation != self.generation:
+            self.n_discarded += 1
+            return
+        self._future = None
+        error = future.exception()
+        if error is not None:
+            # Shown in the output, as the errors of the callbacks building figures in place
+            with self:
+                self._clear_output(wait=True)
+                raise error
+        self._show(future.result(), callback)
+
+    def _show(self, content, callback=None):
+        # callback: the one that showed the content, its payload is recorded
+        record = PERF_MONITOR.enabled and callback is not None
+        if isinstance(content, BaseFigure):
+            shown = (content.layout.to_plotly_json(), [t.to_plotly_json() for t in content.data])
+            changes = None
+            if self.widget is not None:
+                changes = self._update_in_place(content, *shown)
+            if changes is not None:
+                self._shown = shown
+                self.n_diffs += 1
+                if record:
+                    PERF_MONITOR.record(callback, PAYLOAD_STAGE, len(to_json_plotly(changes)))
+                return
+            if record:
+                PERF_MONITOR.record(callback, PAYLOAD_STAGE, len(content.to_json()))
+
+        with self:
+            self._clear_output(wait=True)
+            if isinstance(content, BaseFigure):
+                self.widget = go.FigureWidget(content)
+                self._shown = shown
+                self.n_redraws += 1
+                content = self.widget
+            display(content)
+
+    def _clear_output(self, *args, **kwargs):
+        # Whatever is displayed next, the figure widget is gone
+        self.widget = None
+        self._shown = None
+        super().clear_output(*args, **kwargs)
+
+    def _update_in_place(self, fig, layout, traces):
+        # Changes sent to the widget, None when the figure must be redrawn
+        widget = self.widget
+        shown_layout, shown_traces = self._shown
+        if _skeleton(shown_layout) != _skeleton(layout):
+            return None
+        n_common = min(len(shown_traces), len(traces))
+        for shown_trace, trace in zip(shown_traces[:n_common], traces):
+            if _skeleton(shown_trace) != _skeleton(trace):
+                return None
+
+        # Trace removals and additions cannot be batched with the restyle
+        sent = []
+        if len(widget.data) > len(traces):
+            widget.data = widget.data[: len(traces)]
+        elif len(widget.data) < len(traces):
+            widget.add_traces(fig.data[n_common:])
+            sent.extend(traces[n_common:])
+
+        # Same properties set on both sides: only the changed values are assigned (and sent to
+        # the browser), every other one is already right
+        with widget.batch_update():
+            for widget_trace, shown_trace, trace in zip(widget.data, shown_traces, traces):
+                changes = _changes(shown_trace, trace)
+                if changes:
+                    widget_trace.update(changes)
+                    sent.append(changes)
+            changes = _changes(shown_layout, layout)
+            if changes:
+                widget.layout.update(changes)
+                sent.append(changes)
+        _LOGGER.debug("Figure updated in place (%d traces)", len(traces))
+        return sent
+
+
+def _get_render_pool():
+    global _render_pool
+    if _render_pool is None:
+        _render_pool = ThreadPoolExecutor(
+            max_workers=RENDER_WORKERS, thread_name_prefix="aeroscope-render"
+        )
+    return _render_pool
+
+
+def _skeleton(properties):
+    # Nested property names of a plotly json, values (arrays included) are leaves
+    if isinstance(properties, dict):
+        return {name: _skeleton(value) for name, value in properties.items()}
+    return None
+
+
+def _changes(shown, new):
+    # Top level properties of new that differ from the shown ones
+    return {
+        name: value
+        for name, value in new.items()
+        if name not in ("type", "uid") and not _equal(shown[name], value)
+    }
+
+
+def _equal(a, b):
+    if isinstance(a, dict) or isinstance(b, dict):
+        return (
+            isinstance(a, dict)
+            and isinstance(b, dict)
+            and a.keys() == b.keys()
+            and all(_equal(a[name], b[name]) for name in a)
+        )
+    if isinstance(a, (list, tuple, np.ndarray)) or isinstance(b, (list, tuple, np.ndarray)):
+        a, b = np.asarray(a), np.asarray(b)
+        if a.shape != b.shape:
+            return False
+        if a.dtype.kind in "biuf" and b.dtype.kind in "biuf":
+            return bool(np.array_equal(a, b, equal_nan=a.dtype.kind == "f"))
+        return bool(np.array_equal(a.astype(object), b.astype(object)))
+    return a == b
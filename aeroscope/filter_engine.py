@@ -0,0 +1,160 @@
+"""
+Inverted-index filtering of the flight-level data.
+
+The tabs filter flights_df on conjunctions of "column value in selected values" conditions. The
+engine keeps, for each filterable column, the integer code of every row and the row ids grouped
+by code (built on first use of the column). A selection starts from the row ids of the most
+selective condition and only checks the other conditions on these rows, it returns sorted row
+positions that are materialised once with take().
+
+Distance ranges are resolved on the row ids sorted by distance_km: a range is the slice between
+two binary searches.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class FilterEngine:
+    """Row selections over one flights_df, built once per dataset and shared by the tabs."""
+
+    def __init__(self, flights_df):
+        self.flights_df = flights_df
+        self.n_rows = len(flights_df)
+        self._row_dtype = np.int32 if self.n_rows < np.iinfo(np.int32).max else np.int64
+        self._codes = {}
+        self._postings = {}
+        self._distance_index = None
+
+    def codes(self, column):
+        """Integer code of each row and the values they stand for."""
+        if column not in self._codes:
+            series = self.flights_df[column]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                # Codes of a memory-mapped categorical stay memory-mapped
+                codes, categories = series.cat.codes.to_numpy(), series.cat.categories
+            else:
+                codes, categories = pd.factorize(series)
+            self._codes[column] = (codes, pd.Index(categories))
+        return self._codes[column]
+
+    def value_codes(self, column, values):
+        """Codes of the given values, values absent from the column are skipped."""
+        codes = self.codes(column)[1].get_indexer(list(values))
+        return codes[codes >= 0]
+
+    def rows(self, column, values):
+        """Sorted positions of the rows whose column is in values."""
+        order, offsets = self._posting(column)
+        chunks = [
+            order[offsets[code] : offsets[code + 1]] for code in self.value_codes(column, values)
+        ]
+        if not chunks:
+            return np.empty(0, dtype=self._row_dtype)
+        return np.sort(np.concatenate(chunks))
+
+    def select(self, filters, distance_range=None):
+        """
+        Sorted positions of the rows matching all the filters.
+
+        filters maps a column to its selected values, columns without selected values are
+        ignored. distance_range is an optional inclusive (min, max) bound on distance_km.
+        """
+        active = {column: values for column, values in filters.items() if len(values)}
+        if active:
+            # Start from the most selective condition, its posting lists give the candidate rows
+            counts = {column: self._count(column, values) for column, values in active.items()}
+            first = min(counts, key=counts.get)
+            rows = self.rows(first, active.pop(first))
+            for column, values in active.items():
+                lookup = np.zeros(len(self.codes(column)[1]) + 1, dtype=bool)
+                lookup[self.value_codes(column, values)] = True
+                # Missing values have code -1: they pick the trailing False
+                rows = rows[lookup[self.codes(column)[0][rows]]]
+        else:
+            rows = None
+
+        if distance_range is not None:
+            start, end = self.distance_bounds(distance_range)
+            if rows is None:
+                if end - start < self.n_rows:
+                    rows = np.sort(self.distance_index()[0][start:end])
+            elif start > 0 or end < self.n_rows:
+                distance = self.flights_df["distance_km"].to_numpy()[rows]
+                rows = rows[(distance >= distance_range[0]) & (distance <= distance_range[1])]
+
+        if rows is None:
+            rows = np.arange(self.n_rows, dtype=self._row_dtype)
+        return rows
+
+    def distance_index(self):
+        """Row ids sorted by distance_km (missing distances last) and their sorted distances."""
+        if self._distance_index is None:
+            distance = self.flights_df["distance_km"].to_numpy()
+            order = np.argsort(distance, kind="stable").astype(self._row_dtype)
+            self._distance_index = (order, distance[order])
+        return self._distance_index
+
+    def distance_bounds(self, distance_range):
+        """Slice (start, end) of the distance index holding the inclusive (min, max) range."""
+        sorted_distance = self.distance_index()[1]
+        start = int(np.searchsorted(sorted_distance, distance_range[0], side="left"))
+        end = int(np.searchsorted(sorted_distance, distance_range[1], side="right"))
+        return start, max(start, end)
+
+    def facets(self, columns, rows=None, metric=None):
+        """
+        Values of each column present in the selected rows (all rows when None).
+
+        Returns {column: Series indexed by the present values}, holding the number of rows of
+        each value, or its metric total when a metric column is given. Each facet is a single
+        bincount over the integer codes of the selected rows.
+        """
+        if rows is not None and len(rows) == self.n_rows:
+            rows = None
+        weights = None
+        if metric is not None:
+            weights = self.flights_df[metric].to_numpy()
+            if rows is not None:
+                weights = weights[rows]
+
+        facets = {}
+        for column in columns:
+            codes, values = self.codes(column)
+            facet_weights = weights
+            if rows is not None:
+                codes = codes[rows]
+            valid = codes >= 0
+            if not valid.all():
+                codes = codes[valid]
+                facet_weights = None if weights is None else weights[valid]
+            counts = np.bincount(codes, minlength=len(values))
+            present = counts > 0
+            if facet_weights is not None:
+                counts = np.bincount(codes, weights=facet_weights, minlength=len(values))
+            facets[column] = pd.Series(counts[present], index=values[present], name=column)
+        return facets
+
+    def take(self, rows):
+        """Frame of the selected rows, the base frame itself when every row is selected."""
+        if len(rows) == self.n_rows:
+            return self.flights_df
+        return self.flights_df.take(rows)
+
+    def _posting(self, column):
+        if column not in self._postings:
+            codes, categories = self.codes(column)
+            # Stable sort: the row ids of each code stay in row order
+            order = np.argsort(codes, kind="stable").astype(self._row_dtype)
+            counts = np.bincount(codes[codes >= 0], minlength=len(categories))
+            offsets = np.zeros(len(categories) + 1, dtype=np.int64)
+            np.cumsum(counts, out=offsets[1:])
+            # Rows with missing values (code -1) sort first, skip them
+            offsets += np.count_nonzero(codes < 0)
+            self._postings[column] = (order, offsets)
+        return self._postings[column]
+
+    def _count(self, column, values):
+        offsets = self._posting(column)[1]
+        value_codes = self.value_codes(column, values)
+        return int((offsets[value_codes + 1] - offsets[value_codes]).sum())
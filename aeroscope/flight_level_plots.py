@@ -6,40 +6,38 @@
 
 import plotly.express as px
 import plotly.graph_objects as go
-import pandas as pd
 
+from core import metric_totals
+from distance_cube import HISTOGRAM_BIN_WIDTH
+from geo_traces import route_lines
+from perf_monitor import FIGURE_BUILD_STAGE, timed_stage
 
+
+@timed_stage(FIGURE_BUILD_STAGE)
 def flights_map_plot(flights_gpb_df, value_watched_flights):
     # Create the scattergeo figure
     fig = go.Figure()
 
     meanwidth = flights_gpb_df[value_watched_flights].mean()
 
-    for i in range(len(flights_gpb_df)):
-        fig.add_trace(
-            go.Scattergeo(
-                lon=[
-                    flights_gpb_df["departure_lon"][i],
-                    flights_gpb_df["arrival_lon"][i],
-                ],
-                lat=[
-                    flights_gpb_df["departure_lat"][i],
-                    flights_gpb_df["arrival_lat"][i],
-                ],
-                mode="lines",
-                line=dict(
-                    width=flights_gpb_df[value_watched_flights][i] / (1.5 * meanwidth),
-                    color="#023047",
-                ),
-                opacity=0.8,
-            )
+    # All the routes in a few traces, one per line width bucket
+    fig.add_traces(
+        route_lines(
+            flights_gpb_df["departure_lon"],
+            flights_gpb_df["departure_lat"],
+            flights_gpb_df["arrival_lon"],
+            flights_gpb_df["arrival_lat"],
+            flights_gpb_df[value_watched_flights] / (1.5 * meanwidth),
+            "#023047",
+            opacity=0.8,
         )
+    )
 
     # group by airport
 
     if "n_flights" in flights_gpb_df.columns:
         airport_df = (
-            flights_gpb_df.groupby("iata_arrival")
+            flights_gpb_df.groupby("iata_arrival", observed=True)
             .agg(
                 {
                     "CO2 (kg)": "sum",
@@ -54,7 +52,7 @@ def flights_map_plot(flights_gpb_df, value_watched_flights):
         )
     else:
         airport_df = (
-            flights_gpb_df.groupby("iata_arrival")
+            flights_gpb_df.groupby("iata_arrival", observed=True)
             .agg(
                 {
                     "CO2 (kg)": "sum",
@@ -101,37 +99,31 @@ def flights_map_plot(flights_gpb_df, value_watched_flights):
     return fig
 
 
+@timed_stage(FIGURE_BUILD_STAGE)
 def flights_map_plot_OS(flights_gpb_df, value_watched_flights):
     # Create the scattergeo figure
     fig = go.Figure()
 
     meanwidth = flights_gpb_df[value_watched_flights].mean()
 
-    for i in range(len(flights_gpb_df)):
-        fig.add_trace(
-            go.Scattergeo(
-                lon=[
-                    flights_gpb_df["departure_lon"][i],
-                    flights_gpb_df["arrival_lon"][i],
-                ],
-                lat=[
-                    flights_gpb_df["departure_lat"][i],
-                    flights_gpb_df["arrival_lat"][i],
-                ],
-                mode="lines",
-                line=dict(
-                    width=flights_gpb_df[value_watched_flights][i] / (1.5 * meanwidth),
-                    color="#023047",
-                ),
-                opacity=0.8,
-            )
+    # All the routes in a few traces, one per line width bucket
+    fig.add_traces(
+        route_lines(
+            flights_gpb_df["departure_lon"],
+            flights_gpb_df["departure_lat"],
+            flights_gpb_df["arrival_lon"],
+            flights_gpb_df["arrival_lat"],
+            flights_gpb_df[value_watched_flights] / (1.5 * meanwidth),
+            "#023047",
+            opacity=0.8,
         )
+    )
 
     # group by airport
 
     if "n_flights" in flights_gpb_df.columns:
         airport_df = (
-            flights_gpb_df.groupby("dest")
+            flights_gpb_df.groupby("dest", observed=True)
             .agg(
                 {
                     "CO2 (kg)": "sum",
@@ -146,7 +138,7 @@ def flights_map_plot_OS(flights_gpb_df, value_watched_flights):
         )
     else:
         airport_df = (
-            flights_gpb_df.groupby("iata_arrival")
+            flights_gpb_df.groupby("iata_arrival", observed=True)
             .agg(
                 {
                     "CO2 (kg)": "sum",
@@ -193,53 +185,23 @@ def flights_map_plot_OS(flights_gpb_df, value_watched_flights):
     return fig
 
 
-def flights_treemap_plot(flights_df, value_watched_flights):
-    fig = px.treemap(
-        flights_df,
-        path=[
-            px.Constant("Total currently selected"),
-            "iata_departure",
-            "iata_arrival",
-            "airline_iata",
-            "acft_icao",
-        ],
-        values=value_watched_flights,
-        color_discrete_sequence=px.colors.qualitative.T10,
-        title="Treemap for {}".format(value_watched_flights),
-    )
-
-    fig.update_layout(margin=dict(l=5, r=5, t=60, b=5))
-    fig.update_traces(
-        marker=dict(cornerradius=5),
+@timed_stage(FIGURE_BUILD_STAGE)
+def flights_treemap_plot(treemap_df, value_watched_flights):
+    # treemap_df: nodes aggregated by treemap_hierarchy, one box per row
+    fig = go.Figure(
+        go.Treemap(
+            ids=treemap_df["id"],
+            labels=treemap_df["label"],
+            parents=treemap_df["parent"],
+            values=treemap_df["value"],
+            branchvalues="total",
+        )
     )
 
-    if value_watched_flights == "CO2 (kg)":
-        fig.update_traces(hovertemplate="Flow=%{id}<br>CO<sub>2</sub>=%{value:.2e} (kg)")
-    elif value_watched_flights == "ASK":
-        fig.update_traces(hovertemplate="Flow=%{id}<br>ASK=%{value:.2e}")
-    elif value_watched_flights == "Seats":
-        fig.update_traces(hovertemplate="Flow=%{id}<br>Seats=%{value:.2e}")
-    elif value_watched_flights == "n_flights":
-        fig.update_traces(hovertemplate="Flow=%{id}<br>Flights=%{value:.2e}")
-
-    return fig
-
-
-def flights_treemap_plot_OS(flights_df, value_watched_flights):
-    fig = px.treemap(
-        flights_df,
-        path=[
-            px.Constant("Total currently selected"),
-            "origin",
-            "dest",
-            "airline_iata",
-            "acft_icao",
-        ],
-        values=value_watched_flights,
-        color_discrete_sequence=px.colors.qualitative.T10,
+    fig.update_layout(
         title="Treemap for {}".format(value_watched_flights),
+        treemapcolorway=px.colors.qualitative.T10,
     )
-
     fig.update_layout(margin=dict(l=5, r=5, t=60, b=5))
     fig.update_traces(
         marker=dict(cornerradius=5),
@@ -257,20 +219,25 @@ def flights_treemap_plot_OS(flights_df, value_watched_flights):
     return fig
 
 
-def distance_histogram_plot_flights(flights_df, value_watched_flights):
+@timed_stage(FIGURE_BUILD_STAGE)
+def flights_treemap_plot_OS(treemap_df, value_watched_flights):
+    # Same figure, the hierarchy is aggregated on the OpenSky airport columns
+    return flights_treemap_plot(treemap_df, value_watched_flights)
+
+
+@timed_stage(FIGURE_BUILD_STAGE)
+def distance_histogram_plot_flights(distance_cube, value_watched_flights):
     fig = go.Figure()
 
     # Define bins for the histogram (500 km intervals)
-    bin_width = 500
-    bins = list(range(0, int(flights_df["distance_km"].max()) + bin_width, bin_width))
-    bin_centers = [b + bin_width / 2 for b in bins[:-1]]  # Midpoints of each bin
+    bin_width = HISTOGRAM_BIN_WIDTH
+    bins = distance_cube.bin_edges
+    bin_centers = distance_cube.bin_centers  # Midpoints of each bin
 
     bin_ranges = [f"{b - bin_width / 2}-{b + bin_width / 2}" for b in bin_centers]
 
     # Compute the sum of values in each bin
-    grouped = flights_df.groupby(pd.cut(flights_df["distance_km"], bins))[
-        value_watched_flights
-    ].sum()
+    grouped = distance_cube.histogram(value_watched_flights)
 
     # Add bars for the histogram
     fig.add_trace(
@@ -313,19 +280,16 @@ def formatter(x, pos):
     return str(round(x * 100))
 
 
-def distance_cumul_plot_flights(flights_df):
+@timed_stage(FIGURE_BUILD_STAGE)
+def distance_cumul_plot_flights(distance_cube):
     fig = go.Figure()
 
-    # Define bins for a quick cumulative distribution rendering. 10 km
-    bins = list(range(0, int(flights_df["distance_km"].max()) + 10, 10))
+    # 10 km bins of the cube for a quick cumulative distribution rendering
+    edges = distance_cube.profile_edges
 
     # Cumulative distributions for each metric
     # Seats
-    hist_seats, edges_seats = (
-        flights_df["Seats"].groupby(pd.cut(flights_df["distance_km"], bins)).sum(),
-        bins[1:],
-    )
-    hist_cumul_seats = hist_seats.cumsum() / hist_seats.sum() * 100
+    hist_cumul_seats, edges_seats = distance_cube.cumulative("Seats"), edges
     fig.add_trace(
         go.Scatter(
             x=edges_seats,
@@ -338,11 +302,7 @@ def distance_cumul_plot_flights(flights_df):
     )
 
     # ASK
-    hist_ask, edges_ask = (
-        flights_df["ASK"].groupby(pd.cut(flights_df["distance_km"], bins)).sum(),
-        bins[1:],
-    )
-    hist_cumul_ask = hist_ask.cumsum() / hist_ask.sum() * 100
+    hist_cumul_ask, edges_ask = distance_cube.cumulative("ASK"), edges
     fig.add_trace(
         go.Scatter(
             x=edges_ask,
@@ -355,11 +315,7 @@ def distance_cumul_plot_flights(flights_df):
     )
 
     #  CO2
-    hist_co2, edges_co2 = (
-        flights_df["CO2 (kg)"].groupby(pd.cut(flights_df["distance_km"], bins)).sum(),
-        bins[1:],
-    )
-    hist_cumul_co2 = hist_co2.cumsum() / hist_co2.sum() * 100
+    hist_cumul_co2, edges_co2 = distance_cube.cumulative("CO2 (kg)"), edges
     fig.add_trace(
         go.Scatter(
             x=edges_co2,
@@ -389,19 +345,16 @@ def distance_cumul_plot_flights(flights_df):
     return fig
 
 
-def distance_cumul_plot_flights_OS(flights_df):
+@timed_stage(FIGURE_BUILD_STAGE)
+def distance_cumul_plot_flights_OS(distance_cube):
     fig = go.Figure()
 
-    # Define bins for a quick cumulative distribution rendering. 10 km
-    bins = list(range(0, int(flights_df["distance_km"].max()) + 10, 10))
+    # 10 km bins of the cube for a quick cumulative distribution rendering
+    edges = distance_cube.profile_edges
 
     # Cumulative distributions for each metric
     # N Flights
-    hist_flights, edges_flights = (
-        flights_df["n_flights"].groupby(pd.cut(flights_df["distance_km"], bins)).sum(),
-        bins[1:],
-    )
-    hist_cumul_flights = hist_flights.cumsum() / hist_flights.sum() * 100
+    hist_cumul_flights, edges_flights = distance_cube.cumulative("n_flights"), edges
     fig.add_trace(
         go.Scatter(
             x=edges_flights,
@@ -431,21 +384,16 @@ def distance_cumul_plot_flights_OS(flights_df):
     return fig
 
 
-def distance_share_flights(flights_df, value_watched_flights):
+@timed_stage(FIGURE_BUILD_STAGE)
+def distance_share_flights(distance_cube, value_watched_flights):
     fig = go.Figure()
 
     # bins of 500km
-    bin_width = 500
-    bins = list(range(0, int(flights_df["distance_km"].max()) + bin_width, bin_width))
-    bin_centers = [b + bin_width / 2 for b in bins[:-1]]  # find middle of each bin
-
-    grouped = (
-        flights_df.groupby([pd.cut(flights_df["distance_km"], bins, right=False), "acft_class"])[
-            value_watched_flights
-        ]
-        .sum()
-        .unstack(fill_value=0)
-    )
+    bin_width = HISTOGRAM_BIN_WIDTH
+    bins = distance_cube.bin_edges
+    bin_centers = distance_cube.bin_centers  # find middle of each bin
+
+    grouped = distance_cube.histogram(value_watched_flights, by="acft_class")
     share_df = grouped.div(grouped.sum(axis=1), axis=0) * 100  # Convert to percentage
 
     bin_ranges = [f"{b - bin_width / 2}-{b + bin_width /2}" for b in bin_centers]
@@ -490,20 +438,15 @@ def distance_share_flights(flights_df, value_watched_flights):
     return fig
 
 
-def distance_share_dom_int_flights(flights_df, value_watched_flights):
+@timed_stage(FIGURE_BUILD_STAGE)
+def distance_share_dom_int_flights(distance_cube, value_watched_flights):
     fig = go.Figure()
 
-    bin_width = 500
-    bins = list(range(0, int(flights_df["distance_km"].max()) + bin_width, bin_width))
-    bin_centers = [b + bin_width / 2 for b in bins[:-1]]
+    bin_width = HISTOGRAM_BIN_WIDTH
+    bins = distance_cube.bin_edges
+    bin_centers = distance_cube.bin_centers
 
-    grouped = (
-        flights_df.groupby([pd.cut(flights_df["distance_km"], bins), "domestic"])[
-            value_watched_flights
-        ]
-        .sum()
-        .unstack(fill_value=0)
-    )
+    grouped = distance_cube.histogram(value_watched_flights, by="domestic")
 
     share_df = grouped.div(grouped.sum(axis=1), axis=0) * 100
 
@@ -545,9 +488,10 @@ def distance_share_dom_int_flights(flights_df, value_watched_flights):
     return fig
 
 
+@timed_stage(FIGURE_BUILD_STAGE)
 def aircraft_pie_flights(flights_df, value_watched_flights):
-    top_aircraft = flights_df.groupby("acft_icao")[value_watched_flights].sum().nlargest(10)
-    other_total = flights_df[value_watched_flights].sum() - top_aircraft.sum()
+    top_aircraft = metric_totals(flights_df, value_watched_flights, by="acft_icao").nlargest(10)
+    other_total = metric_totals(flights_df, value_watched_flights) - top_aircraft.sum()
     top_aircraft.loc["Other"] = other_total
     fig = px.pie(
         values=top_aircraft,
@@ -568,9 +512,10 @@ def aircraft_pie_flights(flights_df, value_watched_flights):
     return fig
 
 
+@timed_stage(FIGURE_BUILD_STAGE)
 def aircraft_user_pie_flights(flights_df, value_watched_flights):
-    top_airlines = flights_df.groupby("airline_iata")[value_watched_flights].sum().nlargest(10)
-    other_total = flights_df[value_watched_flights].sum() - top_airlines.sum()
+    top_airlines = metric_totals(flights_df, value_watched_flights, by="airline_iata").nlargest(10)
+    other_total = metric_totals(flights_df, value_watched_flights) - top_airlines.sum()
     top_airlines.loc["Other"] = other_total
     fig = px.pie(
         values=top_airlines,
@@ -591,8 +536,9 @@ def aircraft_user_pie_flights(flights_df, value_watched_flights):
     return fig
 
 
+@timed_stage(FIGURE_BUILD_STAGE)
 def aircraft_class_pie_flights(flights_df, value_watched_flights):
-    aircraft_class = flights_df.groupby("acft_class")[value_watched_flights].sum()
+    aircraft_class = metric_totals(flights_df, value_watched_flights, by="acft_class")
     fig = px.pie(
         values=aircraft_class,
         names=aircraft_class.index,
@@ -612,9 +558,10 @@ def aircraft_class_pie_flights(flights_df, value_watched_flights):
     return fig
 
 
+@timed_stage(FIGURE_BUILD_STAGE)
 def dom_share_pie_flights(flights_df, value_watched_flights):
-    df_group = flights_df.groupby("domestic")[value_watched_flights].sum().reset_index()
-    df_group["domestic"] = df_group["domestic"].replace(0, "International").replace(1, "Domestic")
+    df_group = metric_totals(flights_df, value_watched_flights, by="domestic").reset_index()
+    df_group["domestic"] = df_group["domestic"].map({False: "International", True: "Domestic"})
     fig = px.pie(
         values=df_group[value_watched_flights],
         names=df_group.domestic,
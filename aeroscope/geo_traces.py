@@ -0,0 +1,67 @@
+"""
+Batched route rendering for the maps.
+
+Drawing one Scattergeo trace per route makes the figure size and build time grow with the number
+of routes. Routes are instead drawn as NaN-separated polylines, one trace per colour and line
+width bucket: a map holds a few dozen traces whatever the number of routes.
+"""
+
+import numpy as np
+import plotly.graph_objects as go
+
+# Ratio between the widths of two successive buckets: 10 % steps are not visible on the map
+WIDTH_BUCKET_RATIO = 1.1
+
+
+def width_buckets(widths):
+    """
+    Bucket of each line width, and the width drawn for each bucket.
+
+    Buckets are geometric so that thin and thick lines keep the same relative precision. Null,
+    negative and missing widths (invisible lines) get bucket -1.
+    """
+    widths = np.asarray(widths, dtype="float64")
+    visible = widths > 0
+    buckets = np.full(len(widths), -1, dtype=np.int64)
+    log_widths = np.log(widths[visible]) / np.log(WIDTH_BUCKET_RATIO)
+    steps = np.rint(log_widths).astype(np.int64)
+    if len(steps) == 0:
+        return buckets, np.empty(0)
+    buckets[visible] = steps - steps.min()
+    bucket_widths = WIDTH_BUCKET_RATIO ** np.arange(steps.min(), steps.max() + 1, dtype="float64")
+    return buckets, bucket_widths
+
+
+def route_lines(departure_lon, departure_lat, arrival_lon, arrival_lat, widths, colors, **kwargs):
+    """
+    Line traces of the routes, one per (colour, width bucket).
+
+    colors is a single colour or one colour per route. Extra keyword arguments are passed to
+    every go.Scattergeo trace.
+    """
+    departure_lon = np.asarray(departure_lon, dtype="float64")
+    departure_lat = np.asarray(departure_lat, dtype="float64")
+    arrival_lon = np.asarray(arrival_lon, dtype="float64")
+    arrival_lat = np.asarray(arrival_lat, dtype="float64")
+    buckets, bucket_widths = width_buckets(widths)
+    colors = np.broadcast_to(np.asarray(colors, dtype=object), buckets.shape)
+
+    traces = []
+    for color in dict.fromkeys(colors.tolist()):
+        in_color = colors == color
+        for bucket in np.unique(buckets[in_color & (buckets >= 0)]):
+            routes = np.flatnonzero(in_color & (buckets == bucket))
+            # departure, arrival and a NaN gap for each route
+            gaps = np.full(len(routes), np.nan)
+            lon = np.column_stack([departure_lon[routes], arrival_lon[routes], gaps]).ravel()
+            lat = np.column_stack([departure_lat[routes], arrival_lat[routes], gaps]).ravel()
+            traces.append(
+                go.Scattergeo(
+                    lon=lon,
+                    lat=lat,
+                    mode="lines",
+                    line=dict(width=bucket_widths[bucket], color=color),
+                    **kwargs,
+                )
+            )
+    return traces
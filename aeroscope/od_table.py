@@ -0,0 +1,117 @@
+"""
+Origin-destination aggregates of the flight-level data.
+
+The route maps draw one line per (departure, arrival) airport pair. Regrouping the selected
+flights by airport names, joining their airline and aircraft codes as strings and removing the
+duplicates in Python was done at each redraw. The ODTable numbers the airport pairs once per
+dataset (one integer id per flight, coordinates of each pair): aggregating a selection is a
+bincount of the selected rows per pair id. Airlines and aircraft of each pair are only decoded
+when asked for, from the integer codes of the selected rows.
+"""
+
+import numpy as np
+import pandas as pd
+
+from perf_monitor import AGGREGATION_STAGE, timed_stage
+
+# departure and arrival airport columns of each dataset type
+OD_COLUMNS = {
+    "compilation": ("iata_departure", "iata_arrival"),
+    "opensky": ("origin", "dest"),
+}
+OD_COORDINATES = ["departure_lon", "departure_lat", "arrival_lon", "arrival_lat"]
+OD_METRICS = ["CO2 (kg)", "ASK", "Seats", "n_flights"]
+
+
+class ODTable:
+    """Airport pair of each flight of a dataset, built once and shared by the tabs."""
+
+    def __init__(self, flights_filter, departure="iata_departure", arrival="iata_arrival"):
+        self.flights_filter = flights_filter
+        self.departure = departure
+        self.arrival = arrival
+        flights_df = flights_filter.flights_df
+        self.metrics = [metric for metric in OD_METRICS if metric in flights_df.columns]
+
+        departure_codes, self.departure_values = flights_filter.codes(departure)
+        arrival_codes, self.arrival_values = flights_filter.codes(arrival)
+        n_arrivals = len(self.arrival_values)
+        pairs = departure_codes.astype(np.int64) * n_arrivals + arrival_codes
+        # Flights with a missing airport are in no pair, as in a groupby
+        pairs[(departure_codes < 0) | (arrival_codes < 0)] = -1
+
+        # Pairs sorted by departure then arrival code, the order of a groupby on both columns
+        pair_values, first_rows, od_ids = np.unique(pairs, return_index=True, return_inverse=True)
+        if len(pair_values) and pair_values[0] == -1:
+            pair_values, first_rows = pair_values[1:], first_rows[1:]
+            od_ids = od_ids - 1
+        self.od_ids = od_ids.astype(np.int32)
+        self.n_pairs = len(pair_values)
+        self.pair_departure_codes = pair_values // n_arrivals
+        self.pair_arrival_codes = pair_values % n_arrivals
+        # Airport coordinates of each pair, from its first flight
+        self.pair_coordinates = {
+            column: flights_df[column].to_numpy()[first_rows] for column in OD_COORDINATES
+        }
+        self._all_pairs = None
+
+    @timed_stage(AGGREGATION_STAGE)
+    def aggregate(self, rows=None, lists=False):
+        """
+        Metric totals per airport pair of the selected rows (all rows when None).
+
+        With lists, the airline_iata and acft_icao columns hold the codes met on each pair,
+        joined by ", ".
+        """
+        if rows is not None and len(rows) == len(self.od_ids):
+            rows = None
+        if rows is None and not lists and self._all_pairs is not None:
+            return self._all_pairs.copy()
+
+        od_ids = self.od_ids if rows is None else self.od_ids[rows]
+        valid = od_ids >= 0
+        if not valid.all():
+            od_ids = od_ids[valid]
+            rows = np.flatnonzero(valid) if rows is None else rows[valid]
+        counts = np.bincount(od_ids, minlength=self.n_pairs)
+        present = np.flatnonzero(counts)
+
+        od_df = pd.DataFrame(
+            {
+                self.departure: pd.Categorical.from_codes(
+                    self.pair_departure_codes[present], self.departure_values
+                ),
+                self.arrival: pd.Categorical.from_codes(
+                    self.pair_arrival_codes[present], self.arrival_values
+                ),
+            }
+        )
+        if lists:
+            od_df["acft_icao"] = self._pair_lists("acft_icao", od_ids, rows, present)
+            od_df["airline_iata"] = self._pair_lists("airline_iata", od_ids, rows, present)
+        for column in OD_COORDINATES:
+            od_df[column] = self.pair_coordinates[column][present]
+        for metric in self.metrics:
+            weights = self.flights_filter.flights_df[metric].to_numpy()
+            if rows is not None:
+                weights = weights[rows]
+            od_df[metric] = np.bincount(od_ids, weights=weights, minlength=self.n_pairs)[present]
+
+        if rows is None and not lists:
+            self._all_pairs = od_df.copy()
+        return od_df
+
+    def _pair_lists(self, column, od_ids, rows, present):
+        # Distinct (pair, code) couples of the selected rows, decoded once per pair
+        codes, values = self.flights_filter.codes(column)
+        if rows is not None:
+            codes = codes[rows]
+        couples = np.unique(od_ids.astype(np.int64) * (len(values) + 1) + (codes + 1))
+        couple_pairs = couples // (len(values) + 1)
+        couple_codes = couples % (len(values) + 1) - 1
+        bounds = np.searchsorted(couple_pairs, np.append(present, self.n_pairs))
+        names = np.asarray(values.astype(str), dtype=object)
+        return [
+            ", ".join(names[code] for code in couple_codes[start:end] if code >= 0)
+            for start, end in zip(bounds[:-1], bounds[1:])
+        ]
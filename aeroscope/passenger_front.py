@@ -6,15 +6,19 @@
 
 ### PAX FRONTEND
 import pax_level_plots
+from figure_output import FigureOutput
+from perf_monitor import PERF_MONITOR
 import ipyvuetify as v
-from ipywidgets import Output
-from IPython.display import display
 from functools import partial
 import numpy as np
 
+# Routes with fewer seats are left out of this mode (exotic routes with potential business jets)
+MIN_ROUTE_SEATS = 20000
+
 
 class PassengerTab:
     def __init__(self, aeroscopedataclass):
+        PERF_MONITOR.instrument(self)
         ## define widgets
 
         # Airport filter
@@ -28,8 +32,9 @@ class PassengerTab:
             variant="outlined",
         )
 
-        self.output_1 = Output()
+        self.output_1 = FigureOutput()
 
+        self._build_routes(aeroscopedataclass)
         self._render_initial_plots()
         self._make_connections(aeroscopedataclass)
         self._make_layout()
@@ -41,50 +46,39 @@ class PassengerTab:
         with self.output_1:
             print("Please select a departure")
 
+    def _build_routes(self, dataclass):
+        # Routes of every departure airport, sorted by departure: the routes of an airport are a
+        # slice of the table
+        routes = dataclass.od_table.aggregate()
+        routes = routes[routes["Seats"] > MIN_ROUTE_SEATS].reset_index(drop=True)
+
+        # Compute CO2 per passenger
+        routes["Pax CO2"] = routes["CO2 (kg)"] / routes["Seats"]
+
+        departure_codes = routes["iata_departure"].cat.codes.to_numpy()
+        self.routes = routes
+        self.route_offsets = np.searchsorted(
+            departure_codes, np.arange(len(routes["iata_departure"].cat.categories) + 1)
+        )
+
+    def _departure_routes(self, departure):
+        code = self.routes["iata_departure"].cat.categories.get_indexer([departure])[0]
+        if code < 0:
+            return self.routes.iloc[:0]
+        start, end = self.route_offsets[code], self.route_offsets[code + 1]
+        return self.routes.iloc[start:end].reset_index(drop=True)
+
     def _plot1_update(self, change, dataclass):
         filtered_pax_departure = self.autocomplete.v_model
 
-        # reset local flight data with base flights_df
-        self.in_class_flights_df = dataclass.flights_df.copy()
-
         # active departure filter
         if filtered_pax_departure:
-            filtered_flights_df = dataclass.flights_df[
-                dataclass.flights_df["iata_departure"] == filtered_pax_departure
-            ].reset_index()
             with self.output_1:
-                self.output_1.clear_output(wait=True)
-                flights_df_od = (
-                    filtered_flights_df.groupby(["iata_departure", "iata_arrival"])
-                    .agg(
-                        {
-                            "acft_icao": ", ".join,
-                            "airline_iata": ", ".join,
-                            "departure_lon": "first",
-                            "departure_lat": "first",
-                            "arrival_lon": "first",
-                            "arrival_lat": "first",
-                            "CO2 (kg)": "sum",
-                            "Seats": "sum",
-                        }
-                    )
-                    .reset_index()
+                fig_pax_1 = pax_level_plots.pax_map_plot(
+                    self._departure_routes(filtered_pax_departure)
                 )
 
-                # Remove flights if not enough seats for this mode (avoid exotic routes with potential business jets)
-                flights_df_od = flights_df_od[flights_df_od["Seats"] > 20000].reset_index()
-
-                # Compute CO2 per passenger
-                flights_df_od["Pax CO2"] = flights_df_od["CO2 (kg)"] / flights_df_od["Seats"]
-
-                # Apply the function to the DataFrame column
-                flights_df_od["airline_iata"] = flights_df_od["airline_iata"].apply(
-                    remove_duplicates
-                )
-                flights_df_od["acft_icao"] = flights_df_od["acft_icao"].apply(remove_duplicates)
-                fig_pax_1 = pax_level_plots.pax_map_plot(flights_df_od)
-
-                display(fig_pax_1)
+                self.output_1.show(fig_pax_1)
 
     def _make_layout(self):
         # h_divider = v.Divider(vertical=False)
@@ -229,14 +223,3 @@ class PassengerTab:
             children=[row_disclaimer_pax, row_mega_map_pax],
         )
         self.layout = v.Row(children=[col_selects_pax, v_divider, col_plots_pax])
-
-
-# Function to remove duplicates from a comma-separated string
-def remove_duplicates(input_str):
-    # Split the string into a list of substrings
-    substrings = input_str.split(", ")
-    # Remove duplicates and preserve the order
-    unique_substrings = list(dict.fromkeys(substrings))
-    # Join the unique substrings back into a single string
-    result_str = ", ".join(unique_substrings)
-    return result_str
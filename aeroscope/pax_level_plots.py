@@ -6,7 +6,10 @@
 
 import plotly.graph_objects as go
 
+from perf_monitor import FIGURE_BUILD_STAGE, timed_stage
 
+
+@timed_stage(FIGURE_BUILD_STAGE)
 def pax_map_plot(flights_gpb_df):
     # Create the scattergeo figure
 
@@ -0,0 +1,266 @@
+"""
+Latency of the tab callbacks.
+
+Set AEROSCOPE_PERF=1 in the environment of the kernel to enable it. Each tab then has its
+callbacks (_plot*_update, _data_update_*, _df_update_*, _table_update...) wrapped when it is
+built: every run records the duration of the callback and the time spent in each stage it goes
+through:
+
+- filter: selection of the rows (_filter_common_code);
+- aggregation: filter items, tables, routes, treemap nodes and distance cubes computed from the
+  selection;
+- figure build: the plot functions called in the callback, or each figure built by
+  FigureOutput.render in the render pool;
+- payload: size (bytes) of each figure json sent to the browser, the changes only when the
+  figure is updated in place.
+
+Plot functions and aggregation engines are timed at their boundary by the timed_stage
+decorator, which does nothing outside of a recorded callback. Stages gone through in the callback
+are summed over a run and exclude the stages nested in them. The last PERF_WINDOW values of each
+callback and stage are kept: their percentiles are shown in a debug panel under the interface,
+and can be exported as json log lines. Each run is also logged as a json line at debug level.
+
+When disabled, tabs are not wrapped and nothing is measured.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+import numpy as np
+import pandas as pd
+
+_LOGGER = logging.getLogger(__name__)
+
+PERF_ENV_VAR = "AEROSCOPE_PERF"
+PERF_WINDOW = 500
+PERCENTILES = [50, 90, 99]
+
+# Tab methods wrapped: callbacks, recorded under their own name, and the stages they go through
+CALLBACK_PATTERN = re.compile(r"^_(plots?\d*_update|data_update_\w+|df_update_\w+|table_update)$")
+FILTER_STAGE = "filter"
+AGGREGATION_STAGE = "aggregation"
+FIGURE_BUILD_STAGE = "figure build"
+PAYLOAD_STAGE = "payload"
+STAGE_METHODS = {
+    "_filter_common_code": FILTER_STAGE,
+    "_update_items": AGGREGATION_STAGE,
+    "_table_update": AGGREGATION_STAGE,
+    "_departure_routes": AGGREGATION_STAGE,
+}
+
+
+def perf_enabled():
+    return os.environ.get(PERF_ENV_VAR, "0") == "1"
+
+
+class PerfMonitor:
+    def __init__(self, enabled=None, window=PERF_WINDOW):
+        self.enabled = perf_enabled() if enabled is None else enabled
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._lock = threading.Lock()
+        # callback running in the thread, and its stages
+        self._local = threading.local()
+
+    def instrument(self, tab):
+        """Wrap the callbacks and stage methods of a tab, before they are connected to widgets."""
+        if not self.enabled:
+            return
+        for name in dir(type(tab)):
+            if CALLBACK_PATTERN.match(name) or name in STAGE_METHODS:
+                setattr(tab, name, self._wrap(tab, name, getattr(tab, name)))
+
+    def current(self):
+        """Name of the callback running in this thread, None outside of callbacks."""
+        return getattr(self._local, "callback", None)
+
+    @contextmanager
+    def callback(self, name):
+        """Record a run of the named callback, unless it runs within another one."""
+        if self.current() is not None:
+            yield
+            return
+        self._local.callback = name
+        self._local.stack = []
+        self._local.run = defaultdict(float)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            total = time.perf_counter() - start
+            run = self._local.run
+            self._local.callback = None
+            self.record(name, "total", total)
+            for stage, seconds in run.items():
+                self.record(name, stage, seconds)
+            if _LOGGER.isEnabledFor(logging.DEBUG):
+                _LOGGER.debug(
+                    json.dumps({"callback": name, "total_s": total, **_seconds_keys(run)})
+                )
+
+    @contextmanager
+    def stage(self, stage):
+        """Time a stage of the running callback, without the stages nested in it."""
+        name = self.current()
+        if name is None:
+            yield
+            return
+        stack = self._local.stack
+        # [stage, time spent in nested stages]
+        stack.append([stage, 0.0])
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            _, nested = stack.pop()
+            if stack:
+                stack[-1][1] += elapsed
+            # summed over the run, a stage can be gone through several times
+            self._local.run[stage] += elapsed - nested
+
+    def timed_build(self, build):
+        """build, recording its duration as the figure build stage of the current callback."""
+        name = self.current()
+        if not self.enabled or name is None:
+            return build
+
+        def timed():
+            if self.current() == name:
+                # Built right away in the callback (no event loop): the plot functions it calls
+                # are stages of the run already
+                with self.stage(FIGURE_BUILD_STAGE):
+                    return build()
+            start = time.perf_counter()
+            try:
+                return build()
+            finally:
+                self.record(name, FIGURE_BUILD_STAGE, time.perf_counter() - start)
+
+        return timed
+
+    def record(self, name, stage, value):
+        with self._lock:
+            self._samples[(name, stage)].append(value)
+
+    def percentiles(self):
+        """Frame of the percentiles of each callback and stage (ms, bytes for the payload)."""
+        with self._lock:
+            samples = {key: np.array(values) for key, values in self._samples.items()}
+        rows = []
+        for (name, stage), values in sorted(samples.items()):
+            scale = 1 if stage == PAYLOAD_STAGE else 1000
+            rows.append(
+                {
+                    "callback": name,
+                    "stage": stage,
+                    "unit": "bytes" if stage == PAYLOAD_STAGE else "ms",
+                    "count": len(values),
+                    **{
+                        "p{}".format(q): float(np.percentile(values, q)) * scale
+                        for q in PERCENTILES
+                    },
+                }
+            )
+        return pd.DataFrame(
+            rows, columns=["callback", "stage", "unit", "count"] + _percentile_columns()
+        )
+
+    def export(self):
+        """Log the percentiles as one json line per callback and stage, and return them."""
+        records = self.percentiles().to_dict(orient="records")
+        for record in records:
+            _LOGGER.info(json.dumps(record))
+        return records
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+    def _wrap(self, tab, name, method):
+        callback_name = "{}.{}".format(type(tab).__name__, name)
+        stage = STAGE_METHODS.get(name)
+
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            with self.callback(callback_name), self.stage(stage) if stage else nullcontext():
+                return method(*args, **kwargs)
+
+        return wrapper
+
+
+def timed_stage(stage):
+    """Decorator recording the calls of a function as a stage of the callback they run in."""
+
+    def decorate(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if PERF_MONITOR.current() is None:
+                return function(*args, **kwargs)
+            with PERF_MONITOR.stage(stage):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def perf_panel(monitor):
+    """Collapsed panel showing the percentiles of the monitor, refreshed on demand."""
+    # Imported here: the aggregation engines import this module in the headless API as well
+    import ipyvuetify as v
+
+    headers = [
+        {"text": column, "value": column}
+        for column in ["callback", "stage", "unit", "count"] + _percentile_columns()
+    ]
+    table = v.DataTable(v_model=[], show_select=False, headers=headers, items=[], dense=True)
+    refresh_button = v.Btn(children=["Refresh"], class_="ma-2")
+    export_button = v.Btn(children=["Export to logs"], class_="ma-2")
+    clear_button = v.Btn(children=["Clear"], class_="ma-2")
+
+    def refresh(*args):
+        table.items = monitor.percentiles().round(2).to_dict(orient="records")
+
+    def clear(*args):
+        monitor.clear()
+        refresh()
+
+    refresh_button.on_event("click", refresh)
+    export_button.on_event("click", lambda *args: monitor.export())
+    clear_button.on_event("click", clear)
+
+    return v.ExpansionPanels(
+        class_="pa-4",
+        children=[
+            v.ExpansionPanel(
+                children=[
+                    v.ExpansionPanelHeader(children=["Performance (debug)"]),
+                    v.ExpansionPanelContent(
+                        children=[
+                            v.Row(children=[refresh_button, export_button, clear_button]),
+                            table,
+                        ]
+                    ),
+                ]
+            )
+        ],
+    )
+
+
+def _percentile_columns():
+    return ["p{}".format(q) for q in PERCENTILES]
+
+
+def _seconds_keys(run):
+    return {"{}_s".format(stage.replace(" ", "_")): seconds for stage, seconds in run.items()}
+
+
+# One monitor per kernel, shared by the tabs
+PERF_MONITOR = PerfMonitor()
@@ -0,0 +1,346 @@
+"""
+Rebuild of the plot files from a raw flight-level csv (`aeroscope preprocess`).
+
+The raw file has one row per flight (route, airline and aircraft), with the columns of
+flights_df: airports, countries and continents of both ends, airport coordinates, distance and
+the metrics. It is never loaded whole: it is read in chunks, and each chunk is handed to a pool of
+worker processes which
+
+- adds the derived columns (domestic flag, scaled metrics) and formats the chunk as csv for
+  flights_df.zip;
+- computes partial aggregates of the chunk: metric sums per country pair, departure country,
+  continent pair and departure continent, and the names and airport coordinates of its countries.
+  Flights without a country or continent are left out of the aggregates of that level.
+
+The main process writes the csv chunks to flights_df.zip in order and merges the partial
+aggregates into running totals (sums of sums), from which the five aggregated plot files are
+built. Only a few chunks are in flight at a time, so memory stays bounded whatever the size of
+the raw file.
+
+Country ISO3 codes, centroids and colours are not in the raw file: they are taken from a
+reference (by default the country files already in the output folder). Countries missing from
+it get the mean coordinates of their airports, no ISO3 code and a grey colour.
+
+The columnar cache of each written file is built last, with the options of the app.
+"""
+
+import io
+import logging
+import os
+import os.path as pth
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from datasets import COMPILED_DIRECTORY, domestic_flags, load_compiled_data, load_opensky_data
+
+_LOGGER = logging.getLogger(__name__)
+
+PREPROCESS_CHUNKSIZE = 500000
+METRICS = ["Seats", "ASK", "fuel_burn", "CO2 (kg)"]
+OPENSKY_METRICS = METRICS + ["n_flights"]
+# Same parsing as the app: "NA" (North America, Namibia) is a code, not a missing value
+READ_OPTIONS = dict(sep=",", keep_default_na=False, na_values=["", "NaN"])
+
+# Marker position of each continent on the maps, arrows arrive ARRIVAL_LON_SHIFT further west
+CONTINENT_COORDINATES = {
+    "AF": (17.7578122, 11.5024338),
+    "AS": (89.2343748, 51.2086975),
+    "EU": (10.0, 51.0),
+    "NA": (-109.0, 51.0000002),
+    "OC": (173.7741688, -12.7725835),
+    "SA": (-61.0006565, -21.0002179),
+    "Unknown": (79.0, -44.0),
+}
+ARRIVAL_LON_SHIFT = -10
+DEFAULT_COUNTRY_COLOR = "#999999"
+
+CONTINENT_KEYS = [
+    "departure_continent",
+    "departure_continent_name",
+    "arrival_continent",
+    "arrival_continent_name",
+]
+
+
+def preprocess(
+    source,
+    directory=COMPILED_DIRECTORY,
+    opensky=False,
+    countries=None,
+    chunksize=PREPROCESS_CHUNKSIZE,
+    workers=None,
+    build_cache=True,
+):
+    """
+    Write the plot files of the raw flights csv source into directory.
+
+    countries: csv of the country reference (country, country_name, ISO3, lat, lon, color),
+    by default read from the country files of directory. workers: number of processes, all the
+    cores by default.
+    """
+    metrics = OPENSKY_METRICS if opensky else METRICS
+    reference = country_reference(directory) if countries is None else _read_reference(countries)
+    os.makedirs(directory, exist_ok=True)
+
+    workers = workers or os.cpu_count()
+    totals = {}
+    n_rows = 0
+    flights_path = pth.join(directory, "flights_df.zip")
+    tmp_path = flights_path + ".tmp"
+    archive = zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED)
+    with archive, archive.open("flights_df.csv", "w", force_zip64=True) as raw_file:
+        flights_file = io.TextIOWrapper(raw_file, encoding="utf-8", newline="")
+        with flights_file, ProcessPoolExecutor(max_workers=workers) as executor:
+            # Chunks sent to the workers and not written yet, oldest first
+            pending = deque()
+            for chunk in pd.read_csv(source, chunksize=chunksize, **READ_OPTIONS):
+                if len(pending) >= 2 * workers:
+                    _collect(pending.popleft(), flights_file, totals)
+                pending.append(executor.submit(_process_chunk, chunk, n_rows, metrics))
+                n_rows += len(chunk)
+            while pending:
+                _collect(pending.popleft(), flights_file, totals)
+    os.replace(tmp_path, flights_path)
+    _LOGGER.info("%d flights written to %s", n_rows, flights_path)
+
+    for name, frame in plot_files(totals, metrics, reference).items():
+        path = pth.join(directory, name + ".csv")
+        frame.to_csv(path + ".tmp")
+        os.replace(path + ".tmp", path)
+        _LOGGER.info("%s written (%d rows)", path, len(frame))
+
+    if build_cache:
+        # The loaders of the app build the cache of each file
+        (load_opensky_data if opensky else load_compiled_data)(directory)
+        _LOGGER.info("Columnar cache built in %s", directory)
+
+
+def country_reference(directory):
+    """ISO3 code, centroid and colour of the countries of the plot files of a directory."""
+    fixed_path = pth.join(directory, "country_fixed.csv")
+    flows_path = pth.join(directory, "country_flows.csv")
+    if not pth.isfile(fixed_path) or not pth.isfile(flows_path):
+        _LOGGER.warning("No country reference in %s", directory)
+        return _read_reference(None)
+
+    columns = ["country", "country_name", "ISO3", "lat", "lon"]
+    country_flows = pd.read_csv(flows_path, index_col=0, **READ_OPTIONS)
+    sides = [
+        frame[[side + name for name in ["country", "country_name", "ISO3", "lat", "lon"]]]
+        .set_axis(columns, axis=1)
+        .drop_duplicates("country")
+        for frame, side in [
+            (pd.read_csv(fixed_path, index_col=0, **READ_OPTIONS), "departure_"),
+            (country_flows, "departure_"),
+            (country_flows, "arrival_"),
+        ]
+    ]
+    reference = pd.concat(sides).drop_duplicates("country").set_index("country")
+    colors = country_flows.drop_duplicates("departure_country").set_index("departure_country")
+    reference["color"] = colors["color"]
+    return reference
+
+
+def plot_files(totals, metrics, reference):
+    """The five aggregated plot files, built from the merged partial aggregates."""
+    countries = _countries(totals["countries"], reference)
+
+    country_flows = totals["country_flows"].reset_index()
+    for side in ["departure", "arrival"]:
+        country = countries.loc[country_flows[side + "_country"]]
+        country_flows[side + "_country_name"] = country["country_name"].to_numpy()
+        country_flows[side + "_ISO3"] = country["ISO3"].to_numpy()
+    _add_scaled_metrics(country_flows)
+    for side in ["departure", "arrival"]:
+        country = countries.loc[country_flows[side + "_country"]]
+        country_flows[side + "_lat"] = country["lat"].to_numpy()
+        country_flows[side + "_lon"] = country["lon"].to_numpy()
+    country_flows["color"] = countries.loc[country_flows["departure_country"], "color"].to_numpy()
+    country_flows = country_flows[
+        [
+            "departure_country",
+            "arrival_country",
+            "departure_country_name",
+            "arrival_country_name",
+            "departure_ISO3",
+            "arrival_ISO3",
+            *metrics,
+            "CO2 (Mt)",
+            "ASK (Bn)",
+            "Seats (Mn)",
+            "departure_lat",
+            "departure_lon",
+            "arrival_lat",
+            "arrival_lon",
+            "color",
+        ]
+    ]
+
+    country_fixed = totals["country_fixed"].reset_index()
+    country = countries.loc[country_fixed["departure_country"]]
+    country_fixed.insert(1, "departure_country_name", country["country_name"].to_numpy())
+    country_fixed.insert(2, "departure_ISO3", country["ISO3"].to_numpy())
+    _add_scaled_metrics(country_fixed)
+    country_fixed["domestic"] = country_fixed.pop("domestic") / country_fixed.pop("rows")
+    country_fixed["departure_lat"] = country["lat"].to_numpy()
+    country_fixed["departure_lon"] = country["lon"].to_numpy()
+
+    conti_scatter = totals["conti_scatter"].reset_index()
+    coordinates = _continent_coordinates(conti_scatter["departure_continent"])
+    conti_scatter.insert(3, "dep_lon", coordinates["lon"])
+    conti_scatter.insert(4, "dep_lat", coordinates["lat"])
+    _add_scaled_metrics(conti_scatter)
+
+    continental_flows = totals["continental_flows"].reset_index()
+    _add_scaled_metrics(continental_flows)
+    _add_continent_coordinates(continental_flows, "departure_continent", "arrival_continent")
+    continental_flows["arr_lon"] += ARRIVAL_LON_SHIFT
+
+    # Undirected continent pairs: sums of the directed flows of both directions
+    pairs = np.sort(
+        continental_flows[["departure_continent", "arrival_continent"]].to_numpy(dtype=str), axis=1
+    )
+    continental_flows_non_dir = (
+        continental_flows[metrics]
+        .groupby([pairs[:, 0], pairs[:, 1]])
+        .sum()
+        .rename_axis(["AV1", "AV2"])
+        .reset_index()
+    )
+    continental_flows_non_dir.insert(
+        0,
+        "group_col",
+        [
+            str(pair)
+            for pair in zip(continental_flows_non_dir["AV1"], continental_flows_non_dir["AV2"])
+        ],
+    )
+    _add_scaled_metrics(continental_flows_non_dir)
+    _add_continent_coordinates(continental_flows_non_dir, "AV1", "AV2")
+    continental_flows_non_dir = continental_flows_non_dir[
+        [column for column in continental_flows_non_dir if column not in ("AV1", "AV2")]
+        + ["AV1", "AV2"]
+    ]
+
+    return {
+        "continental_flows": continental_flows,
+        "continental_flows_non_dir": continental_flows_non_dir,
+        "conti_scatter": conti_scatter,
+        "country_flows": country_flows,
+        "country_fixed": country_fixed,
+    }
+
+
+def _process_chunk(chunk, start, metrics):
+    # Runs in a worker process: csv of the chunk for flights_df.zip, and its partial aggregates
+    # Missing flags come from the countries, as when the app loads flights_df
+    chunk["domestic"] = domestic_flags(chunk)
+    _add_scaled_metrics(chunk)
+    chunk.index = pd.RangeIndex(start, start + len(chunk))
+    csv = chunk.to_csv(header=start == 0)
+
+    values = chunk[metrics]
+    sides = pd.concat(
+        [
+            chunk[
+                [side + "_country", side + "_country_name", side + "_lat", side + "_lon"]
+            ].set_axis(["country", "country_name", "lat", "lon"], axis=1)
+            for side in ["departure", "arrival"]
+        ]
+    )
+    # Countries without a name are named by their code, not dropped by the groupby
+    sides["country_name"] = sides["country_name"].fillna(sides["country"])
+    partials = {
+        "countries": sides.groupby(["country", "country_name"]).agg(
+            lat=("lat", "sum"), lon=("lon", "sum"), airports=("lat", "count")
+        ),
+        "country_flows": values.groupby(
+            [chunk["departure_country"], chunk["arrival_country"]]
+        ).sum(),
+        "country_fixed": values.assign(domestic=chunk["domestic"].astype(np.int64), rows=1)
+        .groupby(chunk["departure_country"])
+        .sum(),
+        "continental_flows": values.groupby([chunk[column] for column in CONTINENT_KEYS]).sum(),
+        "conti_scatter": values.groupby(
+            [
+                chunk["departure_continent"],
+                chunk["departure_continent_name"],
+                (chunk["departure_continent"] == chunk["arrival_continent"]).rename("inside"),
+            ]
+        ).sum(),
+    }
+    return csv, partials
+
+
+def _collect(future, flights_file, totals):
+    csv, partials = future.result()
+    flights_file.write(csv)
+    for name, partial in partials.items():
+        if name in totals:
+            partial = (
+                pd.concat([totals[name], partial])
+                .groupby(level=list(range(partial.index.nlevels)))
+                .sum()
+            )
+        totals[name] = partial
+
+
+def _countries(country_totals, reference):
+    # Name and airport centroid of each country of the flights, overridden by the reference
+    country_totals = country_totals.reset_index()
+    countries = country_totals.groupby("country").agg(
+        country_name=("country_name", "first"),
+        lat=("lat", "sum"),
+        lon=("lon", "sum"),
+        airports=("airports", "sum"),
+    )
+    countries["lat"] /= countries["airports"]
+    countries["lon"] /= countries["airports"]
+    countries["ISO3"] = np.nan
+    countries["color"] = DEFAULT_COUNTRY_COLOR
+
+    known = countries.index.isin(reference.index)
+    if not known.all():
+        _LOGGER.warning(
+            "Countries missing from the reference, placed at their mean airport position: %s",
+            ", ".join(countries.index[~known].astype(str)),
+        )
+    for column in ["ISO3", "lat", "lon", "color"]:
+        values = reference[column].reindex(countries.index)
+        countries[column] = values.where(values.notna(), countries[column])
+    return countries
+
+
+def _read_reference(path):
+    columns = ["country_name", "ISO3", "lat", "lon", "color"]
+    if path is None:
+        return pd.DataFrame(columns=columns, index=pd.Index([], name="country"))
+    return pd.read_csv(path, index_col="country", **READ_OPTIONS)[columns]
+
+
+def _continent_coordinates(continents):
+    coordinates = pd.DataFrame.from_dict(
+        CONTINENT_COORDINATES, orient="index", columns=["lon", "lat"]
+    )
+    return {
+        name: coordinates[name].reindex(continents.to_numpy()).to_numpy() for name in ["lon", "lat"]
+    }
+
+
+def _add_continent_coordinates(frame, departure, arrival):
+    departure_coordinates = _continent_coordinates(frame[departure])
+    arrival_coordinates = _continent_coordinates(frame[arrival])
+    frame["dep_lon"] = departure_coordinates["lon"]
+    frame["dep_lat"] = departure_coordinates["lat"]
+    frame["arr_lon"] = arrival_coordinates["lon"]
+    frame["arr_lat"] = arrival_coordinates["lat"]
+
+
+def _add_scaled_metrics(frame):
+    frame["CO2 (Mt)"] = frame["CO2 (kg)"] / 1e9
+    frame["ASK (Bn)"] = frame["ASK"] / 1e9
+    frame["Seats (Mn)"] = frame["Seats"] / 1e6
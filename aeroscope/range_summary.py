@@ -0,0 +1,107 @@
+"""
+Short, medium and long range totals of the flight-level data, for the AeroMAPS export table.
+
+The table used to filter the selected flights three times on distance_km (one frame per range
+class) and to sum the whole flights_df again for each world share. A RangeSummary assigns the
+range class of each flight once per dataset and keeps the world totals: the totals of a
+selection, per class, are one weighted bincount of the selected rows, and the metric rows of the
+table are derived from these few numbers.
+
+When only a distance range is selected, its totals come from prefix sums of the metrics over the
+flights sorted by distance (the distance index of the filter engine): the range is a slice of
+this order, and so is each class, its totals are differences of two prefix sums.
+"""
+
+import numpy as np
+
+# Upper distance bound (km, included) of the short and medium range classes
+RANGE_BOUNDS = [1500, 4000]
+RANGE_CLASSES = ["sr", "mr", "lr"]
+SUMMARY_METRICS = ["ASK", "CO2 (kg)", "Seats"]
+
+# kg of CO2 emitted per kg of fuel, and MJ per kg of fuel
+CO2_PER_FUEL = 3.16
+FUEL_ENERGY = 44
+
+
+class RangeSummary:
+    """Range class of each flight of a dataset, and the world totals of the metrics."""
+
+    def __init__(self, flights_filter):
+        self.flights_filter = flights_filter
+        flights_df = flights_filter.flights_df
+        distance = flights_df["distance_km"].to_numpy()
+        # 0: SR, 1: MR, 2: LR, flights without a distance are in no class (3)
+        self.range_classes = np.searchsorted(RANGE_BOUNDS, distance, side="left").astype(np.int8)
+        self.range_classes[np.isnan(distance)] = len(RANGE_CLASSES)
+        # Summed in float64, missing values count as 0 as in a DataFrame sum
+        self.metrics = {
+            metric: np.nan_to_num(flights_df[metric].to_numpy(dtype=np.float64))
+            for metric in SUMMARY_METRICS
+        }
+        self.world = self.totals()
+
+        # Classes are consecutive slices of the distance order, missing distances sort last
+        order, sorted_distance = flights_filter.distance_index()
+        self.class_bounds = np.concatenate(
+            [
+                [0],
+                np.searchsorted(sorted_distance, RANGE_BOUNDS, side="right"),
+                [np.count_nonzero(~np.isnan(distance))],
+            ]
+        )
+        self.prefix_sums = {
+            metric: np.concatenate([[0.0], np.cumsum(values[order])])
+            for metric, values in self.metrics.items()
+        }
+
+    def totals(self, rows=None, distance_range=None):
+        """
+        Metric totals of the selected rows (all rows when None), or of the flights in an
+        inclusive (min, max) distance range.
+
+        Maps each metric to an array: total of the selection, then the total of each class.
+        """
+        if rows is None and distance_range is not None:
+            start, end = self.flights_filter.distance_bounds(distance_range)
+            starts = np.clip(self.class_bounds[:-1], start, end)
+            ends = np.clip(self.class_bounds[1:], start, end)
+            return {
+                metric: np.concatenate(
+                    [
+                        [prefix_sums[end] - prefix_sums[start]],
+                        prefix_sums[ends] - prefix_sums[starts],
+                    ]
+                )
+                for metric, prefix_sums in self.prefix_sums.items()
+            }
+
+        range_classes = self.range_classes if rows is None else self.range_classes[rows]
+        totals = {}
+        for metric, values in self.metrics.items():
+            if rows is not None:
+                values = values[rows]
+            per_class = np.bincount(range_classes, weights=values, minlength=len(RANGE_CLASSES) + 1)
+            totals[metric] = np.concatenate([[values.sum()], per_class[: len(RANGE_CLASSES)]])
+        return totals
+
+    def items(self, rows=None, distance_range=None):
+        """Rows of the AeroMAPS table for a selection (see totals): name, val (total), sr, mr, lr."""
+        totals = self.totals(rows, distance_range)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            co2_per_ask = totals["CO2 (kg)"] / totals["ASK"]
+            values = {
+                "ASK": totals["ASK"],
+                "CO2 (kg)": totals["CO2 (kg)"],
+                "Seats": totals["Seats"],
+                "CO2 (kg) per ASK": co2_per_ask,
+                "Energy (MJ) per ASK": co2_per_ask / CO2_PER_FUEL * FUEL_ENERGY,
+                "Share of world ASK (%)": totals["ASK"] / self.world["ASK"][0] * 100,
+                "Share of world Seats (%)": totals["Seats"] / self.world["Seats"][0] * 100,
+                "Share of world CO2 (%)": totals["CO2 (kg)"] / self.world["CO2 (kg)"][0] * 100,
+            }
+        # tolist(): plain floats, to be sent to the browser
+        return [
+            dict(zip(["name", "val", *RANGE_CLASSES], [name, *row.tolist()]))
+            for name, row in values.items()
+        ]
@@ -0,0 +1,110 @@
+"""
+Regional groups of countries (European Union, OECD, G7, ...).
+
+The groups and their member countries are read once from regional_groups.json. For a dataset,
+RegionalGroups precomputes the rows of flights_df, country_flows and country_fixed departing
+from each group: a selection holding groups is resolved from these row ids, only the countries
+selected on their own are still matched by name.
+"""
+
+import json
+import os
+
+import numpy as np
+
+GROUPS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "regional_groups.json")
+
+
+def load_groups(path=GROUPS_PATH):
+    """
+    Groups of the registry file, in file order.
+
+    Each group maps to its member "countries" and "flow_map": whether the country pair flow map
+    can be drawn for it (False for the large groups, drawn as a country map).
+    """
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+REGIONAL_GROUPS = load_groups()
+GROUP_NAMES = list(REGIONAL_GROUPS)
+
+
+def group_countries(selection):
+    """Member countries of the groups in selection, without duplicates."""
+    countries = {}
+    for name in GROUP_NAMES:
+        if name in selection:
+            countries.update(dict.fromkeys(REGIONAL_GROUPS[name]["countries"]))
+    return list(countries)
+
+
+def flow_map_allowed(selection):
+    """False when selection holds a group too large for the country pair flow map."""
+    return all(REGIONAL_GROUPS[name]["flow_map"] for name in GROUP_NAMES if name in selection)
+
+
+class RegionalGroups:
+    """Rows departing from each regional group, in the frames of one dataset."""
+
+    def __init__(self, dataclass):
+        self.flights_filter = dataclass.flights_filter
+        self.country_flows = dataclass.country_flows
+        self.country_fixed = dataclass.country_fixed
+
+        self._rows = {"flights_df": {}, "country_flows": {}, "country_fixed": {}}
+        for name in GROUP_NAMES:
+            countries = REGIONAL_GROUPS[name]["countries"]
+            self._rows["flights_df"][name] = self.flights_filter.rows(
+                "departure_country_name", countries
+            )
+            self._rows["country_flows"][name] = np.flatnonzero(
+                self.country_flows["departure_country_name"].isin(countries).to_numpy()
+            )
+            self._rows["country_fixed"][name] = np.flatnonzero(
+                self.country_fixed["departure_country_name"].isin(countries).to_numpy()
+            )
+
+    def flight_rows(self, selection):
+        """Sorted positions of the flights departing from the selected countries and groups."""
+        groups, countries = self._split(selection)
+        parts = [self._rows["flights_df"][name] for name in groups]
+        if countries:
+            parts.append(self.flights_filter.rows("departure_country_name", countries))
+        return self._union(parts)
+
+    def flights_df(self, selection):
+        return self.flights_filter.take(self.flight_rows(selection))
+
+    def country_flows_df(self, selection):
+        """Country pairs departing from the selection, reindexed as a filtered copy."""
+        return self._take("country_flows", self.country_flows, selection)
+
+    def country_fixed_df(self, selection):
+        return self._take("country_fixed", self.country_fixed, selection)
+
+    def _take(self, frame_name, frame, selection):
+        groups, countries = self._split(selection)
+        parts = [self._rows[frame_name][name] for name in groups]
+        if countries:
+            parts.append(np.flatnonzero(frame["departure_country_name"].isin(countries).to_numpy()))
+        return frame.take(self._union(parts)).reset_index()
+
+    def _split(self, selection):
+        # groups of the selection, and the countries that are not members of one of them
+        groups = [name for name in GROUP_NAMES if name in selection]
+        members = set(group_countries(groups))
+        countries = [
+            country
+            for country in selection
+            if country not in REGIONAL_GROUPS and country not in members
+        ]
+        return groups, countries
+
+    @staticmethod
+    def _union(parts):
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        if len(parts) == 1:
+            return parts[0]
+        return np.unique(np.concatenate(parts))
@@ -0,0 +1,83 @@
+"""
+Aggregated hierarchy of the flight treemaps.
+
+Plotly Express builds a treemap from the flight rows themselves: it groups them on each level of
+the path in pandas and sends one box per distinct path. The hierarchy is instead aggregated here
+from the integer codes of the filter engine, one bincount per level, into the ids, labels,
+parents and values of a go.Treemap. Each level keeps its top_k nodes (by value): the other
+children of a node are merged into one "Other" box, so the number of boxes stays bounded whatever
+the size of the selection.
+"""
+
+import numpy as np
+import pandas as pd
+
+from perf_monitor import AGGREGATION_STAGE, timed_stage
+
+TREEMAP_ROOT = "Total currently selected"
+# Largest nodes kept on each level of the path
+TREEMAP_TOP_K = 200
+OTHER_LABEL = "Other"
+
+
+@timed_stage(AGGREGATION_STAGE)
+def treemap_hierarchy(flights_filter, rows, path_columns, metric, top_k=TREEMAP_TOP_K):
+    """
+    Treemap nodes of the selected rows (all rows when None): id, label, parent and value.
+
+    Ids are the path of a node joined by "/" as in Plotly Express, parents hold their children
+    total (branchvalues="total"). Rows stop at the first level where their value is missing.
+    top_k=None keeps every node.
+    """
+    weights = np.nan_to_num(flights_filter.flights_df[metric].to_numpy(dtype=np.float64))
+    if rows is not None:
+        weights = weights[rows]
+
+    ids, labels, parents = [TREEMAP_ROOT], [TREEMAP_ROOT], [""]
+    values = [weights.sum()]
+    # node of each row on the current level, -1 once the row left the hierarchy
+    row_nodes = np.zeros(len(weights), dtype=np.int64)
+    node_ids = np.array([TREEMAP_ROOT], dtype=object)
+
+    for column in path_columns:
+        codes, names = flights_filter.codes(column)
+        if rows is not None:
+            codes = codes[rows]
+        names = np.asarray(names.astype(str), dtype=object)
+        n_codes = len(names)
+
+        alive = (row_nodes >= 0) & (codes >= 0)
+        keys = row_nodes[alive] * n_codes + codes[alive]
+        level_keys, inverse = np.unique(keys, return_inverse=True)
+        level_values = np.bincount(inverse, weights=weights[alive], minlength=len(level_keys))
+        level_parents = level_keys // n_codes
+        level_labels = names[level_keys % n_codes]
+
+        kept = np.ones(len(level_keys), dtype=bool)
+        if top_k is not None and len(level_keys) > top_k:
+            kept[:] = False
+            kept[np.argsort(-level_values, kind="stable")[:top_k]] = True
+
+        level_ids = node_ids[level_parents] + "/" + level_labels
+        ids.extend(level_ids[kept])
+        labels.extend(level_labels[kept])
+        parents.extend(node_ids[level_parents[kept]])
+        values.extend(level_values[kept])
+
+        # One "Other" box per parent for its merged children, the end of their rows
+        if not kept.all():
+            other_parents, other_inverse = np.unique(level_parents[~kept], return_inverse=True)
+            other_ids = node_ids[other_parents] + "/" + OTHER_LABEL
+            ids.extend(other_ids)
+            labels.extend([OTHER_LABEL] * len(other_parents))
+            parents.extend(node_ids[other_parents])
+            values.extend(np.bincount(other_inverse, weights=level_values[~kept]))
+
+        # Rows of the kept nodes go on to the next level
+        kept_positions = np.full(len(level_keys), -1, dtype=np.int64)
+        kept_positions[kept] = np.arange(np.count_nonzero(kept))
+        row_nodes = np.full(len(weights), -1, dtype=np.int64)
+        row_nodes[alive] = kept_positions[inverse]
+        node_ids = level_ids[kept]
+
+    return pd.DataFrame({"id": ids, "label": labels, "parent": parents, "value": values})
@@ -0,0 +1,99 @@
+"""
+Coalescing of the widget events of a tab.
+
+A tab wires several callbacks to the same widgets, and some callbacks set widget values
+themselves (regional groups, reset buttons): one click used to cascade into several full
+recomputes. The callbacks of a tab are instead scheduled on its UpdateScheduler:
+
+- a callback scheduled again before it ran is only run once, after the others;
+- callbacks sharing a key supersede each other, only the last one scheduled runs;
+- events raised while callbacks run (widgets set by a callback) join the running cycle;
+- in a kernel, a cycle starts once no event came for DEBOUNCE_DELAY seconds. Without a running
+  event loop (scripts), it starts right away.
+
+A callback raising ends its cycle. The exception is raised by a direct flush(), and logged when
+the cycle was started by the debounce timer, where nothing would catch it.
+
+Callbacks read the widget values when they run, so dropping superseded events loses nothing.
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+
+_LOGGER = logging.getLogger(__name__)
+
+DEBOUNCE_DELAY = 0.1
+
+
+class UpdateScheduler:
+    def __init__(self, delay=DEBOUNCE_DELAY):
+        self.delay = delay
+        self.n_scheduled = 0
+        self.n_runs = 0
+        self._pending = OrderedDict()
+        self._running = False
+        self._timer = None
+
+    @property
+    def n_avoided(self):
+        """Number of scheduled callbacks that did not run (coalesced or superseded)."""
+        return self.n_scheduled - self.n_runs - len(self._pending)
+
+    def observe(self, widget, callback, names="v_model", key=None):
+        """Schedule callback(change) on each change of the widget trait."""
+        widget.observe(lambda change: self.schedule(callback, change, key=key), names=names)
+
+    def on_event(self, widget, event, callback, key=None):
+        """Schedule callback(widget, event, data) on each event of an ipyvuetify widget."""
+        widget.on_event(event, lambda *args: self.schedule(callback, *args, key=key))
+
+    def schedule(self, callback, *args, key=None):
+        """Queue callback(*args), replacing any pending callback of the same key."""
+        key = callback if key is None else key
+        self.n_scheduled += 1
+        # Moved to the end: it runs after what it depends on
+        self._pending.pop(key, None)
+        self._pending[key] = (callback, args)
+        if self._running:
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is None or not self.delay:
+            self.flush()
+        else:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = loop.call_later(self.delay, self._flush_from_timer)
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        except Exception:
+            _LOGGER.exception("Update callback failed")
+
+    def flush(self):
+        """Run the pending callbacks, and the ones they schedule, now."""
+        self._timer = None
+        if self._running:
+            return
+        self._running = True
+        try:
+            while self._pending:
+                _, (callback, args) = self._pending.popitem(last=False)
+                self.n_runs += 1
+                callback(*args)
+        except Exception:
+            # A failed callback ends the cycle, as it ended the observer cascade
+            self._pending.clear()
+            raise
+        finally:
+            self._running = False
+        _LOGGER.debug(
+            "Update cycle done: %d callbacks run, %d avoided since start",
+            self.n_runs,
+            self.n_avoided,
+        )
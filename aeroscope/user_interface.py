@@ -1,6 +1,5 @@
 from datetime import datetime
 
-import pandas as pd
 import ipyvuetify as v
 from ipywidgets import Output
 
@@ -9,6 +8,8 @@ from country_front import CountriesTab
 from detailled_front import DetailledTab, DetailledTab_OS
 from passenger_front import PassengerTab
 from aeromaps_front import AeroMAPSTab
+from datasets import load_dataset
+from perf_monitor import PERF_MONITOR, perf_panel
 from IPython.display import display
 
 
@@ -85,131 +86,26 @@ footer_layout = v.Footer(
 )
 
 
+loading_layout = v.Col(
+    class_="text-center mt-12",
+    children=[
+        v.ProgressCircular(indeterminate=True, size=64, color="#050A30"),
+        v.Html(tag="p", class_="mt-4", children=["Loading OpenSky data..."]),
+    ],
+)
+
+
 class Simulator(v.Card):
     def __init__(self, use_opensky_data=False, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-        if use_opensky_data:
-            self.load_opensky_data()
-
-        else:
-            self.load_compiled_data()
-
+        self.data = load_dataset(use_opensky_data)
         self.initialize_tabs(self.data)
 
         self.children = [
             self.tabs_layout,
         ]
 
-    def load_compiled_data(self):
-        #### Import various plot file. In case the source file is modified, please rerun preprocess.py ####
-
-        from core import AeroscopeDataClass
-
-        self.data = AeroscopeDataClass(
-            # read continental level data
-            continental_flows=pd.read_csv(
-                "./plot_files/continental_flows.csv",
-                sep=",",
-                keep_default_na=False,
-                na_values=["", "NaN"],
-                index_col=0,
-            ),
-            continental_flows_non_dir=pd.read_csv(
-                "./plot_files/continental_flows_non_dir.csv",
-                sep=",",
-                keep_default_na=False,
-                na_values=["", "NaN"],
-                index_col=0,
-            ),
-            conti_scatter=pd.read_csv(
-                "./plot_files/conti_scatter.csv",
-                sep=",",
-                keep_default_na=False,
-                na_values=["", "NaN"],
-                index_col=0,
-            ),
-            # read country level data
-            country_flows=pd.read_csv(
-                "./plot_files/country_flows.csv",
-                sep=",",
-                keep_default_na=False,
-                na_values=["", "NaN"],
-                index_col=0,
-            ),
-            country_fixed=pd.read_csv(
-                "./plot_files/country_fixed.csv",
-                sep=",",
-                keep_default_na=False,
-                na_values=["", "NaN"],
-                index_col=0,
-            ),
-            # read flight_level_data
-            flights_df=pd.read_csv(
-                "./plot_files/flights_df.zip",
-                compression="zip",
-                sep=",",
-                keep_default_na=False,
-                na_values=["", "NaN"],
-                index_col=0,
-            ),
-            type="compilation",
-        )
-
-    def load_opensky_data(self):
-        from core import AeroscopeDataClass
-
-        self.data = AeroscopeDataClass(
-            # read continental level data
-            continental_flows=pd.read_csv(
-                "./plot_files_os/continental_flows.csv",
-                sep=",",
-                keep_default_na=False,
-                na_values=["", "NaN"],
-                index_col=0,
-            ),
-            continental_flows_non_dir=pd.read_csv(
-                "./plot_files_os/continental_flows_non_dir.csv",
-                sep=",",
-                keep_default_na=False,
-                na_values=["", "NaN"],
-                index_col=0,
-            ),
-            conti_scatter=pd.read_csv(
-                "./plot_files_os/conti_scatter.csv",
-                sep=",",
-                keep_default_na=False,
-                na_values=["", "NaN"],
-                index_col=0,
-            ),
-            # read country level data
-            country_flows=pd.read_csv(
-                "./plot_files_os/country_flows.csv",
-                sep=",",
-                keep_default_na=False,
-                na_values=["", "NaN"],
-                index_col=0,
-            ),
-            country_fixed=pd.read_csv(
-                "./plot_files_os/country_fixed.csv",
-                sep=",",
-                keep_default_na=False,
-                na_values=["", "NaN"],
-                index_col=0,
-            ),
-            # read flight_level_data
-            flights_df=pd.read_csv(
-                "./plot_files_os/flights_df.zip",
-                compression="zip",
-                sep=",",
-                keep_default_na=False,
-                na_values=["", "NaN"],
-                index_col=0,
-                low_memory=False,  # avoid mixed type warning. Fix the core Pb of unknown coordinates
-            ),
-            type="opensky",
-        )
-
     def initialize_tabs(self, aeroscope_data):
         if aeroscope_data.type == "compilation":
             continental_tab = ContinentalTab(aeroscopedataclass=aeroscope_data)
@@ -315,12 +211,8 @@ class UserInterface:
             style_="background-color: white; pa-0 ma-0;",  # Set the desired background color and padding here
         )
 
-        self.opensky_simulator = Simulator(
-            use_opensky_data=True,
-            class_="mt-9 pa-0",
-            # id='inspire',
-            style_="background-color: white; pa-0 ma-0;",  # Set the desired background color and padding here
-        )
+        # Built on first selection of the OpenSky source, most visitors never use it
+        self.opensky_simulator = None
 
         self.output_simulator = Output()
 
@@ -337,6 +229,9 @@ class UserInterface:
                 footer_layout,
             ],
         )
+        # Hidden unless the performance monitor is enabled
+        if PERF_MONITOR.enabled:
+            self.app.children = self.app.children[:-1] + [perf_panel(PERF_MONITOR), footer_layout]
 
         source_radio.observe(self._select_mode, names="v_model")
 
@@ -347,4 +242,17 @@ class UserInterface:
             if source == "compilation":
                 display(self.compiled_simulator)
             else:
+                if self.opensky_simulator is None:
+                    display(loading_layout)
+                    source_radio.disabled = True
+                    try:
+                        self.opensky_simulator = Simulator(
+                            use_opensky_data=True,
+                            class_="mt-9 pa-0",
+                            # id='inspire',
+                            style_="background-color: white; pa-0 ma-0;",  # Set the desired background color and padding here
+                        )
+                    finally:
+                        source_radio.disabled = False
+                        self.output_simulator.clear_output()
                 display(self.opensky_simulator)
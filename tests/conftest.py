@@ -0,0 +1,24 @@
+import os.path as pth
+import sys
+
+import numpy as np
+import pytest
+
+# The app modules use flat imports, as in the notebook
+sys.path.insert(0, pth.join(pth.dirname(pth.dirname(__file__)), "aeroscope"))
+
+from bench import _synthetic_flights  # noqa: E402
+from datasets import FLIGHTS_DF_DTYPES, prepare_flights_df  # noqa: E402
+
+
+@pytest.fixture
+def flights_df():
+    """Synthetic flights with the dtypes of the app, some airlines, airports, distances missing."""
+    flights_df = _synthetic_flights(np.random.default_rng(0), 5000, 1, opensky=False)
+    flights_df.loc[::97, "airline_iata"] = np.nan
+    flights_df.loc[::83, "iata_arrival"] = np.nan
+    flights_df.loc[::89, "distance_km"] = np.nan
+    flights_df = flights_df.astype(
+        {name: dtype for name, dtype in FLIGHTS_DF_DTYPES.items() if name in flights_df.columns}
+    )
+    return prepare_flights_df(flights_df)
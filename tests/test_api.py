@@ -0,0 +1,73 @@
+import json
+import shutil
+import tempfile
+
+from tornado.testing import AsyncHTTPTestCase
+
+from api import make_app
+from bench import write_synthetic_plot_files
+from datasets import load_dataset
+
+
+class APITest(AsyncHTTPTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        write_synthetic_plot_files(cls.directory)
+        cls.datasets = {"compilation": load_dataset(directory=cls.directory)}
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory)
+
+    def get_app(self):
+        return make_app(self.datasets, workers=1)
+
+    def get_json(self, path, code=200):
+        response = self.fetch(path)
+        self.assertEqual(response.code, code, response.body)
+        return json.loads(response.body)
+
+    def test_datasets(self):
+        flights_df = self.datasets["compilation"].flights_df
+        self.assertEqual(
+            self.get_json("/api/datasets"), [{"name": "compilation", "n_flights": len(flights_df)}]
+        )
+
+    def test_endpoints(self):
+        flights_df = self.datasets["compilation"].flights_df
+        airline = flights_df["airline_iata"].value_counts().index[0]
+
+        routes = self.get_json("/api/compilation/routes?metric=Seats&limit=5")
+        self.assertEqual(len(routes), 5)
+        self.assertEqual(routes, sorted(routes, key=lambda route: -route["Seats"]))
+
+        facets = self.get_json("/api/compilation/facets?column=airline_iata")
+        counts = {facet["value"]: facet["count"] for facet in facets}
+        self.assertEqual(counts[airline], (flights_df["airline_iata"] == airline).sum())
+
+        distance = self.get_json("/api/compilation/distance?metric=ASK&airline_iata=" + airline)
+        self.assertAlmostEqual(
+            sum(row["ASK"] for row in distance),
+            flights_df.loc[flights_df["airline_iata"] == airline, "ASK"].sum(),
+            delta=1e-6 * flights_df["ASK"].sum(),
+        )
+
+        self.assertTrue(self.get_json("/api/compilation/summary?distance_max=1500"))
+        self.assertTrue(self.get_json("/api/compilation/treemap?metric=ASK&top_k=3"))
+
+    def test_errors(self):
+        for path, code in [
+            ("/api/unknown/summary", 404),
+            ("/api/compilation/summary?unknown=1", 400),
+            ("/api/compilation/facets", 400),
+            ("/api/compilation/routes?limit=0", 400),
+            ("/api/compilation/routes?limit=ten", 400),
+            ("/api/compilation/treemap?top_k=-1", 400),
+            ("/api/compilation/distance?distance_min=far", 400),
+            ("/api/compilation/summary?departure_group=unknown", 400),
+        ]:
+            self.assertIn("error", self.get_json(path, code))
+
+        error = self.get_json("/api/compilation/routes?metric=n_flights", 400)["error"]
+        self.assertNotIn("n_flights", error)
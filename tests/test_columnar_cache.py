@@ -0,0 +1,68 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+import columnar_cache
+from columnar_cache import load_frame, read_csv_cached, store_frame
+
+
+def _memory_mapped(values):
+    while values is not None:
+        if isinstance(values, np.memmap):
+            return True
+        values = values.base
+    return False
+
+
+def test_memory_mapped_columns_stay_read_only_and_shared(tmp_path):
+    df = pd.DataFrame(
+        {
+            "ASK": np.arange(100, dtype="float32"),
+            "Seats": np.arange(100, dtype="float32") * 2,
+            "acft_class": pd.Categorical(["A", "B"] * 50),
+        }
+    )
+    store_frame(df, str(tmp_path))
+    loaded = load_frame(str(tmp_path), mmap_mode="r")
+    pd.testing.assert_frame_equal(loaded, df)
+
+    # Filtering and grouping would consolidate the float32 columns into one copied block
+    loaded[loaded["ASK"] > 10]
+    loaded.groupby("acft_class", observed=True)[["ASK", "Seats"]].sum()
+    loaded.loc[loaded.index[:5], ["ASK", "Seats"]]
+
+    for column in ["ASK", "Seats"]:
+        values = loaded[column].to_numpy()
+        assert _memory_mapped(values)
+        assert not values.flags.writeable
+    assert _memory_mapped(loaded["acft_class"].cat.codes.to_numpy())
+
+
+def test_transform_version_rebuilds_the_cache(tmp_path):
+    source = tmp_path / "flights.csv"
+    pd.DataFrame({"ASK": [1.0, 2.0]}).to_csv(source)
+
+    def transform(df):
+        df["double"] = df["ASK"] * factor
+        return df
+
+    factor = 2
+    first = read_csv_cached(str(source), transform=transform, transform_version=1, index_col=0)
+    factor = 3
+    cached = read_csv_cached(str(source), transform=transform, transform_version=1, index_col=0)
+    rebuilt = read_csv_cached(str(source), transform=transform, transform_version=2, index_col=0)
+
+    assert first["double"].tolist() == cached["double"].tolist() == [2.0, 4.0]
+    assert rebuilt["double"].tolist() == [3.0, 6.0]
+
+
+def test_copied_columns_warned(tmp_path, monkeypatch, caplog):
+    store_frame(pd.DataFrame({"ASK": np.arange(10, dtype="float32")}), str(tmp_path))
+    # pandas version whose BlockManager flags are not known
+    monkeypatch.setattr(columnar_cache, "_UNCONSOLIDATED_PANDAS_VERSIONS", ())
+
+    with caplog.at_level(logging.WARNING, logger="columnar_cache"):
+        loaded = load_frame(str(tmp_path), mmap_mode="r")
+    assert loaded["ASK"].tolist() == list(range(10))
+    assert "copied in each process" in caplog.text
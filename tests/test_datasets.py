@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from columnar_cache import read_csv_cached
+from core import metric_totals
+from datasets import FLIGHTS_DF_DTYPES, prepare_flights_df
+
+
+def test_missing_domestic_flag_filled_from_countries(tmp_path):
+    source = tmp_path / "flights_df.csv"
+    pd.DataFrame(
+        {
+            "departure_country": ["FR", "FR", "FR", "NA"],
+            "arrival_country": ["FR", "DE", "DE", "NA"],
+            "domestic": [True, True, "", ""],
+            "distance_km": [400.0, 900.0, 900.0, 300.0],
+            "ASK": [1.0, 2.0, 3.0, 4.0],
+        }
+    ).to_csv(source)
+
+    flights_df = read_csv_cached(
+        str(source),
+        dtypes=FLIGHTS_DF_DTYPES,
+        transform=prepare_flights_df,
+        keep_default_na=False,
+        na_values=["", "NaN"],
+        index_col=0,
+    )
+    assert flights_df["domestic"].dtype == bool
+    # Set flags are kept, missing ones come from the countries ("NA" is Namibia, not missing)
+    assert flights_df["domestic"].tolist() == [True, True, False, True]
+
+
+def test_metric_totals_in_float64():
+    flights_df = pd.DataFrame(
+        {
+            "acft_class": ["A"] * 3,
+            "ASK": np.array([1e8, 1.0, 1.0], dtype="float32"),
+        }
+    )
+    assert metric_totals(flights_df, "ASK") == 1e8 + 2
+    assert metric_totals(flights_df, "ASK", by="acft_class")["A"] == 1e8 + 2
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+from distance_cube import DistanceCube, add_distance_bins
+
+
+def _flights(distance):
+    return pd.DataFrame(
+        {
+            "distance_km": distance,
+            "acft_class": "Narrow Body",
+            "domestic": False,
+            "departure_continent": "EU",
+            "arrival_continent": "EU",
+            "ASK": 1.0,
+            "Seats": 1.0,
+            "CO2 (kg)": 1.0,
+        }
+    )
+
+
+def test_nan_distance_changes_no_bin():
+    flights_df = add_distance_bins(_flights([250.0, 1200.0]))
+    with_nan = add_distance_bins(_flights([250.0, 1200.0, np.nan]))
+    assert with_nan["distance_bin"].iloc[-1] == -1
+
+    cube = DistanceCube.from_flights(flights_df)
+    cube_nan = DistanceCube.from_flights(with_nan)
+    pd.testing.assert_series_equal(cube_nan.histogram("ASK"), cube.histogram("ASK"))
+    pd.testing.assert_series_equal(cube_nan.cumulative("ASK"), cube.cumulative("ASK"))
+    # Without stored bins either
+    cube_raw = DistanceCube.from_flights(_flights([250.0, 1200.0, np.nan]))
+    pd.testing.assert_series_equal(cube_raw.histogram("ASK"), cube.histogram("ASK"))
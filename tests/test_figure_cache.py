@@ -0,0 +1,23 @@
+import numpy as np
+import plotly.graph_objects as go
+
+from figure_cache import FigureCache, figure_bytes
+
+
+def test_figure_bytes_counts_the_data_arrays():
+    small = go.Figure(go.Scatter(x=np.arange(10.0), y=np.arange(10.0)))
+    large = go.Figure(go.Scatter(x=np.arange(100000.0), y=np.arange(100000.0)))
+
+    assert figure_bytes(large) - figure_bytes(small) == 2 * 8 * (100000 - 10)
+
+
+def test_cache_evicts_over_max_bytes():
+    figures = [go.Figure(go.Scatter(x=np.arange(1000.0) + i)) for i in range(3)]
+    cache = FigureCache(max_bytes=2 * figure_bytes(figures[0]) + 1)
+    for i, fig in enumerate(figures):
+        cache.put(i, fig)
+
+    assert len(cache) == 2
+    assert cache.get(0) is None
+    assert cache.get(2) is figures[2]
+    assert cache.n_bytes <= cache.max_bytes
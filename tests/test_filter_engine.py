@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from filter_engine import FilterEngine
+
+
+def _mask_rows(flights_df, filters, distance_range=None):
+    mask = np.ones(len(flights_df), dtype=bool)
+    for column, values in filters.items():
+        if len(values):
+            mask &= flights_df[column].isin(values).to_numpy()
+    if distance_range is not None:
+        distance = flights_df["distance_km"]
+        mask &= distance.between(*distance_range).to_numpy()
+    return np.flatnonzero(mask)
+
+
+def test_select_matches_pandas_masks(flights_df):
+    engine = FilterEngine(flights_df)
+    airlines = flights_df["airline_iata"].value_counts().index[:3].tolist()
+    departures = flights_df["iata_departure"].value_counts().index[:20].tolist()
+    countries = flights_df["arrival_country"].value_counts().index[:5].tolist()
+
+    for filters, distance_range in [
+        ({}, None),
+        ({"airline_iata": airlines}, None),
+        ({"airline_iata": airlines, "iata_departure": departures}, None),
+        ({"airline_iata": airlines, "arrival_country": countries, "acft_icao": []}, None),
+        ({"iata_departure": departures + ["unknown"]}, (500, 3000)),
+        ({}, (0, 1500)),
+        ({}, (1500, np.inf)),
+        ({"airline_iata": ["unknown"]}, None),
+        ({"domestic": [True]}, (0, 800)),
+    ]:
+        rows = engine.select(filters, distance_range=distance_range)
+        np.testing.assert_array_equal(rows, _mask_rows(flights_df, filters, distance_range))
+
+
+def test_facets_match_value_counts(flights_df):
+    engine = FilterEngine(flights_df)
+    airlines = flights_df["airline_iata"].value_counts().index[:3].tolist()
+    rows = engine.select({"airline_iata": airlines})
+    selected = flights_df.iloc[rows]
+
+    facets = engine.facets(["iata_arrival", "acft_icao"], rows=rows)
+    for column, facet in facets.items():
+        counts = selected[column].value_counts()
+        assert facet.to_dict() == counts[counts > 0].to_dict()
+
+    totals = engine.facets(["acft_icao"], rows=rows, metric="ASK")["acft_icao"]
+    expected = selected.groupby("acft_icao", observed=True)["ASK"].sum()
+    np.testing.assert_allclose(totals, expected.reindex(totals.index), rtol=1e-5)
+
+
+def test_take_all_rows_is_the_base_frame(flights_df):
+    engine = FilterEngine(flights_df)
+    assert engine.take(engine.select({})) is flights_df
+    rows = engine.select({}, distance_range=(0, 1000))
+    pd.testing.assert_frame_equal(engine.take(rows), flights_df.iloc[rows])
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+from filter_engine import FilterEngine
+from od_table import ODTable
+
+
+def _by_pair(od_df):
+    # groupby of pandas 1.5 with observed=True keeps the pairs in order of appearance
+    pairs = od_df[["iata_departure", "iata_arrival"]].astype(str)
+    return od_df.assign(**pairs).sort_values(list(pairs)).reset_index(drop=True)
+
+
+def _groupby_pairs(flights_df, metrics):
+    return _by_pair(
+        flights_df.groupby(["iata_departure", "iata_arrival"], observed=True)[metrics]
+        .sum()
+        .reset_index()
+    )
+
+
+def test_aggregate_matches_groupby(flights_df):
+    engine = FilterEngine(flights_df)
+    od_table = ODTable(engine)
+    airlines = flights_df["airline_iata"].value_counts().index[:3].tolist()
+
+    for rows in [None, engine.select({"airline_iata": airlines})]:
+        selected = flights_df if rows is None else flights_df.iloc[rows]
+        od_df = _by_pair(od_table.aggregate(rows))
+        expected = _groupby_pairs(selected, od_table.metrics)
+
+        pd.testing.assert_frame_equal(
+            od_df[["iata_departure", "iata_arrival"]], expected[["iata_departure", "iata_arrival"]]
+        )
+        np.testing.assert_allclose(od_df[od_table.metrics], expected[od_table.metrics], rtol=1e-5)
+    # Flights without an arrival airport are in no pair
+    assert od_table.aggregate()["Seats"].sum() < flights_df["Seats"].astype("float64").sum()
+
+
+def test_pair_lists(flights_df):
+    od_table = ODTable(FilterEngine(flights_df))
+    od_df = _by_pair(od_table.aggregate(lists=True))
+
+    airlines = _by_pair(
+        flights_df.groupby(["iata_departure", "iata_arrival"], observed=True)["airline_iata"]
+        .agg(lambda codes: sorted(codes.dropna().astype(str).unique()))
+        .reset_index()
+    )
+    assert [sorted(filter(None, names.split(", "))) for names in od_df["airline_iata"]] == airlines[
+        "airline_iata"
+    ].tolist()
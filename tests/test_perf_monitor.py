@@ -0,0 +1,25 @@
+import perf_monitor
+from perf_monitor import AGGREGATION_STAGE, FIGURE_BUILD_STAGE, PerfMonitor, timed_stage
+
+
+def test_timed_stage_records_in_callbacks_only(monkeypatch):
+    monitor = PerfMonitor(enabled=True)
+    monkeypatch.setattr(perf_monitor, "PERF_MONITOR", monitor)
+
+    @timed_stage(AGGREGATION_STAGE)
+    def aggregate():
+        return 1
+
+    @timed_stage(FIGURE_BUILD_STAGE)
+    def plot():
+        return aggregate() + 1
+
+    assert plot() == 2
+    assert monitor.percentiles().empty
+
+    with monitor.callback("Tab._plot1_update"):
+        # Built right away in the callback: the nested plot function is not counted twice
+        assert monitor.timed_build(plot)() == 2
+
+    stages = monitor.percentiles().set_index("stage")["count"]
+    assert stages.to_dict() == {AGGREGATION_STAGE: 1, FIGURE_BUILD_STAGE: 1, "total": 1}
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+from bench import _synthetic_flights
+from preprocess import METRICS, READ_OPTIONS, preprocess
+
+
+def _raw_flights(tmp_path, n_flights=3000):
+    flights_df = _synthetic_flights(np.random.default_rng(0), n_flights, 1, opensky=False)
+    flights_df = flights_df.drop(columns=["CO2 (Mt)", "ASK (Bn)", "Seats (Mn)"])
+    # Some flights of each kind without their domestic flag
+    domestic = flights_df["domestic"].astype(object)
+    domestic[flights_df.index[flights_df["domestic"]][:10]] = np.nan
+    domestic[flights_df.index[~flights_df["domestic"]][:10]] = np.nan
+    flights_df["domestic"] = domestic
+    source = tmp_path / "raw.csv"
+    flights_df.to_csv(source, index=False)
+    return source
+
+
+def _read(directory, name):
+    return pd.read_csv(directory / name, index_col=0, **READ_OPTIONS)
+
+
+def test_missing_domestic_flags_from_countries(tmp_path):
+    source = _raw_flights(tmp_path)
+    preprocess(str(source), str(tmp_path / "out"), workers=1, build_cache=False)
+
+    flights_df = _read(tmp_path / "out", "flights_df.zip")
+    same_country = flights_df["departure_country"] == flights_df["arrival_country"]
+    assert flights_df["domestic"].dtype == bool
+    assert (flights_df["domestic"] == same_country).all()
+
+    country_fixed = _read(tmp_path / "out", "country_fixed.csv").set_index("departure_country")
+    share = same_country.groupby(flights_df["departure_country"]).mean()
+    np.testing.assert_allclose(country_fixed.loc[share.index, "domestic"], share)
+
+
+def test_chunks_merged_as_one(tmp_path):
+    source = _raw_flights(tmp_path)
+    preprocess(str(source), str(tmp_path / "whole"), workers=1, build_cache=False)
+    preprocess(str(source), str(tmp_path / "chunks"), chunksize=250, workers=2, build_cache=False)
+
+    for name in [
+        "country_flows.csv",
+        "country_fixed.csv",
+        "continental_flows.csv",
+        "continental_flows_non_dir.csv",
+        "conti_scatter.csv",
+        "flights_df.zip",
+    ]:
+        pd.testing.assert_frame_equal(
+            _read(tmp_path / "chunks", name), _read(tmp_path / "whole", name), rtol=1e-9
+        )
+
+    raw = pd.read_csv(source, **READ_OPTIONS)
+    country_flows = _read(tmp_path / "chunks", "country_flows.csv")
+    totals = raw.groupby(["departure_country", "arrival_country"])[METRICS].sum()
+    np.testing.assert_allclose(
+        country_flows.set_index(["departure_country", "arrival_country"]).loc[
+            totals.index, METRICS
+        ],
+        totals,
+        rtol=1e-9,
+    )
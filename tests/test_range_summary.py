@@ -0,0 +1,61 @@
+import numpy as np
+
+from filter_engine import FilterEngine
+from range_summary import RANGE_CLASSES, SUMMARY_METRICS, RangeSummary
+
+
+def _mask_totals(flights_df, rows=None):
+    selected = flights_df if rows is None else flights_df.iloc[rows]
+    distance = selected["distance_km"]
+    classes = [
+        distance <= 1500,
+        (distance > 1500) & (distance <= 4000),
+        distance > 4000,
+    ]
+    return {
+        metric: [selected[metric].astype("float64").sum()]
+        + [selected.loc[mask, metric].astype("float64").sum() for mask in classes]
+        for metric in SUMMARY_METRICS
+    }
+
+
+def test_class_bounds(flights_df):
+    flights_df["distance_km"] = flights_df["distance_km"].astype("float64")
+    flights_df.loc[:4, "distance_km"] = [1500.0, 1500.5, 4000.0, 4000.5, np.nan]
+    summary = RangeSummary(FilterEngine(flights_df))
+
+    assert summary.range_classes[:5].tolist() == [0, 1, 1, 2, len(RANGE_CLASSES)]
+
+
+def test_totals_match_pandas_masks(flights_df):
+    engine = FilterEngine(flights_df)
+    summary = RangeSummary(engine)
+    airlines = flights_df["airline_iata"].value_counts().index[:3].tolist()
+
+    for rows in [None, engine.select({"airline_iata": airlines})]:
+        totals = summary.totals(rows)
+        for metric, expected in _mask_totals(flights_df, rows).items():
+            np.testing.assert_allclose(totals[metric], expected, rtol=1e-9)
+
+    # Flights without a distance count in the total of the selection, in no class
+    world = summary.world["ASK"]
+    assert world[0] > world[1:].sum()
+    shares = {item["name"]: item for item in summary.items()}["Share of world ASK (%)"]
+    assert shares["val"] == 100
+
+
+def test_prefix_sums_match_selected_rows(flights_df):
+    # Flights on the class and range bounds
+    flights_df.loc[:3, "distance_km"] = [1000.0, 1500.0, 4000.0, 5000.0]
+    engine = FilterEngine(flights_df)
+    summary = RangeSummary(engine)
+
+    for distance_range in [(0, np.inf), (0, 1500), (1500, 4000), (1000, 5000), (4000.5, 8000)]:
+        rows = engine.select({}, distance_range=distance_range)
+        prefix_totals = summary.totals(distance_range=distance_range)
+        expected = _mask_totals(flights_df, rows)
+        for metric in SUMMARY_METRICS:
+            np.testing.assert_allclose(prefix_totals[metric], expected[metric], rtol=1e-9)
+            np.testing.assert_allclose(
+                prefix_totals[metric], summary.totals(rows)[metric], rtol=1e-9
+            )
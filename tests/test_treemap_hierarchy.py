@@ -0,0 +1,63 @@
+import numpy as np
+
+from filter_engine import FilterEngine
+from treemap_hierarchy import OTHER_LABEL, TREEMAP_ROOT, treemap_hierarchy
+
+
+def _children_totals(nodes):
+    # the root has no parent
+    return nodes[nodes["parent"] != ""].groupby("parent")["value"].sum()
+
+
+def test_nodes_match_groupby(flights_df):
+    engine = FilterEngine(flights_df)
+    nodes = treemap_hierarchy(engine, None, ["acft_class", "acft_icao"], "ASK", top_k=None)
+
+    assert nodes["value"].iloc[0] == flights_df["ASK"].astype("float64").sum()
+    leaves = nodes[nodes["id"].str.count("/") == 2].set_index("id")["value"]
+    expected = flights_df.groupby(["acft_class", "acft_icao"], observed=True)["ASK"].sum()
+    expected.index = [
+        "/".join([TREEMAP_ROOT, acft_class, acft]) for acft_class, acft in expected.index
+    ]
+    np.testing.assert_allclose(leaves.sort_index(), expected.sort_index(), rtol=1e-5)
+    # Without missing values, every parent is the total of its children
+    values = nodes.set_index("id")["value"]
+    children = _children_totals(nodes)
+    np.testing.assert_allclose(values[children.index], children, rtol=1e-9)
+
+
+def test_top_k_merges_the_others(flights_df):
+    engine = FilterEngine(flights_df)
+    rows = engine.select({"acft_class": ["Narrow Body", "Wide Body"]})
+    path = ["acft_class", "iata_departure", "acft_icao"]
+    top_k = 5
+    nodes = treemap_hierarchy(engine, rows, path, "Seats", top_k=top_k)
+    full = treemap_hierarchy(engine, rows, path, "Seats", top_k=None)
+
+    depth = nodes["id"].str.count("/")
+    is_other = nodes["label"] == OTHER_LABEL
+    for level in range(1, len(path) + 1):
+        kept = nodes[(depth == level) & ~is_other]
+        assert len(kept) <= top_k
+        # The kept nodes are the largest of their level
+        full_level = full[full["id"].str.count("/") == level]["value"]
+        assert kept["value"].min() >= full_level.nlargest(top_k).min()
+    # "Other" boxes end their rows, the totals of the parents are unchanged
+    assert not nodes["parent"].isin(nodes.loc[is_other, "id"]).any()
+    values = nodes.set_index("id")["value"]
+    children = _children_totals(nodes)
+    np.testing.assert_allclose(values[children.index], children, rtol=1e-9)
+
+
+def test_rows_leave_at_missing_values(flights_df):
+    engine = FilterEngine(flights_df)
+    nodes = treemap_hierarchy(engine, None, ["acft_class", "airline_iata"], "ASK", top_k=None)
+
+    values = nodes.set_index("id")["value"]
+    children = _children_totals(nodes).drop(TREEMAP_ROOT)
+    missing = flights_df[flights_df["airline_iata"].isna()]
+    left = missing.groupby("acft_class", observed=True)["ASK"].sum()
+    left.index = [TREEMAP_ROOT + "/" + acft_class for acft_class in left.index]
+    np.testing.assert_allclose(
+        values[children.index] - children, left.reindex(children.index, fill_value=0), rtol=1e-5
+    )
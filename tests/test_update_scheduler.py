@@ -0,0 +1,38 @@
+import asyncio
+import logging
+
+import pytest
+
+from update_scheduler import UpdateScheduler
+
+
+def _failing(change):
+    raise ValueError("failed")
+
+
+def test_direct_flush_raises():
+    scheduler = UpdateScheduler()
+    ran = []
+    with pytest.raises(ValueError):
+        scheduler.schedule(_failing, None)
+    scheduler.schedule(ran.append, 1)
+
+    assert ran == [1]
+
+
+def test_timer_flush_logs(caplog):
+    scheduler = UpdateScheduler(delay=0.01)
+    ran = []
+
+    async def interact():
+        scheduler.schedule(_failing, None)
+        await asyncio.sleep(0.05)
+        scheduler.schedule(ran.append, 1)
+        await asyncio.sleep(0.05)
+
+    with caplog.at_level(logging.ERROR, logger="update_scheduler"):
+        asyncio.run(interact())
+
+    assert ran == [1]
+    records = [record for record in caplog.records if record.name == "update_scheduler"]
+    assert [record.exc_info[0] for record in records] == [ValueError]